@@ -34,7 +34,7 @@ def bot_main():
 
 
 def main():
-    setup_logging(log_dir="logs")
+    setup_logging(log_dir="logs", use_queue=True)
     bot_main()
 
 
@@ -1,9 +1,16 @@
 """Telegram Bot interactive interface for tw-homedog."""
 
 import asyncio
+import contextlib
+import functools
+import io
+import itertools
 import json
 import logging
 import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
 from telegram import (
@@ -19,26 +26,30 @@ from telegram.ext import (
     CommandHandler,
     ContextTypes,
     ConversationHandler,
+    Defaults,
     MessageHandler,
     filters,
 )
 
-from telegram.error import TelegramError
+from telegram.error import BadRequest, TelegramError
 
-from tw_homedog.db_config import DbConfig
+from tw_homedog.db_config import DEFAULTS, DbConfig
 from tw_homedog.dedup_cleanup import run_cleanup
 from tw_homedog.log import set_log_level
 from tw_homedog.map_preview import MapConfig, MapThumbnailProvider
-from tw_homedog.matcher import find_matching_listings
+from tw_homedog.matcher import (
+    find_matching_listings,
+    match_listings_by_ids,
+    matches_all,
+    search_ranges,
+)
 from tw_homedog.normalizer import normalize_591_listing
 from tw_homedog.notifier import format_listing_message
 from tw_homedog.regions import (
     BUY_SECTION_CODES,
     REGION_CODES,
     RENT_SECTION_CODES,
-    resolve_region,
 )
-from tw_homedog.scraper import scrape_listings, _get_buy_session_headers, enrich_buy_listings
 from tw_homedog.storage import Storage
 from tw_homedog.templates import TEMPLATES, apply_template
 
@@ -67,11 +78,164 @@ logger = logging.getLogger(__name__)
     SETTINGS_MAPS_DAILY_LIMIT_INPUT,
 ) = range(19)
 
+
+@dataclass(slots=True)
+class SetupState:
+    """In-flight /start setup answers, stored in user_data["setup"]."""
+
+    mode: str = "buy"
+    regions: list[int] = field(default_factory=list)
+    districts: list[str] = field(default_factory=list)
+    price_min: int | float = 0
+    price_max: int | float = 0
+    min_ping: float | None = None
+    keywords_exclude: list[str] = field(default_factory=list)
+    selected_districts: set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_config_items(cls, items: dict) -> "SetupState":
+        """Build from a flat ``search.*`` dict (e.g. apply_template output)."""
+        return cls(**{k.removeprefix("search."): v for k, v in items.items()})
+
+    def to_config_items(self) -> dict:
+        """Flatten to ``search.*`` keys for db_config.set_many()."""
+        items = {
+            "search.mode": self.mode,
+            "search.regions": self.regions,
+            "search.districts": self.districts,
+            "search.price_min": self.price_min,
+            "search.price_max": self.price_max,
+        }
+        if self.min_ping is not None:
+            items["search.min_ping"] = self.min_ping
+        if self.keywords_exclude:
+            items["search.keywords_exclude"] = self.keywords_exclude
+        return items
+
+
+# Search mode → display label / price unit (buy prices are in 萬, rent in 元)
+_MODE_LABEL = {"buy": "買房", "rent": "租房"}
+_PRICE_UNIT = {"buy": "萬", "rent": "元"}
+
 # Reverse lookup: region_id → Chinese name
 _REGION_ID_TO_NAME: dict[int, str] = {v: k for k, v in REGION_CODES.items()}
+_REGION_LIST_TEXT = ", ".join(REGION_CODES.keys())
+# Region input token (Chinese name or numeric code as text) → region_id
+_REGION_LOOKUP: dict[str, int] = REGION_CODES | {str(rid): rid for rid in REGION_CODES.values()}
+_REGION_SEPARATORS = str.maketrans("，", ",")
+
+# Static setup-flow keyboards and texts (immutable, shared across updates)
+_WELCOME_BACK_TEXT = (
+    "歡迎回來！可用指令：\n"
+    "/list - 瀏覽未讀物件\n"
+    "/settings - 修改設定\n"
+    "/status - 查看狀態\n"
+    "/favorites - 查看最愛\n"
+    "/run - 手動執行\n"
+    "/dedupall - 全庫去重\n"
+    "/pause - 暫停排程\n"
+    "/resume - 恢復排程\n"
+    "/loglevel - 調整日誌等級\n"
+    "/config_export - 匯出設定\n"
+    "/config_import - 匯入設定"
+)
+_HELP_TEXT = (
+    "可用指令：\n"
+    "/start - 引導/重新設定\n"
+    "/list - 瀏覽未讀物件\n"
+    "/settings - 修改設定\n"
+    "/status - 查看狀態\n"
+    "/run - 手動執行\n"
+    "/dedupall - 全庫去重\n"
+    "/pause - 暫停排程\n"
+    "/resume - 恢復排程\n"
+    "/loglevel - 調整日誌等級\n"
+    "/config_export - 匯出設定\n"
+    "/config_import - 匯入設定"
+)
+_SETUP_DONE_TEXT = (
+    "設定完成！已開始自動排程。\n\n"
+    "可用指令：\n"
+    "/settings - 修改設定\n"
+    "/status - 查看狀態\n"
+    "/run - 手動執行\n"
+    "/dedupall - 全庫去重"
+)
+_RESET_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("重新設定", callback_data="setup_choose:reset")],
+])
+_SETUP_CHOICE_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("快速模板", callback_data="setup_choose:template"),
+        InlineKeyboardButton("自訂設定", callback_data="setup_choose:custom"),
+    ],
+])
+_SETUP_MODE_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("買房 (Buy)", callback_data="setup_mode:buy"),
+        InlineKeyboardButton("租房 (Rent)", callback_data="setup_mode:rent"),
+    ],
+])
+_SETUP_CONFIRM_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("確認", callback_data="setup_confirm:yes"),
+        InlineKeyboardButton("取消", callback_data="setup_confirm:no"),
+    ],
+])
+_TEMPLATE_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton(
+            f"{t['name']} — {t['description']}",
+            callback_data=f"setup_tpl:{t['id']}",
+        )]
+        for t in TEMPLATES
+    ]
+    + [[InlineKeyboardButton("返回", callback_data="setup_choose:back")]]
+)
+
+# Exports longer than this go out as a config.json document (Telegram caps text at 4096)
+_CONFIG_EXPORT_TEXT_LIMIT = 3500
+
+# Minimum seconds between in-place /dedupall progress edits
+_DEDUP_PROGRESS_INTERVAL = 2.0
+
+# Serializes pipeline runs and /dedupall; both mutate listings in bulk
+_pipeline_lock = asyncio.Lock()
+
+
+def _parse_region_input(text: str) -> tuple[list[int], str | None]:
+    """Parse comma-separated region names/codes. Returns (regions, first invalid token)."""
+    parts = [p for p in (raw.strip() for raw in text.translate(_REGION_SEPARATORS).split(",")) if p]
+    try:
+        return [_REGION_LOOKUP[p] for p in parts], None
+    except KeyError as e:
+        return [], e.args[0]
 
-# Pipeline lock
-_pipeline_running = False
+
+async def _edit_reply_markup_if_changed(query, context: ContextTypes.DEFAULT_TYPE, keyboard) -> None:
+    """Edit the inline keyboard unless it equals the one last sent to this message.
+
+    Telegram rejects no-op edits ("message is not modified") but still counts them.
+    """
+    message_id = getattr(query.message, "message_id", None)
+    last = context.user_data.get("_last_markup")
+    if last is not None and last == (message_id, keyboard):
+        return
+    try:
+        await query.edit_message_reply_markup(reply_markup=keyboard)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+    context.user_data["_last_markup"] = (message_id, keyboard)
+
+
+def _want_traceback(exc: Exception) -> bool:
+    """Whether a failure log should carry a traceback.
+
+    Network/IO (requests errors are OSError) and validation errors are expected;
+    their message is enough unless DEBUG logging is on.
+    """
+    return not isinstance(exc, (OSError, ValueError)) or logger.isEnabledFor(logging.DEBUG)
 
 
 def _auth_filter(chat_id: str) -> filters.BaseFilter:
@@ -88,38 +252,13 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int |
     db_config: DbConfig = context.bot_data["db_config"]
 
     if db_config.has_config():
-        keyboard = [
-            [
-                InlineKeyboardButton("重新設定", callback_data="setup_choose:reset"),
-            ]
-        ]
-        await update.message.reply_text(
-            "歡迎回來！可用指令：\n"
-            "/list - 瀏覽未讀物件\n"
-            "/settings - 修改設定\n"
-            "/status - 查看狀態\n"
-            "/favorites - 查看最愛\n"
-            "/run - 手動執行\n"
-            "/dedupall - 全庫去重\n"
-            "/pause - 暫停排程\n"
-            "/resume - 恢復排程\n"
-            "/loglevel - 調整日誌等級\n"
-            "/config_export - 匯出設定\n"
-            "/config_import - 匯入設定",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+        await update.message.reply_text(_WELCOME_BACK_TEXT, reply_markup=_RESET_KEYBOARD)
         return SETUP_TEMPLATE
 
     # First-time setup — choose template or custom
-    keyboard = [
-        [
-            InlineKeyboardButton("快速模板", callback_data="setup_choose:template"),
-            InlineKeyboardButton("自訂設定", callback_data="setup_choose:custom"),
-        ]
-    ]
     await update.message.reply_text(
         "歡迎使用 tw-homedog！\n\n請選擇設定方式：",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_SETUP_CHOICE_KEYBOARD,
     )
     return SETUP_TEMPLATE
 
@@ -133,44 +272,19 @@ async def setup_choose_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
     if choice == "template":
         # Show template list
-        buttons = []
-        for t in TEMPLATES:
-            buttons.append([InlineKeyboardButton(
-                f"{t['name']} — {t['description']}",
-                callback_data=f"setup_tpl:{t['id']}",
-            )])
-        buttons.append([InlineKeyboardButton("返回", callback_data="setup_choose:back")])
-        await query.edit_message_text(
-            "選擇一個快速模板：",
-            reply_markup=InlineKeyboardMarkup(buttons),
-        )
+        await query.edit_message_text("選擇一個快速模板：", reply_markup=_TEMPLATE_KEYBOARD)
         return SETUP_TEMPLATE
 
     elif choice in ("back", "reset"):
         # Go back to (or enter) template/custom choice
-        keyboard = [
-            [
-                InlineKeyboardButton("快速模板", callback_data="setup_choose:template"),
-                InlineKeyboardButton("自訂設定", callback_data="setup_choose:custom"),
-            ]
-        ]
-        await query.edit_message_text(
-            "請選擇設定方式：",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+        await query.edit_message_text("請選擇設定方式：", reply_markup=_SETUP_CHOICE_KEYBOARD)
         return SETUP_TEMPLATE
 
     else:
         # Custom setup — go to mode selection
-        keyboard = [
-            [
-                InlineKeyboardButton("買房 (Buy)", callback_data="setup_mode:buy"),
-                InlineKeyboardButton("租房 (Rent)", callback_data="setup_mode:rent"),
-            ]
-        ]
         await query.edit_message_text(
             "開始自訂設定。\n\n請選擇模式：",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_SETUP_MODE_KEYBOARD,
         )
         return SETUP_MODE
 
@@ -180,19 +294,19 @@ async def setup_template_callback(update: Update, context: ContextTypes.DEFAULT_
     query = update.callback_query
     await query.answer()
 
-    template_id = query.data.replace("setup_tpl:", "")
+    template_id = query.data.removeprefix("setup_tpl:")
     try:
         config_items = apply_template(template_id)
     except KeyError:
         await query.edit_message_text("模板不存在，請重新選擇。")
         return SETUP_TEMPLATE
 
-    context.user_data["setup"] = config_items
+    context.user_data["setup"] = SetupState.from_config_items(config_items)
 
     mode = config_items["search.mode"]
     region_name = _region_names(config_items["search.regions"])
     districts = ", ".join(config_items["search.districts"])
-    unit = "萬" if mode == "buy" else "元"
+    unit = _PRICE_UNIT.get(mode, "元")
     price_min = config_items["search.price_min"]
     price_max = config_items["search.price_max"]
     min_ping = config_items.get("search.min_ping")
@@ -200,7 +314,7 @@ async def setup_template_callback(update: Update, context: ContextTypes.DEFAULT_
 
     lines = [
         "模板設定摘要：",
-        f"模式：{'買房' if mode == 'buy' else '租房'}",
+        f"模式：{_MODE_LABEL.get(mode, '租房')}",
         f"地區：{region_name}",
         f"區域：{districts}",
         f"價格：{price_min:,}-{price_max:,} {unit}",
@@ -211,16 +325,7 @@ async def setup_template_callback(update: Update, context: ContextTypes.DEFAULT_
         lines.append(f"排除關鍵字：{', '.join(kw_exclude)}")
     lines.append("\n確認套用？")
 
-    keyboard = [
-        [
-            InlineKeyboardButton("確認", callback_data="setup_confirm:yes"),
-            InlineKeyboardButton("取消", callback_data="setup_confirm:no"),
-        ]
-    ]
-    await query.edit_message_text(
-        "\n".join(lines),
-        reply_markup=InlineKeyboardMarkup(keyboard),
-    )
+    await query.edit_message_text("\n".join(lines), reply_markup=_SETUP_CONFIRM_KEYBOARD)
     return SETUP_CONFIRM
 
 
@@ -230,10 +335,10 @@ async def setup_mode_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     mode = query.data.split(":")[1]
-    context.user_data["setup"] = {"search.mode": mode}
+    context.user_data["setup"] = SetupState(mode=mode)
 
     await query.edit_message_text(
-        f"已選擇：{'買房' if mode == 'buy' else '租房'}\n\n"
+        f"已選擇：{_MODE_LABEL.get(mode, '租房')}\n\n"
         "請輸入地區（多個地區用逗號分隔，例如：台北市,新北市）："
     )
     return SETUP_REGION
@@ -241,36 +346,27 @@ async def setup_mode_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def setup_region_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle region input in setup flow. Accepts Chinese name or numeric code."""
-    text = update.message.text.strip()
-    regions = []
-    for part in text.split(","):
-        part = part.strip().replace("，", "")
-        if not part:
-            continue
-        try:
-            regions.append(resolve_region(int(part) if part.isdigit() else part))
-        except (ValueError, TypeError):
-            region_list = ", ".join(REGION_CODES.keys())
-            await update.message.reply_text(
-                f"無效的地區：{part}\n請輸入中文名或代碼，多個地區用逗號分隔。\n支援的地區：{region_list}"
-            )
-            return SETUP_REGION
+    regions, invalid = _parse_region_input(update.message.text)
+    if invalid is not None:
+        await update.message.reply_text(
+            f"無效的地區：{invalid}\n請輸入中文名或代碼，多個地區用逗號分隔。\n支援的地區：{_REGION_LIST_TEXT}"
+        )
+        return SETUP_REGION
 
     if not regions:
         await update.message.reply_text("請至少輸入一個地區")
         return SETUP_REGION
 
-    setup = context.user_data["setup"]
-    setup["search.regions"] = regions
-
-    mode = setup.get("search.mode", "buy")
+    setup: SetupState = context.user_data["setup"]
+    mode = setup.mode
+    setup.regions = regions
 
     # Show district selection
-    selected = []
+    selected: set[str] = set()
     keyboard = _build_district_keyboard(regions, mode, selected)
     if keyboard is None:
         await update.message.reply_text(
-            f"{'租房' if mode == 'rent' else '買房'}模式不支援這些地區的區域選擇。"
+            f"{_MODE_LABEL.get(mode, '租房')}模式不支援這些地區的區域選擇。"
         )
         return SETUP_REGION
 
@@ -279,46 +375,47 @@ async def setup_region_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"地區：{region_name}\n請選擇區域（點擊切換，完成後按確認）：",
         reply_markup=keyboard,
     )
-    setup["_selected_districts"] = selected
+    setup.selected_districts = selected
     return SETUP_DISTRICTS
 
 
 async def setup_districts_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle district toggle in setup flow."""
     query = update.callback_query
-    await query.answer()
-
     data = query.data
-    setup = context.user_data["setup"]
-    selected = setup.get("_selected_districts", [])
+    setup: SetupState = context.user_data["setup"]
+    mode = setup.mode
+    regions = setup.regions
+    selected = setup.selected_districts
 
     if data == "district_confirm":
         if not selected:
             await query.answer("請至少選擇一個區域", show_alert=True)
             return SETUP_DISTRICTS
 
-        setup["search.districts"] = selected
-        del setup["_selected_districts"]
-
-        await query.edit_message_text(
-            f"已選擇區域：{', '.join(selected)}\n\n"
-            "請輸入價格範圍（格式：最低-最高）\n"
-            "買房單位：萬，租房單位：元\n"
-            "例如買房：1000-3000，租房：10000-30000"
+        setup.districts = _ordered_districts(regions, mode, selected)
+        setup.selected_districts = set()
+
+        await asyncio.gather(
+            query.answer(),
+            query.edit_message_text(
+                f"已選擇區域：{', '.join(setup.districts)}\n\n"
+                "請輸入價格範圍（格式：最低-最高）\n"
+                "買房單位：萬，租房單位：元\n"
+                "例如買房：1000-3000，租房：10000-30000"
+            ),
         )
         return SETUP_PRICE
 
     # Toggle district
-    district = data.replace("district_toggle:", "")
-    if district in selected:
-        selected.remove(district)
-    else:
-        selected.append(district)
+    district = data.removeprefix("district_toggle:")
+    selected ^= {district}
 
-    regions = setup.get("search.regions", [1])
-    mode = setup.get("search.mode", "buy")
     keyboard = _build_district_keyboard(regions, mode, selected)
-    await query.edit_message_reply_markup(reply_markup=keyboard)
+    await asyncio.gather(
+        query.answer(),
+        _edit_reply_markup_if_changed(query, context, keyboard),
+    )
     return SETUP_DISTRICTS
 
 
@@ -331,30 +428,24 @@ async def setup_price_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return SETUP_PRICE
 
     price_min, price_max = parsed
-    setup = context.user_data["setup"]
-    setup["search.price_min"] = price_min
-    setup["search.price_max"] = price_max
+    setup: SetupState = context.user_data["setup"]
+    mode = setup.mode
+    regions = setup.regions
+    setup.price_min = price_min
+    setup.price_max = price_max
 
-    mode = setup.get("search.mode", "buy")
-    unit = "萬" if mode == "buy" else "元"
-    regions = setup.get("search.regions", [1])
+    unit = _PRICE_UNIT.get(mode, "元")
     region_name = _region_names(regions)
 
     summary = (
         f"設定摘要：\n"
-        f"模式：{'買房' if mode == 'buy' else '租房'}\n"
+        f"模式：{_MODE_LABEL.get(mode, '租房')}\n"
         f"地區：{region_name}\n"
-        f"區域：{', '.join(setup.get('search.districts', []))}\n"
+        f"區域：{', '.join(setup.districts)}\n"
         f"價格：{price_min:,}-{price_max:,} {unit}\n\n"
         f"確認開始？"
     )
-    keyboard = [
-        [
-            InlineKeyboardButton("確認", callback_data="setup_confirm:yes"),
-            InlineKeyboardButton("取消", callback_data="setup_confirm:no"),
-        ]
-    ]
-    await update.message.reply_text(summary, reply_markup=InlineKeyboardMarkup(keyboard))
+    await update.message.reply_text(summary, reply_markup=_SETUP_CONFIRM_KEYBOARD)
     return SETUP_CONFIRM
 
 
@@ -369,26 +460,20 @@ async def setup_confirm_callback(update: Update, context: ContextTypes.DEFAULT_T
         return ConversationHandler.END
 
     db_config: DbConfig = context.bot_data["db_config"]
-    setup = context.user_data.pop("setup", {})
+    state: SetupState | None = context.user_data.pop("setup", None)
+    items = state.to_config_items() if state is not None else {}
 
     # Ensure telegram credentials from env are stored in DB
     chat_id = context.bot_data.get("chat_id")
     if chat_id:
-        setup["telegram.chat_id"] = chat_id
+        items["telegram.chat_id"] = chat_id
     bot_token = context.bot.token
     if bot_token:
-        setup["telegram.bot_token"] = bot_token
+        items["telegram.bot_token"] = bot_token
 
-    db_config.set_many(setup)
+    db_config.set_many(items)
 
-    await query.edit_message_text(
-        "設定完成！已開始自動排程。\n\n"
-        "可用指令：\n"
-        "/settings - 修改設定\n"
-        "/status - 查看狀態\n"
-        "/run - 手動執行\n"
-        "/dedupall - 全庫去重"
-    )
+    await query.edit_message_text(_SETUP_DONE_TEXT)
 
     # Start scheduler if not already running
     _ensure_scheduler(context)
@@ -405,63 +490,47 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         await update.message.reply_text("尚未設定，請先執行 /start")
         return
 
-    mode = db_config.get("search.mode", "buy")
-    regions = db_config.get("search.regions", [1])
-    districts = db_config.get("search.districts", [])
-    price_min = db_config.get("search.price_min", 0)
-    price_max = db_config.get("search.price_max", 0)
-    min_ping = db_config.get("search.min_ping")
-    max_ping = db_config.get("search.max_ping")
-    room_counts = db_config.get("search.room_counts", [])
-    bath_counts = db_config.get("search.bathroom_counts", [])
-    year_min = db_config.get("search.year_built_min")
-    year_max = db_config.get("search.year_built_max")
-    kw_include = db_config.get("search.keywords_include", [])
-    kw_exclude = db_config.get("search.keywords_exclude", [])
-    interval = db_config.get("scheduler.interval_minutes", 30)
-    last_run = db_config.get("scheduler.last_run_at", "未執行")
-    last_status = db_config.get("scheduler.last_run_status", "-")
-
-    unit = "萬" if mode == "buy" else "元"
+    settings = db_config.get_all()
+    mode = settings.get("search.mode", "buy")
+    regions = settings.get("search.regions", [1])
+    districts = settings.get("search.districts", [])
+    price_min = settings.get("search.price_min", 0)
+    price_max = settings.get("search.price_max", 0)
+    min_ping = settings.get("search.min_ping")
+    max_ping = settings.get("search.max_ping")
+    room_counts = settings.get("search.room_counts", [])
+    bath_counts = settings.get("search.bathroom_counts", [])
+    year_min = settings.get("search.year_built_min")
+    year_max = settings.get("search.year_built_max")
+    kw_include = settings.get("search.keywords_include", [])
+    kw_exclude = settings.get("search.keywords_exclude", [])
+    interval = settings.get("scheduler.interval_minutes", 30)
+    last_run = settings.get("scheduler.last_run_at", "未執行")
+    last_status = settings.get("scheduler.last_run_status", "-")
+
+    unit = _PRICE_UNIT.get(mode, "元")
     region_name = _region_names(regions)
     district_names = ", ".join(districts)
 
-    total = storage.get_listing_count()
-    unread = storage.get_unread_count()
+    total, unread = storage.get_listing_counts()
 
-    paused = db_config.get("scheduler.paused", False)
+    paused = settings.get("scheduler.paused", False)
     schedule_status = "已暫停" if paused else f"每 {interval} 分鐘"
 
+    optional_lines = (
+        _range_line("坪數", min_ping, max_ping, "坪"),
+        room_counts and f"房數：{', '.join(str(x) for x in room_counts)} 房",
+        bath_counts and f"衛數：{', '.join(str(x) for x in bath_counts)} 衛",
+        _range_line("屋齡", year_min, year_max, "年建"),
+        kw_include and f"包含關鍵字：{', '.join(kw_include)}",
+        kw_exclude and f"排除關鍵字：{', '.join(kw_exclude)}",
+    )
     lines = [
-        f"模式：{'買房' if mode == 'buy' else '租房'}",
+        f"模式：{_MODE_LABEL.get(mode, '租房')}",
         f"地區：{region_name}",
         f"區域：{district_names}",
         f"價格：{price_min:,}-{price_max:,} {unit}",
-    ]
-    if min_ping or max_ping:
-        if min_ping and max_ping:
-            lines.append(f"坪數：{min_ping}-{max_ping} 坪")
-        elif min_ping:
-            lines.append(f"坪數：≥ {min_ping} 坪")
-        elif max_ping:
-            lines.append(f"坪數：≤ {max_ping} 坪")
-    if room_counts:
-        lines.append(f"房數：{', '.join(str(x) for x in room_counts)} 房")
-    if bath_counts:
-        lines.append(f"衛數：{', '.join(str(x) for x in bath_counts)} 衛")
-    if year_min or year_max:
-        if year_min and year_max:
-            lines.append(f"屋齡：{year_min}-{year_max} 年建")
-        elif year_min:
-            lines.append(f"屋齡：≥ {year_min} 年建")
-        elif year_max:
-            lines.append(f"屋齡：≤ {year_max} 年建")
-    if kw_include:
-        lines.append(f"包含關鍵字：{', '.join(kw_include)}")
-    if kw_exclude:
-        lines.append(f"排除關鍵字：{', '.join(kw_exclude)}")
-
-    lines.extend([
+        *(line for line in optional_lines if line),
         "",
         f"排程：{schedule_status}",
         f"上次執行：{last_run}",
@@ -469,34 +538,32 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         "",
         f"物件總數：{total}",
         f"未讀：{unread}",
-    ])
+    ]
+    if _CUMULATIVE_METRICS["runs"]:
+        lines.append(
+            f"本次啟動累計：{_CUMULATIVE_METRICS['runs']} 次執行，"
+            f"新增 {_CUMULATIVE_METRICS['inserted']} 筆，"
+            f"略過重複 {_CUMULATIVE_METRICS['skipped_duplicate']} 筆"
+        )
 
     await update.message.reply_text("\n".join(lines))
 
 
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show command summary."""
-    await update.message.reply_text(
-        "可用指令：\n"
-        "/start - 引導/重新設定\n"
-        "/list - 瀏覽未讀物件\n"
-        "/settings - 修改設定\n"
-        "/status - 查看狀態\n"
-        "/run - 手動執行\n"
-        "/dedupall - 全庫去重\n"
-        "/pause - 暫停排程\n"
-        "/resume - 恢復排程\n"
-        "/loglevel - 調整日誌等級\n"
-        "/config_export - 匯出設定\n"
-        "/config_import - 匯入設定"
-    )
+    await update.message.reply_text(_HELP_TEXT)
 
 
 async def cmd_config_export(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Export current config as JSON for backup."""
     db_config: DbConfig = context.bot_data["db_config"]
     data = db_config.get_all()
-    text = json.dumps(data, ensure_ascii=False, indent=2)
+    text = await asyncio.to_thread(json.dumps, data, ensure_ascii=False, indent=2)
+    if len(text) > _CONFIG_EXPORT_TEXT_LIMIT:
+        document = io.BytesIO(text.encode("utf-8"))
+        document.name = "config.json"
+        await update.message.reply_document(document, caption="設定匯出（JSON）")
+        return
     await update.message.reply_text(
         "設定匯出（JSON）：\n```json\n" + text + "\n```",
         parse_mode="Markdown",
@@ -516,7 +583,7 @@ async def config_import_handler(update: Update, context: ContextTypes.DEFAULT_TY
     db_config: DbConfig = context.bot_data["db_config"]
     text = update.message.text.strip()
     try:
-        data = json.loads(text)
+        data = await asyncio.to_thread(json.loads, text)
         if not isinstance(data, dict):
             raise ValueError("需為 JSON 物件")
     except Exception as e:
@@ -535,8 +602,7 @@ async def config_import_handler(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def cmd_run(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /run command — manual pipeline trigger."""
-    global _pipeline_running
-    if _pipeline_running:
+    if _pipeline_lock.locked():
         await update.message.reply_text("Pipeline 正在執行中，請稍候")
         return
 
@@ -547,8 +613,7 @@ async def cmd_run(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def cmd_dedupall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /dedupall command — apply dedup cleanup until no groups remain."""
-    global _pipeline_running
-    if _pipeline_running:
+    if _pipeline_lock.locked():
         await update.message.reply_text("目前有任務執行中，請稍候再試")
         return
 
@@ -577,11 +642,11 @@ async def cmd_dedupall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
     paused_before = db_config.get("scheduler.paused", False)
     if not paused_before:
-        for job in context.job_queue.get_jobs_by_name("pipeline"):
-            job.schedule_removal()
+        _stop_scheduler(context)
 
-    _pipeline_running = True
-    started_at = datetime.now(timezone.utc)
+    # No await since the locked() check above, so this never blocks
+    await _pipeline_lock.acquire()
+    started = time.monotonic()
     rounds = 0
     total_merged = 0
     total_failed = 0
@@ -598,10 +663,15 @@ async def cmd_dedupall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             size_tolerance=size_tolerance,
             batch_size=1_000_000,
         )
-        await update.message.reply_text(
+        progress_header = (
             f"開始全庫去重（batch_size={batch_size}）\n"
             f"目前待處理：{initial['groups']} 組 / {initial['projected_merge_records']} 筆"
         )
+        # One progress message edited in place (throttled) instead of one per round
+        progress_msg = await update.message.reply_text(progress_header)
+        last_progress = time.monotonic()
+        remaining_groups = int(initial.get("groups", 0))
+        remaining_records = int(initial.get("projected_merge_records", 0))
 
         while rounds < max_rounds:
             rounds += 1
@@ -617,23 +687,21 @@ async def cmd_dedupall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             total_merged += int(report.get("merged_records", 0))
             total_failed += int(report.get("cleanup_failed", 0))
             last_validation = report.get("validation", {}) or {}
+            # The apply round already reports what is left — no dry-run rescan
+            remaining_groups = int(report.get("remaining_groups", 0))
+            remaining_records = int(report.get("remaining_records", 0))
 
-            remaining = await asyncio.to_thread(
-                run_cleanup,
-                storage,
-                dry_run=True,
-                threshold=threshold,
-                price_tolerance=price_tolerance,
-                size_tolerance=size_tolerance,
-                batch_size=1_000_000,
-            )
-            remaining_groups = int(remaining.get("groups", 0))
-            remaining_records = int(remaining.get("projected_merge_records", 0))
-
-            await update.message.reply_text(
-                f"第 {rounds} 輪完成：合併 {report['merged_records']} 筆，"
-                f"失敗 {report['cleanup_failed']}，剩餘 {remaining_groups} 組 / {remaining_records} 筆"
-            )
+            now = time.monotonic()
+            if now - last_progress >= _DEDUP_PROGRESS_INTERVAL:
+                last_progress = now
+                try:
+                    await progress_msg.edit_text(
+                        f"{progress_header}\n\n"
+                        f"第 {rounds} 輪完成：合併 {report['merged_records']} 筆，"
+                        f"失敗 {report['cleanup_failed']}，剩餘 {remaining_groups} 組 / {remaining_records} 筆"
+                    )
+                except TelegramError:
+                    logger.debug("dedupall progress edit failed", exc_info=True)
 
             if remaining_groups == 0:
                 break
@@ -646,30 +714,21 @@ async def cmd_dedupall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                 await update.message.reply_text("偵測到 cleanup failed，已停止以避免持續失敗。")
                 break
 
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
-        final_dry = await asyncio.to_thread(
-            run_cleanup,
-            storage,
-            dry_run=True,
-            threshold=threshold,
-            price_tolerance=price_tolerance,
-            size_tolerance=size_tolerance,
-            batch_size=1_000_000,
-        )
+        duration = time.monotonic() - started
         await update.message.reply_text(
             "去重完成\n"
             f"輪次：{rounds}\n"
             f"總合併：{total_merged} 筆\n"
             f"總失敗：{total_failed}\n"
-            f"剩餘：{final_dry['groups']} 組 / {final_dry['projected_merge_records']} 筆\n"
+            f"剩餘：{remaining_groups} 組 / {remaining_records} 筆\n"
             f"關聯驗證：{last_validation}\n"
             f"耗時：{duration:.1f}s"
         )
     except Exception as e:
-        logger.error("dedupall failed: %s", e, exc_info=True)
+        logger.error("dedupall failed: %s", e, exc_info=_want_traceback(e))
         await update.message.reply_text(f"去重失敗：{e}")
     finally:
-        _pipeline_running = False
+        _pipeline_lock.release()
         if not paused_before:
             _ensure_scheduler(context)
 
@@ -683,9 +742,7 @@ async def cmd_pause(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     db_config.set("scheduler.paused", True)
-    jobs = context.job_queue.get_jobs_by_name("pipeline")
-    for job in jobs:
-        job.schedule_removal()
+    _stop_scheduler(context)
 
     await update.message.reply_text("已暫停自動執行")
 
@@ -728,233 +785,284 @@ async def cmd_loglevel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 # Settings handlers
 # =============================================================================
 
-async def cmd_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle /settings command — show settings menu."""
-    keyboard = [
-        [
-            InlineKeyboardButton("模式", callback_data="settings:mode"),
-            InlineKeyboardButton("地區", callback_data="settings:region"),
-        ],
-        [
-            InlineKeyboardButton("區域", callback_data="settings:districts"),
-        ],
+_SETTINGS_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("模式", callback_data="settings:mode"),
+        InlineKeyboardButton("地區", callback_data="settings:region"),
+    ],
+    [
+        InlineKeyboardButton("區域", callback_data="settings:districts"),
+    ],
+    [
+        InlineKeyboardButton("價格", callback_data="settings:price"),
+        InlineKeyboardButton("坪數", callback_data="settings:size"),
+    ],
+    [
+        InlineKeyboardButton("格局", callback_data="settings:layout"),
+        InlineKeyboardButton("屋齡", callback_data="settings:year"),
+    ],
+    [
+        InlineKeyboardButton("關鍵字", callback_data="settings:keywords"),
+        InlineKeyboardButton("頁數", callback_data="settings:pages"),
+    ],
+    [
+        InlineKeyboardButton("排程", callback_data="settings:schedule"),
+        InlineKeyboardButton("地圖", callback_data="settings:maps"),
+    ],
+])
+
+
+_MAPS_PANEL_KEYS = ["maps.enabled", "maps.api_key", "maps.monthly_limit"]
+
+# Settings panel / prompt templates
+_MAPS_PANEL_TEXT = "地圖縮圖設定\n狀態：{status}\nAPI Key：{key_status}\n每月 API 上限：{monthly_limit}{usage_line}"
+_MAPS_USAGE_LINE = "\n本月用量：{used}/{limit}"
+_PAGES_PROMPT = "當前最大查看頁數：{}\n請輸入新的頁數（1-20）："
+_SCHEDULE_PROMPT = "當前排程間隔：{} 分鐘\n請輸入新的間隔（分鐘）："
+_MONTHLY_LIMIT_PROMPT = "當前每月 API 上限：{}\n請輸入新的每月上限（0 = 無限制）："
+
+
+@functools.lru_cache(maxsize=64)
+def _build_maps_markup(enabled: bool, monthly_limit: int) -> InlineKeyboardMarkup:
+    """Maps settings panel keyboard; markups are immutable so they are shared."""
+    return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("價格", callback_data="settings:price"),
-            InlineKeyboardButton("坪數", callback_data="settings:size"),
+            InlineKeyboardButton(
+                f"{'🟢' if enabled else '⚪'} {'關閉' if enabled else '開啟'}地圖縮圖",
+                callback_data="set_maps:toggle",
+            ),
         ],
         [
-            InlineKeyboardButton("格局", callback_data="settings:layout"),
-            InlineKeyboardButton("屋齡", callback_data="settings:year"),
+            InlineKeyboardButton("🔑 設定 API Key", callback_data="set_maps:apikey"),
         ],
         [
-            InlineKeyboardButton("關鍵字", callback_data="settings:keywords"),
-            InlineKeyboardButton("頁數", callback_data="settings:pages"),
+            InlineKeyboardButton(f"📊 每月上限：{monthly_limit}", callback_data="set_maps:monthly_limit"),
         ],
+    ])
+
+
+async def cmd_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Handle /settings command — show settings menu."""
+    await update.message.reply_text("設定選單：", reply_markup=_SETTINGS_MENU_MARKUP)
+    return SETTINGS_MENU
+
+
+async def _settings_mode(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Show the buy/rent mode picker."""
+    mode = db_config.get("search.mode", "buy")
+    keyboard = [
         [
-            InlineKeyboardButton("排程", callback_data="settings:schedule"),
-            InlineKeyboardButton("地圖", callback_data="settings:maps"),
-        ],
+            InlineKeyboardButton(
+                f"{'✅ ' if mode == 'buy' else ''}買房",
+                callback_data="set_mode:buy",
+            ),
+            InlineKeyboardButton(
+                f"{'✅ ' if mode == 'rent' else ''}租房",
+                callback_data="set_mode:rent",
+            ),
+        ]
     ]
-    await update.message.reply_text(
-        "設定選單：", reply_markup=InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text("選擇搜尋模式：", reply_markup=InlineKeyboardMarkup(keyboard))
+    return SETTINGS_MENU
+
+
+async def _settings_region(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new region list."""
+    regions = db_config.get("search.regions", [])
+    current = _region_names(regions) if regions else "未設定"
+    await query.edit_message_text(
+        f"當前地區：{current}\n"
+        f"請輸入地區（多個地區用逗號分隔，例如：台北市,新北市）：\n\n"
+        f"支援的地區：{_REGION_LIST_TEXT}"
     )
+    return SETTINGS_REGION_INPUT
+
+
+async def _settings_districts(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Show the district toggle keyboard for the current regions."""
+    selected = db_config.get("search.districts", [])
+    regions = db_config.get("search.regions", [1])
+    mode = db_config.get("search.mode", "buy")
+    context.user_data["_selected_districts"] = set(selected)
+    keyboard = _build_district_keyboard(regions, mode, selected)
+    if keyboard is None:
+        await query.edit_message_text("目前地區不支援區域選擇。")
+        return ConversationHandler.END
+    await query.edit_message_text("點擊切換區域，完成後按確認：", reply_markup=keyboard)
     return SETTINGS_MENU
 
 
-async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
-    """Route settings menu button presses."""
-    query = update.callback_query
-    await query.answer()
-    data = query.data
+async def _settings_price(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new price range."""
+    mode = db_config.get("search.mode", "buy")
+    unit = _PRICE_UNIT.get(mode, "元")
+    price_min = db_config.get("search.price_min", 0)
+    price_max = db_config.get("search.price_max", 0)
+    await query.edit_message_text(
+        f"當前價格：{price_min:,}-{price_max:,} {unit}\n"
+        f"請輸入新的價格範圍（格式：最低-最高）："
+    )
+    return SETTINGS_PRICE_INPUT
 
-    db_config: DbConfig = context.bot_data["db_config"]
 
-    if data == "settings:mode":
-        mode = db_config.get("search.mode", "buy")
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    f"{'✅ ' if mode == 'buy' else ''}買房",
-                    callback_data="set_mode:buy",
-                ),
-                InlineKeyboardButton(
-                    f"{'✅ ' if mode == 'rent' else ''}租房",
-                    callback_data="set_mode:rent",
-                ),
-            ]
-        ]
-        await query.edit_message_text("選擇搜尋模式：", reply_markup=InlineKeyboardMarkup(keyboard))
-        return SETTINGS_MENU
+async def _settings_size(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new size (ping) range."""
+    min_ping = db_config.get("search.min_ping")
+    max_ping = db_config.get("search.max_ping")
+    if min_ping and max_ping:
+        current = f"{min_ping}-{max_ping} 坪"
+    elif min_ping:
+        current = f"≥ {min_ping} 坪"
+    elif max_ping:
+        current = f"≤ {max_ping} 坪"
+    else:
+        current = "未設定"
+    await query.edit_message_text(
+        f"當前坪數範圍：{current}\n"
+        "請輸入坪數範圍（格式：最小-最大，0 代表不限，僅輸入一個數值表示最小值）："
+    )
+    return SETTINGS_SIZE_INPUT
 
-    elif data == "settings:region":
-        regions = db_config.get("search.regions", [])
-        current = _region_names(regions) if regions else "未設定"
-        region_list = ", ".join(REGION_CODES.keys())
-        await query.edit_message_text(
-            f"當前地區：{current}\n"
-            f"請輸入地區（多個地區用逗號分隔，例如：台北市,新北市）：\n\n"
-            f"支援的地區：{region_list}"
-        )
-        return SETTINGS_REGION_INPUT
 
-    elif data == "settings:districts":
-        selected = db_config.get("search.districts", [])
-        regions = db_config.get("search.regions", [1])
-        mode = db_config.get("search.mode", "buy")
-        context.user_data["_selected_districts"] = list(selected)
-        keyboard = _build_district_keyboard(regions, mode, selected)
-        if keyboard is None:
-            await query.edit_message_text("目前地區不支援區域選擇。")
-            return ConversationHandler.END
-        await query.edit_message_text("點擊切換區域，完成後按確認：", reply_markup=keyboard)
-        return SETTINGS_MENU
+async def _settings_year(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new year-built range."""
+    year_min = db_config.get("search.year_built_min")
+    year_max = db_config.get("search.year_built_max")
+    if year_min and year_max:
+        current = f"{year_min}-{year_max} 年"
+    elif year_min:
+        current = f"≥ {year_min} 年"
+    elif year_max:
+        current = f"≤ {year_max} 年"
+    else:
+        current = "未設定"
+    await query.edit_message_text(
+        f"當前屋齡（建造年份）範圍：{current}\n"
+        "請輸入年份範圍（格式：YYYY-YYYY，0 代表不限，僅輸入一個年份表示最小值）："
+    )
+    return SETTINGS_YEAR_INPUT
 
-    elif data == "settings:price":
-        mode = db_config.get("search.mode", "buy")
-        unit = "萬" if mode == "buy" else "元"
-        price_min = db_config.get("search.price_min", 0)
-        price_max = db_config.get("search.price_max", 0)
-        await query.edit_message_text(
-            f"當前價格：{price_min:,}-{price_max:,} {unit}\n"
-            f"請輸入新的價格範圍（格式：最低-最高）："
-        )
-        return SETTINGS_PRICE_INPUT
 
-    elif data == "settings:size":
-        min_ping = db_config.get("search.min_ping")
-        max_ping = db_config.get("search.max_ping")
-        if min_ping and max_ping:
-            current = f"{min_ping}-{max_ping} 坪"
-        elif min_ping:
-            current = f"≥ {min_ping} 坪"
-        elif max_ping:
-            current = f"≤ {max_ping} 坪"
-        else:
-            current = "未設定"
-        await query.edit_message_text(
-            f"當前坪數範圍：{current}\n"
-            "請輸入坪數範圍（格式：最小-最大，0 代表不限，僅輸入一個數值表示最小值）："
-        )
-        return SETTINGS_SIZE_INPUT
+async def _settings_layout(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Show the room/bath count toggles."""
+    room_counts = db_config.get("search.room_counts", [])
+    bath_counts = db_config.get("search.bathroom_counts", [])
+    keyboard = _build_layout_keyboard(room_counts, bath_counts)
+    await query.edit_message_text("選擇房/衛數（可多選）：", reply_markup=keyboard)
+    return SETTINGS_MENU
 
-    elif data == "settings:year":
-        year_min = db_config.get("search.year_built_min")
-        year_max = db_config.get("search.year_built_max")
-        if year_min and year_max:
-            current = f"{year_min}-{year_max} 年"
-        elif year_min:
-            current = f"≥ {year_min} 年"
-        elif year_max:
-            current = f"≤ {year_max} 年"
-        else:
-            current = "未設定"
-        await query.edit_message_text(
-            f"當前屋齡（建造年份）範圍：{current}\n"
-            "請輸入年份範圍（格式：YYYY-YYYY，0 代表不限，僅輸入一個年份表示最小值）："
-        )
-        return SETTINGS_YEAR_INPUT
 
-    elif data == "settings:layout":
-        room_counts = db_config.get("search.room_counts", [])
-        bath_counts = db_config.get("search.bathroom_counts", [])
-        keyboard = _build_layout_keyboard(room_counts, bath_counts)
-        await query.edit_message_text("選擇房/衛數（可多選）：", reply_markup=keyboard)
-        return SETTINGS_MENU
+async def _settings_keywords(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Open the keyword panel."""
+    logger.debug("Entering keyword settings, returning SETTINGS_KW_MENU state")
+    kw_include = db_config.get("search.keywords_include", [])
+    kw_exclude = db_config.get("search.keywords_exclude", [])
+    keyboard = _build_keyword_keyboard(kw_include, kw_exclude)
+    await query.edit_message_text(
+        "關鍵字設定\n點擊關鍵字可刪除，使用下方按鈕新增：",
+        reply_markup=keyboard,
+    )
+    return SETTINGS_KW_MENU
 
-    elif data == "settings:keywords":
-        logger.info("Entering keyword settings, returning SETTINGS_KW_MENU state")
-        kw_include = db_config.get("search.keywords_include", [])
-        kw_exclude = db_config.get("search.keywords_exclude", [])
-        keyboard = _build_keyword_keyboard(kw_include, kw_exclude)
-        await query.edit_message_text(
-            "關鍵字設定\n點擊關鍵字可刪除，使用下方按鈕新增：",
-            reply_markup=keyboard,
-        )
-        return SETTINGS_KW_MENU
 
-    elif data == "settings:pages":
-        max_pages = db_config.get("search.max_pages", 3)
-        await query.edit_message_text(
-            f"當前最大查看頁數：{max_pages}\n"
-            "請輸入新的頁數（1-20）："
-        )
-        return SETTINGS_PAGES_INPUT
+async def _settings_pages(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new max page count."""
+    max_pages = db_config.get("search.max_pages", 3)
+    await query.edit_message_text(_PAGES_PROMPT.format(max_pages))
+    return SETTINGS_PAGES_INPUT
 
-    elif data == "settings:schedule":
-        interval = db_config.get("scheduler.interval_minutes", 30)
-        await query.edit_message_text(
-            f"當前排程間隔：{interval} 分鐘\n"
-            "請輸入新的間隔（分鐘）："
-        )
-        return SETTINGS_SCHEDULE_INPUT
 
-    elif data == "settings:maps":
-        enabled = db_config.get("maps.enabled", False)
-        has_key = bool(db_config.get("maps.api_key"))
-        monthly_limit = db_config.get("maps.monthly_limit", DEFAULTS["maps.monthly_limit"])
-        status = "已開啟" if enabled else "已關閉"
-        key_status = "已設定" if has_key else "未設定"
-        # Show this month's usage if provider available
-        usage_line = ""
-        if enabled and has_key:
-            provider = _get_map_provider(db_config)
-            if provider:
-                used, limit = provider.get_monthly_usage()
-                limit_label = "無限制" if limit <= 0 else str(limit)
-                usage_line = f"\n本月用量：{used}/{limit_label}"
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    f"{'🟢' if enabled else '⚪'} {'關閉' if enabled else '開啟'}地圖縮圖",
-                    callback_data="set_maps:toggle",
-                ),
-            ],
-            [
-                InlineKeyboardButton("🔑 設定 API Key", callback_data="set_maps:apikey"),
-            ],
-            [
-                InlineKeyboardButton(f"📊 每月上限：{monthly_limit}", callback_data="set_maps:monthly_limit"),
-            ],
-        ]
-        await query.edit_message_text(
-            f"地圖縮圖設定\n狀態：{status}\nAPI Key：{key_status}\n每月 API 上限：{monthly_limit}{usage_line}",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
-        return SETTINGS_MENU
+async def _settings_schedule(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Prompt for a new schedule interval."""
+    interval = db_config.get("scheduler.interval_minutes", 30)
+    await query.edit_message_text(_SCHEDULE_PROMPT.format(interval))
+    return SETTINGS_SCHEDULE_INPUT
+
+
+async def _render_maps_panel(db_config: DbConfig, include_usage: bool) -> tuple[str, InlineKeyboardMarkup]:
+    """Text and keyboard for the map thumbnail settings panel."""
+    cfg = db_config.get_many(_MAPS_PANEL_KEYS, DEFAULTS)
+    enabled = cfg["maps.enabled"]
+    has_key = bool(cfg["maps.api_key"])
+    monthly_limit = cfg["maps.monthly_limit"]
+    # Show this month's usage if provider available
+    usage_line = ""
+    if include_usage and enabled and has_key:
+        usage = await asyncio.to_thread(_maps_usage, db_config)
+        if usage:
+            used, limit = usage
+            limit_label = "無限制" if limit <= 0 else str(limit)
+            usage_line = _MAPS_USAGE_LINE.format(used=used, limit=limit_label)
+    text = _MAPS_PANEL_TEXT.format(
+        status="已開啟" if enabled else "已關閉",
+        key_status="已設定" if has_key else "未設定",
+        monthly_limit=monthly_limit,
+        usage_line=usage_line,
+    )
+    return text, _build_maps_markup(enabled, monthly_limit)
+
+
+async def _settings_maps(query, context: ContextTypes.DEFAULT_TYPE, db_config: DbConfig) -> int | None:
+    """Show the map thumbnail settings panel."""
+    text, markup = await _render_maps_panel(db_config, include_usage=True)
+    await query.edit_message_text(text, reply_markup=markup)
+    return SETTINGS_MENU
+
+
+# callback_data → settings menu sub-handler
+_SETTINGS_ROUTES = {
+    "settings:mode": _settings_mode,
+    "settings:region": _settings_region,
+    "settings:districts": _settings_districts,
+    "settings:price": _settings_price,
+    "settings:size": _settings_size,
+    "settings:year": _settings_year,
+    "settings:layout": _settings_layout,
+    "settings:keywords": _settings_keywords,
+    "settings:pages": _settings_pages,
+    "settings:schedule": _settings_schedule,
+    "settings:maps": _settings_maps,
+}
 
-    return None
+
+async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
+    """Route settings menu button presses."""
+    query = update.callback_query
+    await query.answer()
+
+    handler = _SETTINGS_ROUTES.get(query.data)
+    if handler is None:
+        return None
+    db_config: DbConfig = context.bot_data["db_config"]
+    return await handler(query, context, db_config)
 
 
 async def set_mode_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle mode change from settings."""
     query = update.callback_query
-    await query.answer()
 
     mode = query.data.split(":")[1]
     db_config: DbConfig = context.bot_data["db_config"]
     db_config.set("search.mode", mode)
 
-    label = "買房" if mode == "buy" else "租房"
-    summary = _config_summary(db_config)
-    await query.edit_message_text(f"已更新搜尋模式為: {label}\n\n{summary}")
+    label = _MODE_LABEL.get(mode, "租房")
+    summary = await _load_config_summary(db_config)
+    # Answer and edit are independent API calls — overlap the round trips
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(f"已更新搜尋模式為: {label}\n\n{summary}"),
+    )
     return ConversationHandler.END
 
 
 async def settings_region_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle region text input from settings."""
-    text = update.message.text.strip()
-    parts = [p.strip() for p in text.split(",") if p.strip()]
-
-    regions = []
-    for part in parts:
-        try:
-            regions.append(resolve_region(int(part) if part.isdigit() else part))
-        except (ValueError, TypeError):
-            region_list = ", ".join(REGION_CODES.keys())
-            await update.message.reply_text(
-                f"無效的地區：{part}\n請輸入中文名或代碼，多個地區用逗號分隔。\n支援的地區：{region_list}"
-            )
-            return SETTINGS_REGION_INPUT
+    regions, invalid = _parse_region_input(update.message.text)
+    if invalid is not None:
+        await update.message.reply_text(
+            f"無效的地區：{invalid}\n請輸入中文名或代碼，多個地區用逗號分隔。\n支援的地區：{_REGION_LIST_TEXT}"
+        )
+        return SETTINGS_REGION_INPUT
 
     if not regions:
         await update.message.reply_text("請至少輸入一個地區")
@@ -964,7 +1072,7 @@ async def settings_region_handler(update: Update, context: ContextTypes.DEFAULT_
     db_config.set("search.regions", regions)
 
     region_name = _region_names(regions)
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"已更新地區：{region_name}\n\n{summary}")
     return ConversationHandler.END
 
@@ -972,36 +1080,37 @@ async def settings_region_handler(update: Update, context: ContextTypes.DEFAULT_
 async def settings_district_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle district toggle from settings."""
     query = update.callback_query
-    await query.answer()
-
     data = query.data
-    selected = context.user_data.get("_selected_districts", [])
+    selected: set[str] = context.user_data.setdefault("_selected_districts", set())
+    db_config: DbConfig = context.bot_data["db_config"]
+    regions = db_config.get("search.regions", [1])
+    mode = db_config.get("search.mode", "buy")
 
     if data == "district_confirm":
         if not selected:
             await query.answer("請至少選擇一個區域", show_alert=True)
             return SETTINGS_MENU
 
-        db_config: DbConfig = context.bot_data["db_config"]
-        db_config.set("search.districts", selected)
+        districts = _ordered_districts(regions, mode, selected)
+        db_config.set("search.districts", districts)
         context.user_data.pop("_selected_districts", None)
 
-        names = ", ".join(selected)
-        summary = _config_summary(db_config)
-        await query.edit_message_text(f"已更新區域：{names}\n\n{summary}")
+        names = ", ".join(districts)
+        summary = await _load_config_summary(db_config)
+        await asyncio.gather(
+            query.answer(),
+            query.edit_message_text(f"已更新區域：{names}\n\n{summary}"),
+        )
         return ConversationHandler.END
 
-    district = data.replace("district_toggle:", "")
-    if district in selected:
-        selected.remove(district)
-    else:
-        selected.append(district)
+    district = data.removeprefix("district_toggle:")
+    selected ^= {district}
 
-    db_config: DbConfig = context.bot_data["db_config"]
-    regions = db_config.get("search.regions", [1])
-    mode = db_config.get("search.mode", "buy")
     keyboard = _build_district_keyboard(regions, mode, selected)
-    await query.edit_message_reply_markup(reply_markup=keyboard)
+    await asyncio.gather(
+        query.answer(),
+        _edit_reply_markup_if_changed(query, context, keyboard),
+    )
     return SETTINGS_MENU
 
 
@@ -1018,32 +1127,28 @@ async def settings_price_handler(update: Update, context: ContextTypes.DEFAULT_T
     db_config.set_many({"search.price_min": price_min, "search.price_max": price_max})
 
     mode = db_config.get("search.mode", "buy")
-    unit = "萬" if mode == "buy" else "元"
-    summary = _config_summary(db_config)
+    unit = _PRICE_UNIT.get(mode, "元")
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"已更新價格範圍：{price_min:,}-{price_max:,} {unit}\n\n{summary}")
     return ConversationHandler.END
 
 
+_RANGE_SINGLE_RE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*")
+_RANGE_PAIR_RE = re.compile(r"\s*(\d+(?:\.\d+)?)?\s*[-，]\s*(\d+(?:\.\d+)?)?\s*")
+
+
 def _parse_range(text: str) -> tuple[float | None, float | None] | None:
     """Parse 'min-max' ranges; allows single value (treated as min), 0 for no bound."""
-    text = text.replace("，", "-").replace(" ", "")
-    parts = text.split("-")
-    if len(parts) == 1:
-        try:
-            val = float(parts[0])
-        except ValueError:
-            return None
-        min_val = None if val == 0 else val
-        return (min_val, None)
-    if len(parts) != 2:
+    m = _RANGE_SINGLE_RE.fullmatch(text)
+    if m is not None:
+        val = float(m.group(1))
+        return (val or None, None)
+    m = _RANGE_PAIR_RE.fullmatch(text)
+    if m is None:
         return None
-    try:
-        low = float(parts[0]) if parts[0] else 0.0
-        high = float(parts[1]) if parts[1] else 0.0
-    except ValueError:
-        return None
-    min_val = None if low == 0 else low
-    max_val = None if high == 0 else high
+    low, high = (float(g) if g else 0.0 for g in m.groups())
+    min_val = low or None
+    max_val = high or None
     if min_val is not None and max_val is not None and min_val > max_val:
         return None
     return (min_val, max_val)
@@ -1070,7 +1175,7 @@ async def settings_size_handler(update: Update, context: ContextTypes.DEFAULT_TY
     else:
         msg = "已取消坪數限制"
 
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"{msg}\n\n{summary}")
     return ConversationHandler.END
 
@@ -1105,74 +1210,98 @@ async def settings_year_handler(update: Update, context: ContextTypes.DEFAULT_TY
     else:
         msg = "已取消屋齡限制"
 
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"{msg}\n\n{summary}")
     return ConversationHandler.END
 
 
-async def settings_kw_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle all keyword panel button presses."""
-    query = update.callback_query
-    await query.answer()
-    data = query.data
+async def _kw_add_include(query, db_config: DbConfig, arg: str) -> int:
+    """Prompt for keywords to include."""
+    await query.edit_message_text("請輸入要包含的關鍵字（多個用逗號分隔，例如：電梯,車位）：")
+    return SETTINGS_KW_INCLUDE_INPUT
 
-    logger.info("settings_kw_callback triggered with data: %s", data)
-    db_config: DbConfig = context.bot_data["db_config"]
 
-    if data == "kw_add_include":
-        await query.edit_message_text("請輸入要包含的關鍵字（多個用逗號分隔，例如：電梯,車位）：")
-        return SETTINGS_KW_INCLUDE_INPUT
+async def _kw_add_exclude(query, db_config: DbConfig, arg: str) -> int:
+    """Prompt for keywords to exclude."""
+    await query.edit_message_text("請輸入要排除的關鍵字（多個用逗號分隔，例如：頂加,工業宅）：")
+    return SETTINGS_KW_EXCLUDE_INPUT
 
-    elif data == "kw_add_exclude":
-        await query.edit_message_text("請輸入要排除的關鍵字（多個用逗號分隔，例如：頂加,工業宅）：")
-        return SETTINGS_KW_EXCLUDE_INPUT
 
-    elif data.startswith("kw_del_i:"):
-        kw = data.replace("kw_del_i:", "")
-        current = db_config.get("search.keywords_include", [])
-        if kw in current:
-            current.remove(kw)
-            db_config.set("search.keywords_include", current)
-        kw_exclude = db_config.get("search.keywords_exclude", [])
-        keyboard = _build_keyword_keyboard(current, kw_exclude)
-        await query.edit_message_text(
-            f"已刪除包含關鍵字：{kw}\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
-            reply_markup=keyboard,
-        )
-        return SETTINGS_KW_MENU
+async def _kw_delete_include(query, db_config: DbConfig, kw: str) -> int:
+    """Remove one include keyword and redraw the panel."""
+    current = db_config.get("search.keywords_include", [])
+    if kw in current:
+        current.remove(kw)
+        db_config.set("search.keywords_include", current)
+    kw_exclude = db_config.get("search.keywords_exclude", [])
+    keyboard = _build_keyword_keyboard(current, kw_exclude)
+    await query.edit_message_text(
+        f"已刪除包含關鍵字：{kw}\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
+        reply_markup=keyboard,
+    )
+    return SETTINGS_KW_MENU
 
-    elif data.startswith("kw_del_e:"):
-        kw = data.replace("kw_del_e:", "")
-        current = db_config.get("search.keywords_exclude", [])
-        if kw in current:
-            current.remove(kw)
-            db_config.set("search.keywords_exclude", current)
-        kw_include = db_config.get("search.keywords_include", [])
-        keyboard = _build_keyword_keyboard(kw_include, current)
-        await query.edit_message_text(
-            f"已刪除排除關鍵字：{kw}\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
-            reply_markup=keyboard,
-        )
-        return SETTINGS_KW_MENU
 
-    elif data == "kw_clear":
-        db_config.set_many({"search.keywords_include": [], "search.keywords_exclude": []})
-        keyboard = _build_keyword_keyboard([], [])
-        await query.edit_message_text(
-            "已清除所有關鍵字\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
-            reply_markup=keyboard,
-        )
-        return SETTINGS_KW_MENU
+async def _kw_delete_exclude(query, db_config: DbConfig, kw: str) -> int:
+    """Remove one exclude keyword and redraw the panel."""
+    current = db_config.get("search.keywords_exclude", [])
+    if kw in current:
+        current.remove(kw)
+        db_config.set("search.keywords_exclude", current)
+    kw_include = db_config.get("search.keywords_include", [])
+    keyboard = _build_keyword_keyboard(kw_include, current)
+    await query.edit_message_text(
+        f"已刪除排除關鍵字：{kw}\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
+        reply_markup=keyboard,
+    )
+    return SETTINGS_KW_MENU
 
-    elif data == "kw_done":
-        summary = _config_summary(db_config)
-        await query.edit_message_text(f"關鍵字設定完成\n\n{summary}")
-        return ConversationHandler.END
 
-    # kw_noop — do nothing
+async def _kw_clear(query, db_config: DbConfig, arg: str) -> int:
+    """Drop all include/exclude keywords."""
+    db_config.set_many({"search.keywords_include": [], "search.keywords_exclude": []})
+    keyboard = _build_keyword_keyboard([], [])
+    await query.edit_message_text(
+        "已清除所有關鍵字\n\n點擊關鍵字可刪除，使用下方按鈕新增：",
+        reply_markup=keyboard,
+    )
     return SETTINGS_KW_MENU
 
 
+async def _kw_done(query, db_config: DbConfig, arg: str) -> int:
+    """Close the keyword panel with a config summary."""
+    summary = await _load_config_summary(db_config)
+    await query.edit_message_text(f"關鍵字設定完成\n\n{summary}")
+    return ConversationHandler.END
+
+
+# callback_data prefix (before ":") → keyword panel sub-handler
+_KW_ROUTES = {
+    "kw_add_include": _kw_add_include,
+    "kw_add_exclude": _kw_add_exclude,
+    "kw_del_i": _kw_delete_include,
+    "kw_del_e": _kw_delete_exclude,
+    "kw_clear": _kw_clear,
+    "kw_done": _kw_done,
+}
+
+
+async def settings_kw_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Handle all keyword panel button presses."""
+    query = update.callback_query
+    await query.answer()
+    data = query.data
+
+    logger.debug("settings_kw_callback triggered with data: %s", data)
+    action, _, arg = data.partition(":")
+    handler = _KW_ROUTES.get(action)
+    if handler is None:
+        # kw_noop — do nothing
+        return SETTINGS_KW_MENU
+    db_config: DbConfig = context.bot_data["db_config"]
+    return await handler(query, db_config, arg)
+
+
 async def layout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle layout (room/bath) toggles."""
     query = update.callback_query
@@ -1182,12 +1311,13 @@ async def layout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     db_config: DbConfig = context.bot_data["db_config"]
     rooms = set(db_config.get("search.room_counts", []) or [])
     baths = set(db_config.get("search.bathroom_counts", []) or [])
+    before = (frozenset(rooms), frozenset(baths))
 
     if data == "layout:clear":
         rooms.clear()
         baths.clear()
     elif data == "layout:done":
-        summary = _config_summary(db_config)
+        summary = await _load_config_summary(db_config)
         await query.edit_message_text(f"格局設定完成\n\n{summary}")
         return ConversationHandler.END
     else:
@@ -1210,14 +1340,18 @@ async def layout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     else:
                         baths.add(num)
 
+    if (rooms, baths) == before:
+        # Double tap or clearing an empty layout — nothing to write or redraw
+        return SETTINGS_MENU
+
     db_config.set_many(
         {
             "search.room_counts": sorted(rooms),
             "search.bathroom_counts": sorted(baths),
         }
     )
-    keyboard = _build_layout_keyboard(sorted(rooms), sorted(baths))
-    await query.edit_message_text("選擇房/衛數（可多選）：", reply_markup=keyboard)
+    keyboard = _build_layout_keyboard(rooms, baths)
+    await _edit_reply_markup_if_changed(query, context, keyboard)
     return SETTINGS_MENU
 
 
@@ -1232,7 +1366,8 @@ async def settings_kw_include_handler(update: Update, context: ContextTypes.DEFA
         return SETTINGS_KW_INCLUDE_INPUT
 
     current = db_config.get("search.keywords_include", [])
-    new_kws = [kw for kw in keywords if kw not in current]
+    existing = set(current)
+    new_kws = [kw for kw in dict.fromkeys(keywords) if kw not in existing]
     if not new_kws:
         kw_exclude = db_config.get("search.keywords_exclude", [])
         keyboard = _build_keyword_keyboard(current, kw_exclude)
@@ -1262,7 +1397,8 @@ async def settings_kw_exclude_handler(update: Update, context: ContextTypes.DEFA
         return SETTINGS_KW_EXCLUDE_INPUT
 
     current = db_config.get("search.keywords_exclude", [])
-    new_kws = [kw for kw in keywords if kw not in current]
+    existing = set(current)
+    new_kws = [kw for kw in dict.fromkeys(keywords) if kw not in existing]
     if not new_kws:
         kw_include = db_config.get("search.keywords_include", [])
         keyboard = _build_keyword_keyboard(kw_include, current)
@@ -1295,7 +1431,7 @@ async def settings_pages_handler(update: Update, context: ContextTypes.DEFAULT_T
 
     db_config: DbConfig = context.bot_data["db_config"]
     db_config.set("search.max_pages", pages)
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"已更新最大查看頁數：{pages}\n\n{summary}")
     return ConversationHandler.END
 
@@ -1315,15 +1451,13 @@ async def settings_schedule_handler(update: Update, context: ContextTypes.DEFAUL
     db_config: DbConfig = context.bot_data["db_config"]
     db_config.set("scheduler.interval_minutes", minutes)
 
-    # Rebuild scheduler
-    jobs = context.job_queue.get_jobs_by_name("pipeline")
-    for job in jobs:
-        job.schedule_removal()
-
-    if not db_config.get("scheduler.paused", False):
+    # Rebuild scheduler (_ensure_scheduler drops the old job first)
+    if db_config.get("scheduler.paused", False):
+        _stop_scheduler(context)
+    else:
         _ensure_scheduler(context)
 
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"排程已更新：每 {minutes} 分鐘執行一次\n\n{summary}")
     return ConversationHandler.END
 
@@ -1336,30 +1470,9 @@ async def set_maps_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     db_config: DbConfig = context.bot_data["db_config"]
 
     if data == "set_maps:toggle":
-        enabled = not db_config.get("maps.enabled", False)
-        db_config.set("maps.enabled", enabled)
-        has_key = bool(db_config.get("maps.api_key"))
-        monthly_limit = db_config.get("maps.monthly_limit", DEFAULTS["maps.monthly_limit"])
-        status = "已開啟" if enabled else "已關閉"
-        key_status = "已設定" if has_key else "未設定"
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    f"{'🟢' if enabled else '⚪'} {'關閉' if enabled else '開啟'}地圖縮圖",
-                    callback_data="set_maps:toggle",
-                ),
-            ],
-            [
-                InlineKeyboardButton("🔑 設定 API Key", callback_data="set_maps:apikey"),
-            ],
-            [
-                InlineKeyboardButton(f"📊 每月上限：{monthly_limit}", callback_data="set_maps:monthly_limit"),
-            ],
-        ]
-        await query.edit_message_text(
-            f"地圖縮圖設定\n狀態：{status}\nAPI Key：{key_status}\n每月 API 上限：{monthly_limit}",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+        db_config.set("maps.enabled", not db_config.get("maps.enabled", DEFAULTS["maps.enabled"]))
+        text, markup = await _render_maps_panel(db_config, include_usage=False)
+        await query.edit_message_text(text, reply_markup=markup)
         return SETTINGS_MENU
 
     elif data == "set_maps:apikey":
@@ -1368,10 +1481,7 @@ async def set_maps_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     elif data == "set_maps:monthly_limit":
         monthly_limit = db_config.get("maps.monthly_limit", DEFAULTS["maps.monthly_limit"])
-        await query.edit_message_text(
-            f"當前每月 API 上限：{monthly_limit}\n"
-            "請輸入新的每月上限（0 = 無限制）："
-        )
+        await query.edit_message_text(_MONTHLY_LIMIT_PROMPT.format(monthly_limit))
         return SETTINGS_MAPS_DAILY_LIMIT_INPUT
 
     return SETTINGS_MENU
@@ -1386,7 +1496,7 @@ async def settings_maps_apikey_handler(update: Update, context: ContextTypes.DEF
 
     db_config: DbConfig = context.bot_data["db_config"]
     db_config.set("maps.api_key", text)
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"已更新 Google Maps API Key\n\n{summary}")
     return ConversationHandler.END
 
@@ -1405,7 +1515,7 @@ async def settings_maps_monthly_limit_handler(update: Update, context: ContextTy
     db_config: DbConfig = context.bot_data["db_config"]
     db_config.set("maps.monthly_limit", limit)
     label = "無限制" if limit == 0 else str(limit)
-    summary = _config_summary(db_config)
+    summary = await _load_config_summary(db_config)
     await update.message.reply_text(f"已更新每月 API 上限：{label}\n\n{summary}")
     return ConversationHandler.END
 
@@ -1416,39 +1526,64 @@ async def settings_maps_monthly_limit_handler(update: Update, context: ContextTy
 
 LIST_PAGE_SIZE = 5
 
+# Community-name guessing runs for every listing on every page render; compile once
+_COMMUNITY_SUFFIX_RE = re.compile(r"([\w\u4e00-\u9fff]{2,20}社區)")
+_COMMUNITY_PREFIX_RE = re.compile(r"社區\s*([\w\u4e00-\u9fff]{2,20})")
+_TITLE_SEGMENT_SPLIT_RE = re.compile(r"[~～｜|／/!！?？,，:：\-—]+")
+_TITLE_TRAILING_FEATURE_RE = re.compile(r"(電梯.*|車位.*|套房.*|[一二三四五六七八九十0-9]+房.*)$")
+_CJK_CHAR_RE = re.compile(r"[\u4e00-\u9fff]")
+# Decoration trimmed from both ends of each title segment
+_TITLE_STRIP_CHARS = "👉· "
+_TITLE_STOP_PREFIXES = (
+    "屋主誠售",
+    "我是承辦",
+    "近中研院",
+    "近國泰醫院",
+    "近捷運",
+    "獨家",
+    "專任",
+    "急售",
+    "低總價",
+)
+_TITLE_STOP_PREFIX_RE = re.compile("|".join(map(re.escape, _TITLE_STOP_PREFIXES)))
 
-def _filter_matched(listings: list[dict], config, district_filter: str | None = None) -> list[dict]:
-    """Apply matcher filters to listings."""
-    from tw_homedog.matcher import (
-        match_price,
-        match_district,
-        match_size,
-        match_keywords,
-        match_room,
-        match_bathroom,
-        match_build_year,
-    )
 
-    result = []
-    for listing in listings:
-        if not match_price(listing, config):
-            continue
-        if not match_district(listing, config):
-            continue
-        if not match_size(listing, config):
-            continue
-        if not match_room(listing, config):
-            continue
-        if not match_bathroom(listing, config):
-            continue
-        if not match_build_year(listing, config):
-            continue
-        if not match_keywords(listing, config):
-            continue
-        if district_filter and listing.get("district") != district_filter:
+def _clip(text: str, limit: int = 64) -> str:
+    """Truncate a button label to limit characters, marking the cut with '...'."""
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+@functools.lru_cache(maxsize=4096)
+def _guess_community_name(title: str) -> str | None:
+    """Best-effort community name from a listing title (memoized; pure in the title)."""
+    if not title:
+        return None
+    cleaned = title.strip()
+
+    # Explicit community labels first
+    m = _COMMUNITY_SUFFIX_RE.search(cleaned)
+    if m:
+        return m.group(1)
+    m = _COMMUNITY_PREFIX_RE.search(cleaned)
+    if m:
+        return m.group(1)
+
+    for seg in _TITLE_SEGMENT_SPLIT_RE.split(cleaned):
+        candidate = seg.strip(_TITLE_STRIP_CHARS)
+        if not candidate:
             continue
-        result.append(listing)
-    return result
+        # Strip stacked marketing prefixes ("急售獨家…") in any order
+        while (m := _TITLE_STOP_PREFIX_RE.match(candidate)) is not None:
+            candidate = candidate[m.end():].strip()
+        candidate = _TITLE_TRAILING_FEATURE_RE.sub("", candidate).strip(_TITLE_STRIP_CHARS)
+        if 2 <= len(candidate) <= 16 and _CJK_CHAR_RE.search(candidate):
+            return candidate
+    return None
+
+
+def _filter_matched(listings: list[dict], config) -> list[dict]:
+    """Apply matcher filters to listings."""
+    return [listing for listing in listings if matches_all(listing, config)]
 
 
 def _get_matched(
@@ -1465,32 +1600,127 @@ def _get_matched(
         return []
 
     if only_favorites:
-        listings = storage.get_favorites()
         # 可選擇用 district 篩選，其他條件不過濾，方便「收藏即保留」
-        if district_filter:
-            listings = [l for l in listings if (l.get("district") or "") == district_filter]
+        listings = storage.get_favorites(district=district_filter)
     else:
+        # Price/size bounds are plain ranges, so let SQL drop those rows before
+        # they are materialized; the matchers still run on what comes back
+        ranges = search_ranges(config)
         if include_read:
-            listings = storage.get_listings_with_read_status()
+            listings = storage.get_listings_with_read_status(district=district_filter, ranges=ranges)
         else:
-            listings = storage.get_unread_listings()
+            listings = storage.get_unread_listings(district=district_filter, ranges=ranges)
             for l in listings:
                 l["is_read"] = False
-        listings = _filter_matched(listings, config, district_filter)
+        listings = _filter_matched(listings, config)
 
-    # Mark favorites flag if needed for general lists
-    if not only_favorites:
-        for l in listings:
-            l["is_favorite"] = storage.is_favorite("591", l["listing_id"])
+    return listings
+
+
+def _list_districts(
+    context: ContextTypes.DEFAULT_TYPE,
+    storage: Storage,
+    db_config: DbConfig,
+    include_read: bool,
+) -> list[tuple[str, int]]:
+    """(district, matched count) pairs offered by the /list filter picker.
+
+    Counted from the full match list, so every offered district has at least
+    one listing. A cached unfiltered result is reused; otherwise the list is
+    computed without replacing the (possibly district-filtered) cache.
+    """
+    key = (None, include_read, db_config.version)
+    cached = context.user_data.get("_matched_cache")
+    if cached is not None and cached["key"] == key and time.monotonic() - cached["ts"] < _MATCHED_CACHE_TTL:
+        matched = cached["data"]
+    else:
+        matched = _get_matched(storage, db_config, include_read=include_read)
+    # Listings without a district only show under 全部; a district filter can't select them
+    counts = Counter(l["district"] for l in matched if l.get("district"))
+    return sorted(counts.items())
 
+
+def _flag_favorites(storage: Storage, page: list[dict]) -> list[dict]:
+    """Set is_favorite on the listings about to be rendered (not the whole match list)."""
+    fav_ids = storage.get_favorite_ids("591")
+    for listing in page:
+        listing["is_favorite"] = listing["listing_id"] in fav_ids
+    return page
+
+
+# Seconds a /list result is reused while paging; reads made through the list
+# are patched in, so only pipeline inserts can go unseen
+_MATCHED_CACHE_TTL = 60.0
+
+
+def _get_matched_cached(
+    context: ContextTypes.DEFAULT_TYPE,
+    storage: Storage,
+    db_config: DbConfig,
+    district_filter: str | None = None,
+    include_read: bool = False,
+) -> list[dict]:
+    """_get_matched for the /list browser, memoized per user for _MATCHED_CACHE_TTL seconds."""
+    key = (district_filter, include_read, db_config.version)
+    now = time.monotonic()
+    cached = context.user_data.get("_matched_cache")
+    if cached is not None and cached["key"] == key and now - cached["ts"] < _MATCHED_CACHE_TTL:
+        return cached["data"]
+    listings = _get_matched(storage, db_config, district_filter, include_read=include_read)
+    context.user_data["_matched_cache"] = {"key": key, "ts": now, "data": listings}
     return listings
 
 
+def _invalidate_matched_cache(context: ContextTypes.DEFAULT_TYPE) -> None:
+    context.user_data.pop("_matched_cache", None)
+
+
+def _mark_read_in_matched_cache(context: ContextTypes.DEFAULT_TYPE, listing_id: str) -> None:
+    """Apply a listing being marked read to the cached /list result."""
+    cached = context.user_data.get("_matched_cache")
+    if cached is None:
+        return
+    include_read = cached["key"][1]
+    listings = cached["data"]
+    for i, listing in enumerate(listings):
+        if listing["listing_id"] == listing_id:
+            if include_read:
+                listing["is_read"] = True
+            else:
+                del listings[i]
+            return
+
+
 def _get_unread_matched(storage: Storage, db_config: DbConfig, district_filter: str | None = None) -> list[dict]:
     """Backward-compatible helper used by tests and legacy call sites."""
     return _get_matched(storage, db_config, district_filter=district_filter, include_read=False)
 
 
+# Detail text per listing version; rows only change via raw_hash (new content)
+# or enrichment (is_enriched 0 → 1), so those make up the key
+_DETAIL_TEXT_CACHE_SIZE = 512
+_detail_text_cache: dict[tuple, str] = {}
+
+
+def _listing_detail_text(listing: dict, mode: str) -> str:
+    """format_listing_message for detail views, reused across repeat opens."""
+    key = (
+        listing.get("source", "591"),
+        listing["listing_id"],
+        mode,
+        listing.get("raw_hash"),
+        bool(listing.get("is_enriched")),
+    )
+    text = _detail_text_cache.get(key)
+    if text is None:
+        text = format_listing_message(listing, mode=mode)
+        if len(_detail_text_cache) >= _DETAIL_TEXT_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _detail_text_cache[next(iter(_detail_text_cache))]
+        _detail_text_cache[key] = text
+    return text
+
+
 def _build_list_keyboard(
     listings: list[dict],
     offset: int,
@@ -1502,97 +1732,36 @@ def _build_list_keyboard(
 ) -> InlineKeyboardMarkup:
     """Build paginated listing list inline keyboard."""
     buttons = []
+    unit = _PRICE_UNIT.get(mode, "元")
 
-    def _clip(text: str, limit: int = 64) -> str:
-        if len(text) <= limit:
-            return text
-        return text[: limit - 3] + "..."
-
-    def _guess_community_name(title: str) -> str | None:
-        if not title:
-            return None
-        cleaned = title.strip()
-
-        # Explicit community labels first
-        m = re.search(r"([\w\u4e00-\u9fff]{2,20}社區)", cleaned)
-        if m:
-            return m.group(1)
-        m = re.search(r"社區\s*([\w\u4e00-\u9fff]{2,20})", cleaned)
-        if m:
-            return m.group(1)
-
-        segments = [
-            seg.strip("👉· ")
-            for seg in re.split(r"[~～｜|／/!！?？,，:：\-—]+", cleaned)
-            if seg.strip("👉· ")
-        ]
-        stop_prefixes = (
-            "屋主誠售",
-            "我是承辦",
-            "近中研院",
-            "近國泰醫院",
-            "近捷運",
-            "獨家",
-            "專任",
-            "急售",
-            "低總價",
-        )
-        for seg in segments:
-            candidate = seg
-            for p in stop_prefixes:
-                if candidate.startswith(p):
-                    candidate = candidate[len(p):].strip()
-            candidate = re.sub(
-                r"(電梯.*|車位.*|套房.*|[一二三四五六七八九十0-9]+房.*)$",
-                "",
-                candidate,
-            ).strip("👉· ")
-            if 2 <= len(candidate) <= 16 and re.search(r"[\u4e00-\u9fff]", candidate):
-                return candidate
-        return None
-
-    def _fill_location_fields(listing: dict):
-        if not listing.get("community_name"):
-            title = listing.get("title") or ""
-            guessed = _guess_community_name(title)
-            if guessed:
-                listing["community_name"] = guessed
     for listing in listings:
-        _fill_location_fields(listing)
-        district = listing.get("district") or "?"
-        price = listing.get("price")
-        size = listing.get("size_ping")
-        if mode == "buy":
-            price_str = f"{price:,}萬" if price else "?"
-        else:
-            price_str = f"{price:,}元" if price else "?"
-        size_str = f"{size}坪" if size else ""
-        community = listing.get("community_name") or ""
-        address = listing.get("address") or listing.get("address_zh") or ""
-        layout = listing.get("room") or listing.get("shape_name") or ""
-        age = listing.get("houseage") or ""
-        title = listing.get("title") or ""
-
-        title_str = _clip(title, 26)
+        get = listing.get
+        title = get("title") or ""
+        community = get("community_name")
+        if not community:
+            community = _guess_community_name(title)
+            if community:
+                listing["community_name"] = community
+        price = get("price")
+        size = get("size_ping")
+        address = get("address")
+        callback_data = f"{context}:d:{listing['listing_id']}"
+
+        prefix = ("⭐ " if get("is_favorite") else "") + ("✅ " if get("is_read") else "")
         community_str = _clip(f"社區 {community}", 20) if community else "社區 未提供"
-        address_str = _clip(address, 20) if address else ""
-
-        label_main = " · ".join([p for p in (title_str, community_str) if p])
-        prefix = ""
-        if listing.get("is_favorite"):
-            prefix += "⭐ "
-        if listing.get("is_read"):
-            prefix += "✅ "
-        label_main = _clip(prefix + label_main, 64)
-        buttons.append([InlineKeyboardButton(
-            label_main, callback_data=f"{context}:d:{listing['listing_id']}"
-        )])
-
-        detail_parts = [district, price_str, size_str, layout, age, address_str]
-        label_detail = _clip(" · ".join([p for p in detail_parts if p]), 64)
-        buttons.append([InlineKeyboardButton(
-            label_detail, callback_data=f"{context}:d:{listing['listing_id']}"
-        )])
+        label_main = _clip(f"{prefix}{_clip(title, 26)} · {community_str}" if title else prefix + community_str)
+        buttons.append([InlineKeyboardButton(label_main, callback_data=callback_data)])
+
+        detail_parts = (
+            get("district") or "?",
+            f"{price:,}{unit}" if price else "?",
+            f"{size}坪" if size else "",
+            get("room") or get("shape_name"),
+            get("houseage"),
+            _clip(address, 20) if address else "",
+        )
+        label_detail = _clip(" · ".join(filter(None, detail_parts)))
+        buttons.append([InlineKeyboardButton(label_detail, callback_data=callback_data)])
 
     # Navigation row
     nav_row = []
@@ -1628,7 +1797,9 @@ async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     storage: Storage = context.bot_data["storage"]
 
     show_read = bool(context.user_data.get("_list_show_read", False))
-    matched = _get_matched(storage, db_config, include_read=show_read)
+    # A new /list always starts from fresh data
+    _invalidate_matched_cache(context)
+    matched = _get_matched_cached(context, storage, db_config, include_read=show_read)
     if not matched:
         if not show_read:
             all_matched = _get_matched(storage, db_config, include_read=True)
@@ -1644,7 +1815,7 @@ async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     mode = db_config.get("search.mode", "buy")
-    page = matched[:LIST_PAGE_SIZE]
+    page = _flag_favorites(storage, matched[:LIST_PAGE_SIZE])
     keyboard = _build_list_keyboard(page, 0, len(matched), mode, show_read=show_read)
 
     context.user_data["_list_filter"] = None
@@ -1676,11 +1847,11 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         offset = int(data.split(":")[2])
         if offset < 0:
             offset = 0
-        matched = _get_matched(storage, db_config, district_filter, include_read=show_read)
+        matched = _get_matched_cached(context, storage, db_config, district_filter, include_read=show_read)
         if not matched:
             await query.edit_message_text("目前沒有符合條件的物件")
             return
-        page = matched[offset:offset + LIST_PAGE_SIZE]
+        page = _flag_favorites(storage, matched[offset:offset + LIST_PAGE_SIZE])
         keyboard = _build_list_keyboard(page, offset, len(matched), mode, district_filter, show_read)
         label = f"{'含已讀，' if show_read else ''}物件數：{len(matched)} 筆"
         if district_filter:
@@ -1698,13 +1869,16 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
         # Auto-mark as read
         storage.mark_as_read("591", listing_id)
+        _mark_read_in_matched_cache(context, listing_id)
 
         # Enrich on detail view (single listing, in background thread)
         if mode == "buy" and not listing.get("is_enriched"):
             listing = await _enrich_single(db_config, storage, listing_id) or listing
+            # Enriched fields can change whether the listing still matches
+            _invalidate_matched_cache(context)
 
         is_fav = storage.is_favorite("591", listing_id)
-        msg = format_listing_message(listing, mode=mode)
+        msg = _listing_detail_text(listing, mode)
         buttons = [
             [
                 InlineKeyboardButton("◀ 返回列表", callback_data="list:back"),
@@ -1726,7 +1900,9 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             listing_id, provider is not None, lat, lng,
         )
         if provider and lat is not None and lng is not None:
-            thumb = provider.get_thumbnail(
+            # Static map download is blocking HTTP; keep it off the event loop
+            thumb = await asyncio.to_thread(
+                provider.get_thumbnail,
                 address=listing.get("address", ""), lat=lat, lng=lng,
             )
             logger.debug("list:d: thumb=%s", thumb)
@@ -1752,7 +1928,7 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     # Back to list
     if data == "list:back":
-        matched = _get_matched(storage, db_config, district_filter, include_read=show_read)
+        matched = _get_matched_cached(context, storage, db_config, district_filter, include_read=show_read)
         if not matched:
             try:
                 await query.edit_message_text("目前沒有符合條件的物件")
@@ -1762,7 +1938,7 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                     chat_id=query.message.chat_id, text="目前沒有符合條件的物件",
                 )
             return
-        page = matched[:LIST_PAGE_SIZE]
+        page = _flag_favorites(storage, matched[:LIST_PAGE_SIZE])
         keyboard = _build_list_keyboard(page, 0, len(matched), mode, district_filter, show_read)
         label = f"{'含已讀，' if show_read else ''}物件數：{len(matched)} 筆"
         if district_filter:
@@ -1778,12 +1954,11 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     # Show filter options
     if data == "list:filter":
-        matched = _get_matched(storage, db_config, include_read=show_read)
-        districts = sorted(set(l.get("district") or "?" for l in matched))
+        districts = _list_districts(context, storage, db_config, include_read=show_read)
         buttons = [[InlineKeyboardButton("全部", callback_data="list:f:all")]]
         row = []
-        for d in districts:
-            row.append(InlineKeyboardButton(d, callback_data=f"list:f:{d}"))
+        for d, n in districts:
+            row.append(InlineKeyboardButton(f"{d} ({n})", callback_data=f"list:f:{d}"))
             if len(row) == 3:
                 buttons.append(row)
                 row = []
@@ -1802,14 +1977,14 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             context.user_data["_list_filter"] = filter_val
             district_filter = filter_val
 
-        matched = _get_matched(storage, db_config, district_filter, include_read=show_read)
+        matched = _get_matched_cached(context, storage, db_config, district_filter, include_read=show_read)
         if not matched:
             msg = "目前沒有符合條件的物件"
             if district_filter:
                 msg += f"（{district_filter}）"
             await query.edit_message_text(msg)
             return
-        page = matched[:LIST_PAGE_SIZE]
+        page = _flag_favorites(storage, matched[:LIST_PAGE_SIZE])
         keyboard = _build_list_keyboard(page, 0, len(matched), mode, district_filter, show_read)
         label = f"{'含已讀，' if show_read else ''}物件數：{len(matched)} 筆"
         if district_filter:
@@ -1821,7 +1996,7 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if data == "list:toggle_read":
         show_read = not show_read
         context.user_data["_list_show_read"] = show_read
-        matched = _get_matched(storage, db_config, district_filter, include_read=show_read)
+        matched = _get_matched_cached(context, storage, db_config, district_filter, include_read=show_read)
         if not matched:
             if not show_read:
                 all_matched = _get_matched(storage, db_config, district_filter, include_read=True)
@@ -1835,7 +2010,7 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                     return
             await query.edit_message_text("目前沒有符合條件的物件")
             return
-        page = matched[:LIST_PAGE_SIZE]
+        page = _flag_favorites(storage, matched[:LIST_PAGE_SIZE])
         keyboard = _build_list_keyboard(page, 0, len(matched), mode, district_filter, show_read)
         label = f"{'含已讀，' if show_read else ''}物件數：{len(matched)} 筆"
         if district_filter:
@@ -1845,12 +2020,13 @@ async def list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     # Mark all as read
     if data == "list:ra":
-        matched = _get_matched(storage, db_config, district_filter, include_read=show_read)
+        matched = _get_matched_cached(context, storage, db_config, district_filter, include_read=show_read)
         if not matched:
             await query.edit_message_text("沒有可標記的物件")
             return
         listing_ids = [l["listing_id"] for l in matched]
         storage.mark_many_as_read("591", listing_ids)
+        _invalidate_matched_cache(context)
         await query.edit_message_text(f"已將 {len(listing_ids)} 筆物件標記為已讀")
         return
 
@@ -1919,7 +2095,7 @@ async def _enrich_single(db_config: DbConfig, storage: Storage, listing_id: str)
         return None
 
     try:
-        from concurrent.futures import ThreadPoolExecutor
+        from tw_homedog.scraper import _get_buy_session_headers, enrich_buy_listings
 
         def _do_enrich():
             s, h = _get_buy_session_headers(config)
@@ -1927,8 +2103,7 @@ async def _enrich_single(db_config: DbConfig, storage: Storage, listing_id: str)
 
         loop = asyncio.get_event_loop()
         details = await loop.run_in_executor(None, _do_enrich)
-        for lid, detail in details.items():
-            storage.update_listing_detail("591", lid, detail)
+        storage.bulk_update_listing_details("591", details)
         return storage.get_listing_by_id("591", listing_id)
     except Exception as e:
         logger.warning("Enrich single listing %s failed: %s", listing_id, e)
@@ -1940,14 +2115,30 @@ async def _enrich_single(db_config: DbConfig, storage: Storage, listing_id: str)
 # =============================================================================
 
 
+# (db_config, version, provider): the provider keeps its file_id index and
+# geocode cache in memory, so reuse it until any config write
+_map_provider_cache: tuple[DbConfig, int, MapThumbnailProvider | None] | None = None
+
+
 def _get_map_provider(db_config: DbConfig) -> MapThumbnailProvider | None:
+    """MapThumbnailProvider for the current db_config, or None if maps disabled."""
+    global _map_provider_cache
+    cached = _map_provider_cache
+    if cached is not None and cached[0] is db_config and cached[1] == db_config.version:
+        return cached[2]
+    version = db_config.version
+    provider = _build_map_provider(db_config)
+    _map_provider_cache = (db_config, version, provider)
+    return provider
+
+
+def _build_map_provider(db_config: DbConfig) -> MapThumbnailProvider | None:
     """Build a MapThumbnailProvider from current db_config, or None if maps disabled."""
     enabled = db_config.get("maps.enabled", False)
     api_key = db_config.get("maps.api_key")
     if not enabled or not api_key:
-        logger.debug("_get_map_provider: enabled=%s api_key=%s → skip", enabled, bool(api_key))
+        logger.debug("_build_map_provider: enabled=%s api_key=%s → skip", enabled, bool(api_key))
         return None
-    from tw_homedog.db_config import DEFAULTS
     cfg = MapConfig(
         enabled=True,
         api_key=api_key,
@@ -2066,7 +2257,7 @@ async def favorites_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if mode == "buy" and not listing.get("is_enriched"):
             listing = await _enrich_single(db_config, storage, listing_id) or listing
 
-        msg = format_listing_message(listing, mode=mode)
+        msg = _listing_detail_text(listing, mode)
         buttons = [
             [InlineKeyboardButton("◀ 返回最愛", callback_data="fav:back"),
              InlineKeyboardButton("🔗 開啟連結", url=listing.get("url")) if listing.get("url") else None],
@@ -2080,7 +2271,9 @@ async def favorites_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
         lat = listing.get("lat")
         lng = listing.get("lng")
         if provider and lat is not None and lng is not None:
-            thumb = provider.get_thumbnail(
+            # Static map download is blocking HTTP; keep it off the event loop
+            thumb = await asyncio.to_thread(
+                provider.get_thumbnail,
                 address=listing.get("address", ""), lat=lat, lng=lng,
             )
             if thumb:
@@ -2139,6 +2332,7 @@ async def favorites_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     if data == "fav:clear":
         storage.clear_favorites()
+        _invalidate_matched_cache(context)
         await query.edit_message_text("已清空最愛")
         return
 
@@ -2170,10 +2364,85 @@ async def favorites_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # Pipeline execution
 # =============================================================================
 
+SCRAPE_INSERT_BATCH_SIZE = 500
+
+# Dedup counters accumulated over successful pipeline runs in this process
+_CUMULATIVE_METRICS: Counter[str] = Counter()
+
+# Minimum gap between edits of the per-run progress message
+PROGRESS_EDIT_INTERVAL = 2.0
+
+
+class _ProgressMessage:
+    """One progress message per pipeline run, edited in place instead of re-sent.
+
+    update() only records the latest text; a single drain task sends it at
+    most once per PROGRESS_EDIT_INTERVAL, so intermediate updates collapse.
+    """
+
+    def __init__(self, bot, chat_id: int, interval: float = PROGRESS_EDIT_INTERVAL):
+        self._bot = bot
+        self._chat_id = chat_id
+        self._interval = interval
+        self._text: str | None = None
+        self._sent_text: str | None = None
+        self._message_id: int | None = None
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+
+    def update(self, text: str) -> None:
+        self._text = text
+        self._changed.set()
+
+    async def _drain(self) -> None:
+        while not self._closed.is_set():
+            await self._changed.wait()
+            self._changed.clear()
+            await self._flush()
+            # Wait out the edit interval, but wake at once when the run closes
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closed.wait(), self._interval)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        text = self._text
+        if text is None or text == self._sent_text:
+            return
+        try:
+            if self._message_id is None:
+                message = await self._bot.send_message(chat_id=self._chat_id, text=text)
+                self._message_id = message.message_id
+            else:
+                await self._bot.edit_message_text(
+                    chat_id=self._chat_id, message_id=self._message_id, text=text
+                )
+            self._sent_text = text
+        except Exception as e:  # best-effort
+            logger.debug("Progress send failed: %s", e)
+
+    async def close(self) -> None:
+        """Let the drain task send whatever update is still pending, then stop it.
+
+        The task is not cancelled: a send cut off mid-flight would leave the
+        message id unset and the final flush would post a duplicate message.
+        """
+        self._closed.set()
+        self._changed.set()
+        await self._task
+
+
 async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
     """Run the scrape → match → notify pipeline. Returns result message."""
-    global _pipeline_running
-    _pipeline_running = True
+    if _pipeline_lock.locked():
+        return "Pipeline 正在執行中，請稍候"
+    async with _pipeline_lock:
+        return await _execute_pipeline(context)
+
+
+async def _execute_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
+    # Scraper pulls in bs4/playwright glue; only needed once a run actually starts
+    from tw_homedog.scraper import _get_buy_session_headers, enrich_buy_listings, iter_scrape_listings
 
     db_config: DbConfig = context.bot_data["db_config"]
     storage: Storage = context.bot_data["storage"]
@@ -2181,66 +2450,62 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
     try:
         config = db_config.build_config()
     except ValueError as e:
-        _pipeline_running = False
         return f"設定不完整：{e}"
 
-    start_time = datetime.now(timezone.utc)
+    start_time = datetime.now(timezone.utc)  # stored as last_run_at
+    started = time.monotonic()
     scraped = 0
     new_count = 0
     matched_count = 0
-    dedup_metrics = {
-        "inserted": 0,
-        "skipped_duplicate": 0,
-        "merged": 0,
-        "cleanup_failed": 0,
-    }
+    dedup_metrics: Counter[str] = Counter()
 
     loop = asyncio.get_running_loop()
-    bot = context.bot
     progress_chat_id = db_config.get("telegram.chat_id")
+    progress = _ProgressMessage(context.bot, int(progress_chat_id)) if progress_chat_id else None
 
     def _progress(msg: str):
-        """Send lightweight progress message to chat asynchronously."""
-        if not progress_chat_id:
-            return
-        coro = bot.send_message(chat_id=int(progress_chat_id), text=f"[進度] {msg}")
-        try:
-            running_loop = asyncio.get_running_loop()
-            if running_loop == loop:
-                asyncio.create_task(coro)
-            else:
-                asyncio.run_coroutine_threadsafe(coro, loop)
-        except RuntimeError:
-            # No running loop in this thread
-            asyncio.run_coroutine_threadsafe(coro, loop)
-        except Exception as e:  # best-effort
-            logger.debug("Progress send failed: %s", e)
+        """Queue a progress update; callable from the loop or scraper worker threads."""
+        if progress is not None:
+            loop.call_soon_threadsafe(progress.update, f"[進度] {msg}")
 
     try:
         logger.info("Pipeline started")
 
-        # Scrape
-        raw_listings = await asyncio.to_thread(scrape_listings, config, _progress)
-        scraped = len(raw_listings)
-        _progress(f"爬取完成，共 {scraped} 筆原始物件，開始寫入與過濾")
+        # Scrape, persisting in bounded batches instead of holding the whole result set
+        scrape_iter = iter_scrape_listings(config, _progress)
         batch_cache: dict[str, list[dict]] = {}
-        for raw in raw_listings:
-            normalized = normalize_591_listing(raw)
-            decision = storage.insert_listing_with_dedup(
-                normalized,
+
+        def _next_batch() -> list[dict]:
+            return list(itertools.islice(scrape_iter, SCRAPE_INSERT_BATCH_SIZE))
+
+        def _persist(batch: list[dict]) -> list[dict]:
+            return storage.bulk_insert_listings_with_dedup(
+                [normalize_591_listing(raw) for raw in batch],
                 batch_cache=batch_cache,
                 dedup_enabled=config.dedup.enabled,
                 dedup_threshold=config.dedup.threshold,
                 price_tolerance=config.dedup.price_tolerance,
                 size_tolerance=config.dedup.size_tolerance,
             )
-            if decision["inserted"]:
-                new_count += 1
-                dedup_metrics["inserted"] += 1
-                if new_count % 10 == 0:
-                    _progress(f"已寫入 {new_count} 筆新物件")
-            else:
-                dedup_metrics["skipped_duplicate"] += 1
+
+        # Scrape the next batch in a worker thread while the current one is inserted.
+        # Inserts stay on the loop thread: handlers write to the same connection
+        # there, and a worker-thread transaction could interleave with theirs.
+        pending = asyncio.ensure_future(asyncio.to_thread(_next_batch))
+        try:
+            while batch := await pending:
+                scraped += len(batch)
+                pending = asyncio.ensure_future(asyncio.to_thread(_next_batch))
+                decisions = _persist(batch)
+                inserted = sum(1 for decision in decisions if decision["inserted"])
+                new_count += inserted
+                dedup_metrics.update(inserted=inserted, skipped_duplicate=len(decisions) - inserted)
+        finally:
+            # Cancelling cannot stop the worker thread, so wait for its scrape to end
+            # before the pipeline lock is released and another run can start one
+            with contextlib.suppress(Exception):
+                await pending
+        _progress(f"爬取完成，共 {scraped} 筆原始物件，新增 {new_count} 筆")
 
         logger.info(
             "Scrape complete: %d new out of %d (dedup skipped=%d)",
@@ -2255,8 +2520,8 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
 
         # Enrich buy listings
         if config.search.mode == "buy" and matched:
-            matched_ids = [m["listing_id"] for m in matched]
-            unenriched = storage.get_unenriched_listing_ids(matched_ids)
+            # Matched rows are full listing rows, so the enrichment flag is already here
+            unenriched = [m["listing_id"] for m in matched if not m.get("is_enriched")]
             if unenriched:
                 logger.info("Enriching %d listings...", len(unenriched))
                 session, headers = await asyncio.to_thread(
@@ -2266,9 +2531,17 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
                     enrich_buy_listings, config, session, headers, unenriched,
                     storage=storage,
                 )
-                for lid, detail in details.items():
-                    storage.update_listing_detail("591", lid, detail)
-                matched = find_matching_listings(config, storage)
+                storage.bulk_update_listing_details("591", details)
+                if details:
+                    rematched = {
+                        listing["listing_id"]: listing
+                        for listing in match_listings_by_ids(config, storage, list(details))
+                    }
+                    matched = [
+                        rematched[m["listing_id"]] if m["listing_id"] in rematched else m
+                        for m in matched
+                        if m["listing_id"] not in details or m["listing_id"] in rematched
+                    ]
 
         matched_count = len(matched)
 
@@ -2276,7 +2549,7 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
         unread_matched = _get_matched(storage, db_config, include_read=False)
         unread_count = len(unread_matched)
 
-        duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+        duration = time.monotonic() - started
         logger.info(
             "Pipeline completed: scraped=%d, new=%d, matched=%d, unread=%d, "
             "inserted=%d, skipped_duplicate=%d, merged=%d, cleanup_failed=%d, duration=%.1fs",
@@ -2291,8 +2564,12 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
             duration,
         )
 
-        db_config.set("scheduler.last_run_at", start_time.isoformat())
-        db_config.set("scheduler.last_run_status", "success")
+        db_config.set_many({
+            "scheduler.last_run_at": start_time.isoformat(),
+            "scheduler.last_run_status": "success",
+        })
+        _CUMULATIVE_METRICS.update(dedup_metrics)
+        _CUMULATIVE_METRICS["runs"] += 1
 
         if unread_count > 0:
             return (
@@ -2307,17 +2584,22 @@ async def _run_pipeline(context: ContextTypes.DEFAULT_TYPE) -> str:
             )
 
     except Exception as e:
-        logger.error("Pipeline failed: %s", e, exc_info=True)
-        db_config.set("scheduler.last_run_at", start_time.isoformat())
-        db_config.set("scheduler.last_run_status", f"error: {e}")
+        logger.error("Pipeline failed: %s", e, exc_info=_want_traceback(e))
+        db_config.set_many({
+            "scheduler.last_run_at": start_time.isoformat(),
+            "scheduler.last_run_status": f"error: {e}",
+        })
         return f"執行失敗：{e}"
-
     finally:
-        _pipeline_running = False
+        if progress is not None:
+            await progress.close()
 
 
 async def _scheduled_pipeline(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Job callback for scheduled pipeline execution."""
+    if _pipeline_lock.locked():
+        logger.info("Scheduled pipeline skipped: another run is in progress")
+        return
     logger.info("Scheduled pipeline run starting")
     result = await _run_pipeline(context)
     logger.info("Scheduled pipeline result: %s", result)
@@ -2336,8 +2618,35 @@ async def _scheduled_pipeline(context: ContextTypes.DEFAULT_TYPE) -> None:
 # Helpers
 # =============================================================================
 
+# (db_config, version, text) of the last config-derived summary body
+_summary_cache: tuple[DbConfig, int, str] | None = None
+
+
 def _config_summary(db_config: DbConfig) -> str:
     """Build a short config summary string."""
+    global _summary_cache
+    cached = _summary_cache
+    if cached is not None and cached[0] is db_config and cached[1] == db_config.version:
+        base = cached[2]
+    else:
+        base = _config_summary_base(db_config)
+        _summary_cache = (db_config, db_config.version, base)
+    # Map usage changes without any config write, so that line is always live
+    return f"{base}\n{_maps_summary_line(db_config)}"
+
+
+async def _load_config_summary(db_config: DbConfig) -> str:
+    """_config_summary with the map usage reading refreshed off the event loop."""
+    await asyncio.to_thread(_maps_usage, db_config)
+    return _config_summary(db_config)
+
+
+# Fixed leading lines of the summary; the optional criteria lines follow it
+_SUMMARY_HEAD = "── 當前設定 ──\n模式：{mode}\n地區：{regions}\n區域：{districts}\n價格：{price_min:,}-{price_max:,} {unit}"
+
+
+def _config_summary_base(db_config: DbConfig) -> str:
+    """Config-derived summary lines (everything except the live map usage line)."""
     mode = db_config.get("search.mode", "buy")
     regions = db_config.get("search.regions", [1])
     districts = db_config.get("search.districts", [])
@@ -2355,34 +2664,27 @@ def _config_summary(db_config: DbConfig) -> str:
     interval = db_config.get("scheduler.interval_minutes", 30)
     paused = db_config.get("scheduler.paused", False)
 
-    unit = "萬" if mode == "buy" else "元"
+    unit = _PRICE_UNIT.get(mode, "元")
     region_name = _region_names(regions)
 
-    lines = [
-        "── 當前設定 ──",
-        f"模式：{'買房' if mode == 'buy' else '租房'}",
-        f"地區：{region_name}",
-        f"區域：{', '.join(districts) if districts else '未設定'}",
-        f"價格：{price_min:,}-{price_max:,} {unit}",
-    ]
-    if min_ping or max_ping:
-        if min_ping and max_ping:
-            lines.append(f"坪數：{min_ping}-{max_ping} 坪")
-        elif min_ping:
-            lines.append(f"坪數：≥ {min_ping} 坪")
-        elif max_ping:
-            lines.append(f"坪數：≤ {max_ping} 坪")
+    lines = [_SUMMARY_HEAD.format(
+        mode=_MODE_LABEL.get(mode, "租房"),
+        regions=region_name,
+        districts=", ".join(districts) if districts else "未設定",
+        price_min=price_min,
+        price_max=price_max,
+        unit=unit,
+    )]
+    size_line = _range_line("坪數", min_ping, max_ping, "坪")
+    if size_line:
+        lines.append(size_line)
     if room_counts:
         lines.append(f"房數：{', '.join(str(x) for x in room_counts)} 房")
     if bath_counts:
         lines.append(f"衛數：{', '.join(str(x) for x in bath_counts)} 衛")
-    if year_min or year_max:
-        if year_min and year_max:
-            lines.append(f"屋齡：{year_min}-{year_max} 年建")
-        elif year_min:
-            lines.append(f"屋齡：≥ {year_min} 年建")
-        elif year_max:
-            lines.append(f"屋齡：≤ {year_max} 年建")
+    year_line = _range_line("屋齡", year_min, year_max, "年建")
+    if year_line:
+        lines.append(year_line)
     if kw_include:
         lines.append(f"包含：{', '.join(kw_include)}")
     if kw_exclude:
@@ -2390,23 +2692,75 @@ def _config_summary(db_config: DbConfig) -> str:
     lines.append(f"頁數：{max_pages}")
     schedule_status = "已暫停" if paused else f"每 {interval} 分鐘"
     lines.append(f"排程：{schedule_status}")
+    return "\n".join(lines)
+
+
+def _maps_summary_line(db_config: DbConfig) -> str:
+    """Map thumbnail status line, including this month's API usage."""
     maps_enabled = db_config.get("maps.enabled", False)
     maps_has_key = bool(db_config.get("maps.api_key"))
-    if maps_enabled:
-        map_status = "已開啟" if maps_has_key else "已開啟（缺 API Key）"
-        provider = _get_map_provider(db_config)
-        if provider:
-            used, limit = provider.get_monthly_usage()
-            limit_label = "無限制" if limit <= 0 else str(limit)
-            map_status += f"（本月 {used}/{limit_label}）"
-        lines.append(f"地圖：{map_status}")
-    else:
-        lines.append("地圖：已關閉")
-    return "\n".join(lines)
+    if not maps_enabled:
+        return "地圖：已關閉"
+    map_status = "已開啟" if maps_has_key else "已開啟（缺 API Key）"
+    # Summary text is built on the event loop, so only read the kept usage here
+    usage = _maps_usage(db_config, refresh=False)
+    if usage:
+        used, limit = usage
+        limit_label = "無限制" if limit <= 0 else str(limit)
+        map_status += f"（本月 {used}/{limit_label}）"
+    return f"地圖：{map_status}"
+
+
+# Seconds a monthly usage reading is reused before the usage file is re-read
+_MAPS_USAGE_TTL = 60.0
+_MAPS_USAGE_KEYS = ("maps.enabled", "maps.api_key", "maps.cache_dir", "maps.monthly_limit")
+_maps_usage_cache: tuple[tuple, float, tuple[int, int]] | None = None
+
+
+def _maps_usage(db_config: DbConfig, *, refresh: bool = True) -> tuple[int, int] | None:
+    """(used, limit) for this month's map API calls, or None if maps are off.
+
+    Building a provider reads its on-disk caches, so the reading is kept for
+    _MAPS_USAGE_TTL seconds per cache dir / limit. With refresh=False only the
+    kept reading is returned (even if past its TTL) and no file is touched.
+    """
+    global _maps_usage_cache
+    cfg = db_config.get_many(_MAPS_USAGE_KEYS, DEFAULTS)
+    if not cfg["maps.enabled"] or not cfg["maps.api_key"]:
+        return None
+    key = (cfg["maps.cache_dir"], cfg["maps.monthly_limit"])
+    now = time.monotonic()
+    cached = _maps_usage_cache
+    if cached is not None and cached[0] == key and (now < cached[1] or not refresh):
+        return cached[2]
+    if not refresh:
+        return None
+    provider = _get_map_provider(db_config)
+    if provider is None:
+        return None
+    usage = provider.get_monthly_usage()
+    _maps_usage_cache = (key, now + _MAPS_USAGE_TTL, usage)
+    return usage
+
+
+def _range_line(label: str, low, high, unit: str) -> str | None:
+    """Format an optional min/max filter line, or None when neither bound is set."""
+    if low and high:
+        return f"{label}：{low}-{high} {unit}"
+    if low:
+        return f"{label}：≥ {low} {unit}"
+    if high:
+        return f"{label}：≤ {high} {unit}"
+    return None
 
 
 def _region_names(region_ids: list[int]) -> str:
     """Convert a list of region IDs to a comma-separated Chinese name string."""
+    return _joined_region_names(tuple(region_ids))
+
+
+@functools.lru_cache(maxsize=256)
+def _joined_region_names(region_ids: tuple[int, ...]) -> str:
     return ", ".join(_REGION_ID_TO_NAME.get(r, str(r)) for r in region_ids)
 
 
@@ -2418,21 +2772,16 @@ def _build_keyword_keyboard(
 
     Shows existing keywords as deletable buttons, plus action buttons.
     """
-    buttons = []
-
     if not kw_include and not kw_exclude:
-        buttons.append([InlineKeyboardButton("尚無關鍵字", callback_data="kw_noop")])
+        buttons = [[InlineKeyboardButton("尚無關鍵字", callback_data="kw_noop")]]
     else:
-        for kw in kw_include:
-            buttons.append([InlineKeyboardButton(
-                f"✅ 包含：{kw}  ✕",
-                callback_data=f"kw_del_i:{kw}",
-            )])
-        for kw in kw_exclude:
-            buttons.append([InlineKeyboardButton(
-                f"🚫 排除：{kw}  ✕",
-                callback_data=f"kw_del_e:{kw}",
-            )])
+        buttons = [
+            [InlineKeyboardButton(f"✅ 包含：{kw}  ✕", callback_data=f"kw_del_i:{kw}")]
+            for kw in kw_include
+        ] + [
+            [InlineKeyboardButton(f"🚫 排除：{kw}  ✕", callback_data=f"kw_del_e:{kw}")]
+            for kw in kw_exclude
+        ]
 
     action_row = [
         InlineKeyboardButton("➕ 包含", callback_data="kw_add_include"),
@@ -2450,22 +2799,21 @@ def _build_keyword_keyboard(
 
 
 def _build_layout_keyboard(
-    room_counts: list[int],
-    bath_counts: list[int],
+    room_counts: set[int] | list[int],
+    bath_counts: set[int] | list[int],
 ) -> InlineKeyboardMarkup:
     """Build layout selection keyboard for room/bath counts."""
-    buttons = []
-    room_row = []
-    for n in (1, 2, 3):
-        prefix = "✅ " if n in room_counts else ""
-        room_row.append(InlineKeyboardButton(f"{prefix}{n}房", callback_data=f"layout:r:{n}"))
-    buttons.append(room_row)
-
-    bath_row = []
-    for n in (1, 2):
-        prefix = "✅ " if n in bath_counts else ""
-        bath_row.append(InlineKeyboardButton(f"{prefix}{n}衛", callback_data=f"layout:b:{n}"))
-    buttons.append(bath_row)
+    rooms, baths = set(room_counts), set(bath_counts)
+    buttons = [
+        [
+            InlineKeyboardButton(f"{'✅ ' if n in rooms else ''}{n}房", callback_data=f"layout:r:{n}")
+            for n in (1, 2, 3)
+        ],
+        [
+            InlineKeyboardButton(f"{'✅ ' if n in baths else ''}{n}衛", callback_data=f"layout:b:{n}")
+            for n in (1, 2)
+        ],
+    ]
 
     action_row = [
         InlineKeyboardButton("🗑 清除", callback_data="layout:clear"),
@@ -2475,15 +2823,17 @@ def _build_layout_keyboard(
     return InlineKeyboardMarkup(buttons)
 
 
-def _build_district_keyboard(
-    region_ids: list[int],
+_DISTRICT_CONFIRM_ROW = [InlineKeyboardButton("確認", callback_data="district_confirm")]
+
+
+@functools.lru_cache(maxsize=64)
+def _district_buttons(
+    region_ids: tuple[int, ...],
     mode: str,
-    selected: list[str],
-) -> InlineKeyboardMarkup | None:
-    """Build district selection inline keyboard for given regions and mode.
+) -> tuple[tuple[str, InlineKeyboardButton, InlineKeyboardButton], ...]:
+    """Prebuilt (district, plain button, selected button) triples for regions/mode.
 
-    Merges districts from all provided regions.
-    Returns None if no districts are available for the region/mode combination.
+    Buttons are immutable, so both states are built once and toggles only pick one.
     """
     section_map: dict[str, int] = {}
     for region_id in region_ids:
@@ -2492,39 +2842,66 @@ def _build_district_keyboard(
         else:
             section_map.update(RENT_SECTION_CODES.get(region_id, {}))
 
-    if not section_map:
+    return tuple(
+        (
+            district,
+            InlineKeyboardButton(district, callback_data=f"district_toggle:{district}"),
+            InlineKeyboardButton(f"✅ {district}", callback_data=f"district_toggle:{district}"),
+        )
+        for district in section_map
+    )
+
+
+def _ordered_districts(region_ids: list[int], mode: str, selected: set[str]) -> list[str]:
+    """Selected districts as a list in keyboard (section code table) order."""
+    triples = _district_buttons(tuple(region_ids), mode)
+    ordered = [district for district, _, _ in triples if district in selected]
+    # Keep anything not on the current keyboard (e.g. stale config) at the end
+    known = {district for district, _, _ in triples}
+    return ordered + sorted(selected - known)
+
+
+def _build_district_keyboard(
+    region_ids: list[int],
+    mode: str,
+    selected: set[str] | list[str],
+) -> InlineKeyboardMarkup | None:
+    """Build district selection inline keyboard for given regions and mode.
+
+    Merges districts from all provided regions.
+    Returns None if no districts are available for the region/mode combination.
+    """
+    triples = _district_buttons(tuple(region_ids), mode)
+    if not triples:
         return None
 
-    all_districts = list(section_map.keys())
-    buttons = []
-    row = []
-    for district in all_districts:
-        prefix = "✅ " if district in selected else ""
-        label = f"{prefix}{district}"
-        row.append(InlineKeyboardButton(label, callback_data=f"district_toggle:{district}"))
-        if len(row) == 3:
-            buttons.append(row)
-            row = []
-    if row:
-        buttons.append(row)
-    buttons.append([InlineKeyboardButton("確認", callback_data="district_confirm")])
+    chosen = set(selected)
+    flat = [on if district in chosen else off for district, off, on in triples]
+    buttons = [flat[i:i + 3] for i in range(0, len(flat), 3)]
+    buttons.append(_DISTRICT_CONFIRM_ROW)
     return InlineKeyboardMarkup(buttons)
 
 
+_PRICE_RANGE_RE = re.compile(r"\s*(\d+)\s*[-–—]\s*(\d+)\s*")
+_PRICE_SEPARATORS = str.maketrans("", "", ",，")
+
+
 def _parse_price_range(text: str) -> tuple[int, int] | None:
     """Parse 'min-max' price range text. Returns (min, max) or None."""
-    text = text.replace(",", "").replace("，", "").strip()
-    parts = text.split("-")
-    if len(parts) != 2:
+    m = _PRICE_RANGE_RE.fullmatch(text.translate(_PRICE_SEPARATORS))
+    if m is None:
         return None
-    try:
-        low = int(parts[0].strip())
-        high = int(parts[1].strip())
-        if low >= high or low < 0:
-            return None
-        return (low, high)
-    except ValueError:
+    low, high = int(m.group(1)), int(m.group(2))
+    if low >= high:
         return None
+    return (low, high)
+
+
+def _stop_scheduler(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Remove the pipeline job, if one is scheduled."""
+    job = context.bot_data.pop("_pipeline_job", None)
+    if job is not None:
+        job.schedule_removal()
 
 
 def _ensure_scheduler(context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -2532,12 +2909,11 @@ def _ensure_scheduler(context: ContextTypes.DEFAULT_TYPE) -> None:
     db_config: DbConfig = context.bot_data["db_config"]
     interval = db_config.get("scheduler.interval_minutes", 30)
 
-    existing = context.job_queue.get_jobs_by_name("pipeline")
-    for job in existing:
-        job.schedule_removal()
+    _stop_scheduler(context)
 
     if not db_config.get("scheduler.paused", False):
-        context.job_queue.run_repeating(
+        # Keep the handle so later removals don't scan the job queue by name
+        context.bot_data["_pipeline_job"] = context.job_queue.run_repeating(
             _scheduled_pipeline,
             interval=interval * 60,
             first=10,  # first run 10s after start
@@ -2550,6 +2926,37 @@ def _ensure_scheduler(context: ContextTypes.DEFAULT_TYPE) -> None:
 # Application builder
 # =============================================================================
 
+# Plain command → handler table (conversation entry points are wired separately)
+_COMMAND_HANDLERS = (
+    ("status", cmd_status),
+    ("help", cmd_help),
+    ("run", cmd_run),
+    ("dedupall", cmd_dedupall),
+    ("list", cmd_list),
+    ("favorites", cmd_favorites),
+    ("pause", cmd_pause),
+    ("resume", cmd_resume),
+    ("loglevel", cmd_loglevel),
+    ("config_export", cmd_config_export),
+)
+
+BOT_COMMANDS = [
+    BotCommand("start", "開始設定 / 重新設定"),
+    BotCommand("list", "瀏覽未讀物件"),
+    BotCommand("favorites", "查看最愛"),
+    BotCommand("settings", "修改設定"),
+    BotCommand("status", "查看狀態"),
+    BotCommand("help", "指令列表"),
+    BotCommand("run", "手動執行"),
+    BotCommand("dedupall", "全庫去重"),
+    BotCommand("pause", "暫停排程"),
+    BotCommand("resume", "恢復排程"),
+    BotCommand("loglevel", "調整日誌等級"),
+    BotCommand("config_export", "匯出目前設定"),
+    BotCommand("config_import", "匯入設定(JSON)"),
+]
+
+
 def create_application(
     bot_token: str,
     chat_id: str,
@@ -2575,6 +2982,7 @@ def create_application(
             SETUP_CONFIRM: [CallbackQueryHandler(setup_confirm_callback, pattern=r"^setup_confirm:")],
         },
         fallbacks=[CommandHandler("start", cmd_start, filters=auth)],
+        block=True,
     )
 
     # Settings ConversationHandler for text input states
@@ -2627,6 +3035,7 @@ def create_application(
         },
         fallbacks=[CommandHandler("settings", cmd_settings, filters=auth)],
         map_to_parent={},
+        block=True,
     )
 
     app = (
@@ -2635,6 +3044,12 @@ def create_application(
         .read_timeout(10)
         .write_timeout(10)
         .connect_timeout(10)
+        # Enough for concurrent non-blocking handlers plus one notification stream
+        .connection_pool_size(32)
+        .pool_timeout(10)
+        # Handlers run as separate tasks so /run and /dedupall don't stall other
+        # updates; conversations opt back into block=True to keep state ordered.
+        .defaults(Defaults(block=False))
         .build()
     )
 
@@ -2647,18 +3062,10 @@ def create_application(
     app.add_handler(setup_conv)
     app.add_handler(settings_conv)
     # settings_callback, set_mode_callback, and settings_district_callback are now in settings_conv
-    app.add_handler(CommandHandler("status", cmd_status, filters=auth))
-    app.add_handler(CommandHandler("help", cmd_help, filters=auth))
-    app.add_handler(CommandHandler("run", cmd_run, filters=auth))
-    app.add_handler(CommandHandler("dedupall", cmd_dedupall, filters=auth))
-    app.add_handler(CommandHandler("list", cmd_list, filters=auth))
+    for command, callback in _COMMAND_HANDLERS:
+        app.add_handler(CommandHandler(command, callback, filters=auth))
     app.add_handler(CallbackQueryHandler(list_callback, pattern=r"^list:"))
-    app.add_handler(CommandHandler("favorites", cmd_favorites, filters=auth))
     app.add_handler(CallbackQueryHandler(favorites_callback, pattern=r"^fav:"))
-    app.add_handler(CommandHandler("pause", cmd_pause, filters=auth))
-    app.add_handler(CommandHandler("resume", cmd_resume, filters=auth))
-    app.add_handler(CommandHandler("loglevel", cmd_loglevel, filters=auth))
-    app.add_handler(CommandHandler("config_export", cmd_config_export, filters=auth))
 
     # Dedicated conversation for config import (command → next message JSON)
     config_conv = ConversationHandler(
@@ -2670,6 +3077,7 @@ def create_application(
         },
         fallbacks=[CommandHandler("cancel", cmd_help, filters=auth)],
         map_to_parent={},
+        block=True,
     )
     app.add_handler(config_conv)
 
@@ -2695,21 +3103,7 @@ def run_bot(bot_token: str, chat_id: str, db_path: str) -> None:
         pass
 
     async def post_init(application: Application) -> None:
-        await application.bot.set_my_commands([
-            BotCommand("start", "開始設定 / 重新設定"),
-            BotCommand("list", "瀏覽未讀物件"),
-            BotCommand("favorites", "查看最愛"),
-            BotCommand("settings", "修改設定"),
-            BotCommand("status", "查看狀態"),
-            BotCommand("help", "指令列表"),
-            BotCommand("run", "手動執行"),
-            BotCommand("dedupall", "全庫去重"),
-            BotCommand("pause", "暫停排程"),
-            BotCommand("resume", "恢復排程"),
-            BotCommand("loglevel", "調整日誌等級"),
-            BotCommand("config_export", "匯出目前設定"),
-            BotCommand("config_import", "匯入設定(JSON)"),
-        ])
+        await application.bot.set_my_commands(BOT_COMMANDS)
         _ensure_scheduler(application)
         logger.info("Bot started")
 
@@ -122,67 +122,87 @@ DEFAULTS = {
 }
 
 
+_UPSERT_SQL = (
+    "INSERT INTO bot_config (key, value, updated_at) VALUES (?, ?, datetime('now')) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at"
+)
+
+
 class DbConfig:
     """Read/write configuration stored in SQLite bot_config table."""
 
     def __init__(self, conn: sqlite3.Connection):
         self.conn = conn
+        # key → raw JSON text; loaded lazily, kept in sync by set/set_many/delete
+        self._settings_cache: dict[str, str] | None = None
+        # Bumped on every change so callers can memoize derived values
+        self.version = 0
+
+    def _load_settings(self) -> dict[str, str]:
+        """Return the cached raw key/value map, reading the table once if needed."""
+        if self._settings_cache is None:
+            rows = self.conn.execute("SELECT key, value FROM bot_config").fetchall()
+            self._settings_cache = {
+                (r[0] if isinstance(r, tuple) else r["key"]): (
+                    r[1] if isinstance(r, tuple) else r["value"]
+                )
+                for r in rows
+            }
+        return self._settings_cache
+
+    def invalidate_cache(self) -> None:
+        """Drop the in-memory snapshot so the next read goes back to SQLite."""
+        self._settings_cache = None
+        self.version += 1
 
     def get(self, key: str, default=None):
         """Get a config value by key. Returns deserialized JSON value."""
-        row = self.conn.execute(
-            "SELECT value FROM bot_config WHERE key = ?", (key,)
-        ).fetchone()
-        if row is None:
+        raw = self._load_settings().get(key)
+        if raw is None:
             return default
-        return json.loads(row[0] if isinstance(row, tuple) else row["value"])
+        return json.loads(raw)
+
+    def get_many(self, keys: list[str], defaults: dict | None = None) -> dict:
+        """Get several config values in one pass; missing keys fall back to defaults."""
+        settings = self._load_settings()
+        defaults = defaults or {}
+        return {
+            key: json.loads(settings[key]) if key in settings else defaults.get(key)
+            for key in keys
+        }
 
     def set(self, key: str, value) -> None:
         """Set a config value. Value is JSON-serialized."""
-        self.conn.execute(
-            "INSERT INTO bot_config (key, value, updated_at) VALUES (?, ?, datetime('now')) "
-            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
-            (key, json.dumps(value, ensure_ascii=False)),
-        )
-        self.conn.commit()
+        self.set_many({key: value})
 
     def set_many(self, items: dict) -> None:
-        """Set multiple config values atomically."""
-        for key, value in items.items():
-            self.conn.execute(
-                "INSERT INTO bot_config (key, value, updated_at) VALUES (?, ?, datetime('now')) "
-                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
-                (key, json.dumps(value, ensure_ascii=False)),
-            )
-        self.conn.commit()
+        """Set multiple config values atomically (one commit)."""
+        rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in items.items()]
+        with self.conn:
+            self.conn.executemany(_UPSERT_SQL, rows)
+        self.version += 1
+        # Write-through so reads right after a write (e.g. summaries) stay warm
+        if self._settings_cache is not None:
+            self._settings_cache.update(rows)
 
     def delete(self, key: str) -> bool:
         """Delete a config key. Returns True if key existed."""
-        cursor = self.conn.execute("DELETE FROM bot_config WHERE key = ?", (key,))
-        self.conn.commit()
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM bot_config WHERE key = ?", (key,))
+        self.version += 1
+        if self._settings_cache is not None:
+            self._settings_cache.pop(key, None)
         return cursor.rowcount > 0
 
     def get_all(self) -> dict:
         """Get all config key-value pairs."""
-        rows = self.conn.execute("SELECT key, value FROM bot_config").fetchall()
-        return {
-            (r[0] if isinstance(r, tuple) else r["key"]): json.loads(
-                r[1] if isinstance(r, tuple) else r["value"]
-            )
-            for r in rows
-        }
+        return {key: json.loads(raw) for key, raw in self._load_settings().items()}
 
     def has_config(self) -> bool:
         """Check if any required config keys exist (i.e. setup has been done)."""
         extended_keys = REQUIRED_KEYS + ["search.region", "search.regions"]
-        row = self.conn.execute(
-            "SELECT COUNT(*) FROM bot_config WHERE key IN ({})".format(
-                ",".join("?" for _ in extended_keys)
-            ),
-            extended_keys,
-        ).fetchone()
-        count = row[0] if isinstance(row, tuple) else row[0]
-        return count > 0
+        settings = self._load_settings()
+        return any(k in settings for k in extended_keys)
 
     def build_config(self) -> Config:
         """Build a Config dataclass from DB values. Raises ValueError if required fields missing."""
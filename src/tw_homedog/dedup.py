@@ -12,20 +12,30 @@ DEFAULT_DEDUP_THRESHOLD = 0.82
 DEFAULT_PRICE_TOLERANCE = 0.05
 DEFAULT_SIZE_TOLERANCE = 0.08
 
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_WORD_RE = re.compile(r"[^\w\u4e00-\u9fff]")
+_FLOOR_SUFFIX_RE = re.compile(r"\d+樓")
+_TOKEN_RE = re.compile(r"[0-9a-zA-Z]+|[\u4e00-\u9fff]")
+_ROOM_RE = re.compile(r"(\d+)\s*房")
+_HALL_RE = re.compile(r"(\d+)\s*廳")
+_BATH_RE = re.compile(r"(\d+)\s*[衛厕廁]")
+_FLOOR_RE = re.compile(r"(\d+)\s*(?:f|樓)", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"(\d+)")
+
 
 def _normalize_text(value: str | None) -> str:
     if not value:
         return ""
     text = str(value).strip().lower().replace("台", "臺")
-    text = re.sub(r"\s+", "", text)
-    return re.sub(r"[^\w\u4e00-\u9fff]", "", text)
+    text = _WHITESPACE_RE.sub("", text)
+    return _NON_WORD_RE.sub("", text)
 
 
 def normalize_address(value: str | None) -> str:
     """Normalize address-like text to stable comparable text."""
     text = _normalize_text(value)
     # remove common floor suffixes that often differ between brokers
-    text = re.sub(r"\d+樓", "", text)
+    text = _FLOOR_SUFFIX_RE.sub("", text)
     return text
 
 
@@ -38,7 +48,7 @@ def _bigram_set(text: str) -> set[str]:
 def _token_set(text: str) -> set[str]:
     if not text:
         return set()
-    return set(re.findall(r"[0-9a-zA-Z]+|[\u4e00-\u9fff]", text))
+    return set(_TOKEN_RE.findall(text))
 
 
 def _jaccard(a: set[str], b: set[str]) -> float:
@@ -58,14 +68,14 @@ def _parse_float(value) -> float | None:
 
 def _parse_layout(text: str | None) -> tuple[int | None, int | None, int | None]:
     raw = str(text or "")
-    room = _extract_int(raw, r"(\d+)\s*房")
-    hall = _extract_int(raw, r"(\d+)\s*廳")
-    bath = _extract_int(raw, r"(\d+)\s*[衛厕廁]")
+    room = _extract_int(raw, _ROOM_RE)
+    hall = _extract_int(raw, _HALL_RE)
+    bath = _extract_int(raw, _BATH_RE)
     return room, hall, bath
 
 
-def _extract_int(text: str, pattern: str) -> int | None:
-    m = re.search(pattern, text)
+def _extract_int(text: str, pattern: re.Pattern[str]) -> int | None:
+    m = pattern.search(text)
     if not m:
         return None
     try:
@@ -76,9 +86,9 @@ def _extract_int(text: str, pattern: str) -> int | None:
 
 def _parse_floor(text: str | None) -> int | None:
     raw = str(text or "")
-    m = re.search(r"(\d+)\s*(?:f|樓)", raw, flags=re.IGNORECASE)
+    m = _FLOOR_RE.search(raw)
     if not m:
-        m = re.search(r"(\d+)", raw)
+        m = _DIGITS_RE.search(raw)
     if not m:
         return None
     try:
@@ -180,9 +190,22 @@ def score_duplicate(
     size_tolerance: float = DEFAULT_SIZE_TOLERANCE,
 ) -> DedupScore:
     """Return deterministic dedup score and reason for two listings."""
-    a = listing_to_features(left)
-    b = listing_to_features(right)
+    return score_features(
+        listing_to_features(left),
+        listing_to_features(right),
+        price_tolerance=price_tolerance,
+        size_tolerance=size_tolerance,
+    )
 
+
+def score_features(
+    a: DedupFeatures,
+    b: DedupFeatures,
+    *,
+    price_tolerance: float = DEFAULT_PRICE_TOLERANCE,
+    size_tolerance: float = DEFAULT_SIZE_TOLERANCE,
+) -> DedupScore:
+    """Score two pre-extracted feature sets; lets callers extract each listing once."""
     district_match = bool(a.district and a.district == b.district)
     address_sim = _address_similarity(a, b)
     price_sim = _relative_similarity(a.price, b.price, price_tolerance)
@@ -235,7 +258,7 @@ def _coarse_address_key(address: str) -> str:
     if not address:
         return ""
     # remove house numbers to stabilize against partial masking differences
-    key = re.sub(r"\d+", "", address)
+    key = _DIGITS_RE.sub("", address)
     return key[:24]
 
 
@@ -11,7 +11,9 @@ from tw_homedog.dedup import (
     DEFAULT_SIZE_TOLERANCE,
     build_entity_fingerprint,
     choose_canonical_listing,
+    listing_to_features,
     score_duplicate,
+    score_features,
 )
 from tw_homedog.storage import Storage
 
@@ -40,12 +42,13 @@ def _connected_components(
         return [listings]
 
     n = len(listings)
+    features = [listing_to_features(listing) for listing in listings]
     adj: list[set[int]] = [set() for _ in range(n)]
     for i in range(n):
         for j in range(i + 1, n):
-            score = score_duplicate(
-                listings[i],
-                listings[j],
+            score = score_features(
+                features[i],
+                features[j],
                 price_tolerance=price_tolerance,
                 size_tolerance=size_tolerance,
             )
@@ -152,6 +155,8 @@ def run_cleanup(
         price_tolerance=price_tolerance,
         size_tolerance=size_tolerance,
     )
+    pending_groups = len(plans)
+    pending_records = sum(len(p.duplicate_listing_ids) for p in plans)
     plans = plans[: max(batch_size, 1)]
 
     report: dict[str, Any] = {
@@ -166,6 +171,10 @@ def run_cleanup(
         "merged_groups": 0,
         "merged_records": 0,
         "cleanup_failed": 0,
+        # Groups left after this call; components are disjoint, so merging one
+        # never changes another and this equals what a fresh dry-run would see.
+        "remaining_groups": pending_groups,
+        "remaining_records": pending_records,
         "plans": [
             {
                 "entity_fingerprint": p.entity_fingerprint,
@@ -196,8 +205,11 @@ def run_cleanup(
                 reason=f"cleanup:{plan.reason}",
                 entity_fingerprint=plan.entity_fingerprint,
             )
-            report["merged_groups"] += 1 if merged > 0 else 0
             report["merged_records"] += merged
+            if merged > 0:
+                report["merged_groups"] += 1
+                report["remaining_groups"] -= 1
+                report["remaining_records"] -= len(plan.duplicate_listing_ids)
         except Exception:
             report["cleanup_failed"] += 1
 
@@ -1,8 +1,10 @@
 """Structured logging setup with console and rotating file handlers."""
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
@@ -10,15 +12,31 @@ LOG_DATEFMT = "%Y-%m-%dT%H:%M:%S"
 MAX_BYTES = 10 * 1024 * 1024  # 10MB
 BACKUP_COUNT = 5
 
+_listener: QueueListener | None = None
 
-def setup_logging(level: str | None = None, log_dir: str | None = None) -> None:
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(level: str | None = None, log_dir: str | None = None, use_queue: bool = False) -> None:
     """Configure root logger with console and optional file handler.
 
     Args:
         level: Log level string (DEBUG, INFO, WARNING, ERROR). Falls back to
                LOG_LEVEL env var, then defaults to INFO.
         log_dir: Directory for log files. If provided, adds a RotatingFileHandler.
+        use_queue: Route records through a QueueHandler so console/file writes
+                   happen on a background listener thread instead of the caller
+                   (i.e. never block the bot's event loop).
     """
+    global _listener
     log_level = level or os.environ.get("LOG_LEVEL", "INFO")
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
 
@@ -26,13 +44,15 @@ def setup_logging(level: str | None = None, log_dir: str | None = None) -> None:
     root.setLevel(numeric_level)
 
     # Clear existing handlers to avoid duplicates
+    _stop_listener()
     root.handlers.clear()
+    handlers: list[logging.Handler] = []
 
     # Console handler (stdout)
     console = logging.StreamHandler()
     console.setLevel(numeric_level)
     console.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
-    root.addHandler(console)
+    handlers.append(console)
 
     # File handler (rotating)
     if log_dir:
@@ -46,7 +66,16 @@ def setup_logging(level: str | None = None, log_dir: str | None = None) -> None:
         )
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
-        root.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if use_queue:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(QueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
 
 
 def set_log_level(level: str) -> None:
@@ -56,5 +85,8 @@ def set_log_level(level: str) -> None:
         raise ValueError(f"Invalid log level: {level}")
     root = logging.getLogger()
     root.setLevel(numeric_level)
-    for handler in root.handlers:
+    handlers = list(root.handlers)
+    if _listener is not None:
+        handlers.extend(_listener.handlers)
+    for handler in handlers:
         handler.setLevel(numeric_level)
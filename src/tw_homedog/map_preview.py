@@ -207,7 +207,13 @@ class MapThumbnailProvider:
         return f"{self.config.base_url}?{query}"
 
     def _build_cache_key(self, *, address: str, lat: float | None, lng: float | None) -> str:
-        key_src = f"{address}|{lat}|{lng}|{self.config.size}|{self.config.zoom}|{self.config.style}"
+        # With coordinates the rendered map ignores the address, so key on rounded
+        # coords (~1m) only; listings at the same spot then share one download.
+        if lat is not None and lng is not None:
+            location = f"{float(lat):.5f},{float(lng):.5f}"
+        else:
+            location = address
+        key_src = f"{location}|{self.config.size}|{self.config.zoom}|{self.config.style}"
         return hashlib.sha256(key_src.encode("utf-8")).hexdigest()
 
     def _cached_file_path(self, cache_key: str) -> Path:
@@ -158,27 +158,43 @@ def match_keywords(listing: dict, config: Config) -> bool:
     return True
 
 
+def matches_all(listing: dict, config: Config) -> bool:
+    """Check a listing against every configured criterion (cheapest checks first)."""
+    return (
+        match_price(listing, config)
+        and match_district(listing, config)
+        and match_size(listing, config)
+        and match_room(listing, config)
+        and match_bathroom(listing, config)
+        and match_build_year(listing, config)
+        and match_keywords(listing, config)
+    )
+
+
+def search_ranges(config: Config) -> dict[str, tuple]:
+    """Configured price/size bounds in the form Storage listing queries take.
+
+    Storage applies them with the same NULL-passes rule as match_price and
+    match_size, so prefiltering with them never changes what matches.
+    """
+    return {
+        "price": (config.search.price_min, config.search.price_max),
+        "size_ping": (config.search.min_ping, config.search.max_ping),
+    }
+
+
 def find_matching_listings(config: Config, storage: Storage) -> list[dict]:
     """Find all unnotified listings that match configured criteria."""
-    unnotified = storage.get_unnotified_listings()
-    matched = []
-
-    for listing in unnotified:
-        if not match_price(listing, config):
-            continue
-        if not match_district(listing, config):
-            continue
-        if not match_size(listing, config):
-            continue
-        if not match_room(listing, config):
-            continue
-        if not match_bathroom(listing, config):
-            continue
-        if not match_build_year(listing, config):
-            continue
-        if not match_keywords(listing, config):
-            continue
-        matched.append(listing)
+    unnotified = storage.get_unnotified_listings(ranges=search_ranges(config))
+    matched = [listing for listing in unnotified if matches_all(listing, config)]
 
     logger.info("Matched %d/%d unnotified listings", len(matched), len(unnotified))
     return matched
+
+
+def match_listings_by_ids(
+    config: Config, storage: Storage, listing_ids: list[str], source: str = "591"
+) -> list[dict]:
+    """Re-run the match predicates for specific listings only (e.g. after enrichment)."""
+    listings = storage.get_listings_by_ids(listing_ids, source=source)
+    return [listing for listing in listings if matches_all(listing, config)]
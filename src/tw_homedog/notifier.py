@@ -1,6 +1,7 @@
 """Telegram notification module."""
 
 import asyncio
+import contextlib
 import json
 import logging
 from typing import Optional
@@ -182,40 +183,57 @@ async def send_notifications(config: Config, storage: Storage, listings: list[di
     provider = _map_provider(config)
 
     mode = getattr(config.search, 'mode', 'buy')
-    for i, listing in enumerate(batch):
+
+    def _prepare(listing: dict) -> tuple[str, Optional[MapThumbnail]]:
         thumb: Optional[MapThumbnail] = None
         if provider:
             address = listing.get("address") or listing.get("address_zh") or ""
             lat = listing.get("lat") or listing.get("latitude")
             lng = listing.get("lng") or listing.get("longitude")
             thumb = provider.get_thumbnail(address=address, lat=lat, lng=lng)
-
-        msg = format_listing_message(listing, mode=mode, include_address=True)
-
-        if thumb:
-            file_id = await _send_photo(bot, config.telegram.chat_id, msg, thumb)
-            if file_id:
-                provider.remember_file_id(thumb.cache_key, file_id)
-                success = True
-                map_photo_sent += 1
+        return format_listing_message(listing, mode=mode, include_address=True), thumb
+
+    # Sends to one chat must stay paced, so instead of sending concurrently we
+    # prepare the next listing (map download) in a thread while this one is sent
+    # and the rate-limit delay elapses. Only one prepare runs at a time, so the
+    # thumbnail/usage files have a single writer. remember_file_id still runs on
+    # the loop during the next prepare; the one object both touch is the
+    # _file_id_index dict, which the prepare thread only reads.
+    next_prepared = asyncio.create_task(asyncio.to_thread(_prepare, batch[0]))
+    try:
+        for i, listing in enumerate(batch):
+            msg, thumb = await next_prepared
+            if i < len(batch) - 1:
+                next_prepared = asyncio.create_task(asyncio.to_thread(_prepare, batch[i + 1]))
+
+            if thumb:
+                file_id = await _send_photo(bot, config.telegram.chat_id, msg, thumb)
+                if file_id:
+                    provider.remember_file_id(thumb.cache_key, file_id)
+                    success = True
+                    map_photo_sent += 1
+                else:
+                    success = await _send_message(bot, config.telegram.chat_id, msg)
+                    map_fallback += 1
             else:
                 success = await _send_message(bot, config.telegram.chat_id, msg)
-                map_fallback += 1
-        else:
-            success = await _send_message(bot, config.telegram.chat_id, msg)
-
-        if success:
-            storage.record_notification(
-                listing["source"], listing["listing_id"]
-            )
-            sent_count += 1
-            logger.info("Notified: %s (%s)", listing["listing_id"], listing.get("title", ""))
-        else:
-            logger.error("Failed to notify: %s", listing["listing_id"])
 
-        # Rate limiting between messages
-        if i < len(batch) - 1:
-            await asyncio.sleep(MESSAGE_DELAY)
+            if success:
+                storage.record_notification(
+                    listing["source"], listing["listing_id"]
+                )
+                sent_count += 1
+                logger.debug("Notified: %s (%s)", listing["listing_id"], listing.get("title", ""))
+            else:
+                logger.error("Failed to notify: %s", listing["listing_id"])
+
+            # Rate limiting between messages
+            if i < len(batch) - 1:
+                await asyncio.sleep(MESSAGE_DELAY)
+    finally:
+        # Don't leave a prepare thread running (and spending map quota) unobserved
+        with contextlib.suppress(Exception):
+            await next_prepared
 
     logger.info("Sent %d/%d notifications", sent_count, len(batch))
     if provider:
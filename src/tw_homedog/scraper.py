@@ -2,18 +2,23 @@
 
 from __future__ import annotations
 
+import atexit
+import functools
 import logging
 import random
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 if TYPE_CHECKING:
     from tw_homedog.storage import Storage
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
 from tw_homedog.db_config import Config, SearchConfig
 from tw_homedog.regions import (
@@ -40,6 +45,22 @@ USER_AGENTS = [
 ]
 
 
+@functools.lru_cache(maxsize=1)
+def _shared_adapter() -> HTTPAdapter:
+    """Process-wide connection pool so keep-alive connections to 591 survive across runs."""
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    atexit.register(adapter.close)
+    return adapter
+
+
+def _new_session() -> requests.Session:
+    """Create a session backed by the shared connection pool."""
+    session = requests.Session()
+    session.mount("https://", _shared_adapter())
+    session.mount("http://", _shared_adapter())
+    return session
+
+
 # =============================================================================
 # Buy mode: BFF API-based scraper
 # =============================================================================
@@ -68,7 +89,7 @@ def _get_buy_session_headers(config: Config) -> tuple[requests.Session, dict]:
         cookie_str = '; '.join(f"{c['name']}={c['value']}" for c in cookies)
         browser.close()
 
-    session = requests.Session()
+    session = _new_session()
     headers = {
         'User-Agent': api_headers.get('user-agent', random.choice(USER_AGENTS)),
         'x-csrf-token': api_headers.get('x-csrf-token', ''),
@@ -150,7 +171,7 @@ def scrape_buy_listings(config: Config, progress_cb=None) -> list[dict]:
                 params['age_max'] = max(0, current_year - config.search.year_built_min)
         params['firstRow'] = first_row
 
-        logger.info("Fetching buy listings page %d (firstRow=%d)", page_num + 1, first_row)
+        logger.debug("Fetching buy listings page %d (firstRow=%d)", page_num + 1, first_row)
 
         try:
             resp = session.get(BUY_API_URL, params=params, headers=headers,
@@ -183,7 +204,7 @@ def scrape_buy_listings(config: Config, progress_cb=None) -> list[dict]:
                     f"買房 page {page_num + 1}: +{len(house_list)} (累計 {len(all_listings)})"
                 )
 
-            logger.info("Page %d: got %d items, total so far: %d (API total: %d)",
+            logger.debug("Page %d: got %d items, total so far: %d (API total: %d)",
                         page_num + 1, len(house_list), len(all_listings), total)
 
             first_row += page_size
@@ -288,10 +309,11 @@ def fetch_buy_listing_detail(
             logger.warning("Detail API returned %d for house_id=%s", resp.status_code, house_id)
             return None
         body = resp.json()
-        logger.debug(
-            "Detail API house_id=%s: status=%s, top-level keys=%s, type(data)=%s",
-            house_id, body.get("status"), list(body.keys()), type(body.get("data")),
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Detail API house_id=%s: status=%s, top-level keys=%s, type(data)=%s",
+                house_id, body.get("status"), list(body.keys()), type(body.get("data")),
+            )
         raw_data = body.get("data")
         data = raw_data if isinstance(raw_data, dict) else {}
         # status=0 responses may put ware/info/location at top level
@@ -304,7 +326,8 @@ def fetch_buy_listing_detail(
             )
             logger.debug("Detail API full response for house_id=%s: %s", house_id, body)
             return None
-        logger.debug("Detail data keys for house_id=%s: %s", house_id, list(data.keys()))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Detail data keys for house_id=%s: %s", house_id, list(data.keys()))
         return _extract_detail_fields(data)
     except Exception as e:
         logger.error("Failed to fetch detail for house_id=%s: %s", house_id, e)
@@ -328,31 +351,122 @@ def enrich_buy_listings(
     from tw_homedog.map_preview import geocode_address
 
     maps_api_key = getattr(getattr(config, "maps", None), "api_key", None)
-    geocode_cache: dict = {}
-    results = {}
-    for i, lid in enumerate(listing_ids):
-        logger.info("Enriching detail %d/%d: %s", i + 1, len(listing_ids), lid)
-        detail = fetch_buy_listing_detail(session, headers, lid, timeout=config.scraper.timeout)
-        if detail:
-            # Geocoding fallback when 591 doesn't provide coordinates
-            if detail.get("lat") is None and detail.get("lng") is None and maps_api_key and storage:
-                listing = storage.get_listing_by_id("591", lid)
-                address = (listing or {}).get("address") or ""
-                if address:
-                    lat, lng = geocode_address(
-                        address, api_key=maps_api_key, cache=geocode_cache,
-                    )
-                    if lat is not None and lng is not None:
-                        detail["lat"] = lat
-                        detail["lng"] = lng
-                        logger.debug("Geocoded %s → (%s, %s)", lid, lat, lng)
-            results[lid] = detail
-        if i < len(listing_ids) - 1:
-            time.sleep(random.uniform(config.scraper.delay_min, config.scraper.delay_max))
+    fetched = _fetch_details_concurrently(
+        config,
+        listing_ids,
+        session,
+        lambda worker_session, lid: fetch_buy_listing_detail(
+            worker_session, headers, lid, timeout=config.scraper.timeout
+        ),
+    )
+    results = {lid: detail for lid, detail in fetched if detail}
+
+    # Geocoding fallback when 591 doesn't provide coordinates
+    missing = [
+        lid for lid, detail in results.items()
+        if detail.get("lat") is None and detail.get("lng") is None
+    ]
+    if missing and maps_api_key and storage:
+        addresses = {
+            listing["listing_id"]: listing.get("address") or ""
+            for listing in storage.get_listings_by_ids(missing)
+        }
+        unique = list(dict.fromkeys(address for address in addresses.values() if address))
+        if unique:
+            # Google has no 591-style pacing, so geocode in a plain pool without delays
+            workers = max(1, min(config.scraper.max_workers, len(unique)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                coords = dict(zip(unique, pool.map(
+                    lambda address: geocode_address(address, api_key=maps_api_key), unique
+                )))
+            for lid, address in addresses.items():
+                lat, lng = coords.get(address, (None, None))
+                if lat is not None and lng is not None:
+                    results[lid]["lat"] = lat
+                    results[lid]["lng"] = lng
+                    logger.debug("Geocoded %s → (%s, %s)", lid, lat, lng)
+
     logger.info("Enriched %d/%d listings", len(results), len(listing_ids))
     return results
 
 
+class _RequestPacer:
+    """Spaces request starts across worker threads by the configured random delay.
+
+    Requests may still overlap in flight, but 591 sees at most one new request
+    per delay_min..delay_max seconds no matter how many workers are running.
+    """
+
+    def __init__(self, delay_min: float, delay_max: float):
+        self._delay_min = delay_min
+        self._delay_max = delay_max
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_start:
+                time.sleep(self._next_start - now)
+                now = self._next_start
+            self._next_start = now + random.uniform(self._delay_min, self._delay_max)
+
+
+def _clone_session(base: requests.Session) -> requests.Session:
+    """Per-thread copy of *base* (headers and cookies) on the shared connection pool."""
+    session = _new_session()
+    session.headers.update(base.headers)
+    session.cookies.update(base.cookies)
+    return session
+
+
+def _fetch_details_concurrently(
+    config: Config,
+    listing_ids: list[str],
+    session: requests.Session,
+    fetch_one,
+    progress_cb=None,
+    progress_label: str = "",
+) -> list[tuple[str, dict | None]]:
+    """Fetch details with up to ``config.scraper.max_workers`` requests in flight.
+
+    ``fetch_one(session, listing_id)`` gets a per-thread clone of *session*,
+    since a Session's cookie jar is not safe to share between threads. Request
+    starts go through one shared _RequestPacer, so the request rate towards 591
+    stays tied to the configured delay; only the waiting on responses overlaps.
+    Results keep input order; a failing fetch yields ``None`` without aborting
+    the batch.
+    """
+    total = len(listing_ids)
+    done = 0
+    lock = threading.Lock()
+    pacer = _RequestPacer(config.scraper.delay_min, config.scraper.delay_max)
+    local = threading.local()
+
+    def _worker(lid: str) -> dict | None:
+        nonlocal done
+        if not hasattr(local, "session"):
+            local.session = _clone_session(session)
+        if total > 1:
+            pacer.wait()
+        try:
+            detail = fetch_one(local.session, lid)
+        except Exception as e:
+            logger.error("Failed to fetch detail for %s: %s", lid, e)
+            detail = None
+        with lock:
+            done += 1
+            count = done
+        logger.debug("Fetched detail %d/%d: %s", count, total, lid)
+        if progress_cb and count % 5 == 0:
+            progress_cb(f"{progress_label} {count}/{total}")
+        return detail
+
+    workers = max(1, min(config.scraper.max_workers, total))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(zip(listing_ids, pool.map(_worker, listing_ids)))
+
+
 # =============================================================================
 # Rent mode: Playwright + HTTP scraper (original)
 # =============================================================================
@@ -414,7 +528,7 @@ def collect_listing_ids(config: Config, progress_cb=None) -> list[str]:
 
         for district_code in district_codes:
             url = build_search_url(config, district_code)
-            logger.info("Scraping search page: %s", url)
+            logger.debug("Scraping search page: %s", url)
 
             try:
                 page.goto(url, timeout=config.scraper.timeout * 1000)
@@ -465,7 +579,7 @@ def collect_listing_ids(config: Config, progress_cb=None) -> list[str]:
 
 def _get_session() -> requests.Session:
     """Create HTTP session with random User-Agent."""
-    session = requests.Session()
+    session = _new_session()
     session.headers.update({
         "User-Agent": random.choice(USER_AGENTS),
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -570,16 +684,15 @@ def scrape_rent_listings(config: Config, progress_cb=None) -> list[dict]:
         return []
 
     session = _get_session()
-    results = []
-
-    for i, lid in enumerate(listing_ids):
-        logger.info("Fetching detail %d/%d: %s", i + 1, len(listing_ids), lid)
-        detail = fetch_listing_detail(config, lid, session)
-        if detail:
-            results.append(detail)
-        if progress_cb and (i + 1) % 5 == 0:
-            progress_cb(f"租房 詳情 {i + 1}/{len(listing_ids)}")
-        time.sleep(random.uniform(config.scraper.delay_min, config.scraper.delay_max))
+    fetched = _fetch_details_concurrently(
+        config,
+        listing_ids,
+        session,
+        lambda worker_session, lid: fetch_listing_detail(config, lid, worker_session),
+        progress_cb=progress_cb,
+        progress_label="租房 詳情",
+    )
+    results = [detail for _, detail in fetched if detail]
 
     logger.info("Scraped %d listings out of %d IDs", len(results), len(listing_ids))
     return results
@@ -623,24 +736,31 @@ def _scrape_single_region(config: Config, region_id: int, progress_cb=None) -> l
         return scrape_rent_listings(temp_config, progress_cb=progress_cb)
 
 
-def scrape_listings(config: Config, progress_cb=None) -> list[dict]:
-    """Scrape listings based on config mode (rent or buy).
+def iter_scrape_listings(config: Config, progress_cb=None) -> Iterator[dict]:
+    """Yield raw listings region by region based on config mode (rent or buy).
 
     Iterates over regions sequentially to avoid Playwright threading issues.
+    Regions are scraped lazily, so callers only hold what they have not consumed.
     """
     regions = config.search.regions
     if not regions:
         regions = [1]
 
-    all_listings = []
+    total = 0
     for i, region_id in enumerate(regions):
         logger.info("Scraping region %d (%d/%d)", region_id, i + 1, len(regions))
         try:
             listings = _scrape_single_region(config, region_id, progress_cb=progress_cb)
-            all_listings.extend(listings)
-            logger.info("Region %d: got %d listings", region_id, len(listings))
         except Exception:
             logger.exception("Region %d scrape failed", region_id)
+            continue
+        logger.info("Region %d: got %d listings", region_id, len(listings))
+        total += len(listings)
+        yield from listings
 
-    logger.info("Sequential scrape complete: %d total listings from %d regions", len(all_listings), len(regions))
-    return all_listings
+    logger.info("Sequential scrape complete: %d total listings from %d regions", total, len(regions))
+
+
+def scrape_listings(config: Config, progress_cb=None) -> list[dict]:
+    """Scrape listings based on config mode (rent or buy)."""
+    return list(iter_scrape_listings(config, progress_cb=progress_cb))
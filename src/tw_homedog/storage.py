@@ -12,11 +12,31 @@ from tw_homedog.dedup import (
     DEFAULT_DEDUP_THRESHOLD,
     DEFAULT_PRICE_TOLERANCE,
     DEFAULT_SIZE_TOLERANCE,
+    DedupFeatures,
     build_entity_fingerprint,
-    score_duplicate,
+    listing_to_features,
+    score_features,
 )
 
 
+# Max bound parameters per IN (...) query; well under SQLite's default limit.
+IN_CHUNK_SIZE = 500
+
+# Newest rows per fingerprint bucket considered when scoring a new listing.
+DEDUP_CANDIDATE_LIMIT = 200
+
+_INSERT_DEDUP_AUDIT_SQL = """INSERT INTO dedup_audit
+   (event_type, source, listing_id, canonical_listing_id, candidate_ids, score,
+    reason, entity_fingerprint, metadata, created_at)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _chunked(values: list, size: int | None = None):
+    size = size or IN_CHUNK_SIZE
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS listings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,6 +73,7 @@ CREATE TABLE IF NOT EXISTS listings (
 );
 
 CREATE INDEX IF NOT EXISTS idx_listings_hash ON listings(raw_hash);
+CREATE INDEX IF NOT EXISTS idx_listings_district ON listings(district);
 
 CREATE TABLE IF NOT EXISTS notifications_sent (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -105,12 +126,21 @@ CREATE INDEX IF NOT EXISTS idx_dedup_audit_event_type
 """
 
 
+# Numeric listing columns that list queries can range-filter in SQL
+_RANGE_FILTER_COLUMNS = frozenset({"price", "size_ping"})
+
+
 class Storage:
     def __init__(self, db_path: str):
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         # check_same_thread=False avoids scheduler/thread callbacks crashing on shared DB handle.
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute("PRAGMA journal_mode=WAL")
+        # The bot keeps this one connection for its whole lifetime, so tune it once here.
+        # synchronous=NORMAL is durable under WAL except on power loss mid-checkpoint.
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-64000")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
         self.conn.row_factory = sqlite3.Row
         self._init_schema()
 
@@ -142,9 +172,11 @@ class Storage:
             if col not in existing:
                 self.conn.execute(f"ALTER TABLE listings ADD COLUMN {col} {col_type}")
 
+        # Trailing created_at lets candidate lookups read the newest-N straight off the index
+        self.conn.execute("DROP INDEX IF EXISTS idx_listings_fingerprint")
         self.conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_listings_fingerprint "
-            "ON listings(source, entity_fingerprint)"
+            "CREATE INDEX IF NOT EXISTS idx_listings_fingerprint_created "
+            "ON listings(source, entity_fingerprint, created_at)"
         )
         self.conn.execute(
             "CREATE TABLE IF NOT EXISTS favorites ("
@@ -220,35 +252,38 @@ class Storage:
             normalized["entity_fingerprint"] = build_entity_fingerprint(normalized)
         return normalized
 
-    def _insert_listing_row(self, listing: dict) -> None:
-        self.conn.execute(
-            """INSERT INTO listings
+    _INSERT_LISTING_SQL = """INSERT INTO listings
                (source, listing_id, title, price, address, district,
                 size_ping, floor, url, published_at, raw_hash, houseage,
                 unit_price, kind_name, room, tags, community_name, entity_fingerprint)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                listing["source"],
-                listing["listing_id"],
-                listing.get("title"),
-                listing.get("price"),
-                listing.get("address"),
-                listing.get("district"),
-                listing.get("size_ping"),
-                listing.get("floor"),
-                listing.get("url"),
-                listing.get("published_at"),
-                listing.get("raw_hash"),
-                listing.get("houseage"),
-                listing.get("unit_price"),
-                listing.get("kind_name"),
-                listing.get("room"),
-                json.dumps(listing.get("tags") or [], ensure_ascii=False),
-                listing.get("community_name"),
-                listing.get("entity_fingerprint"),
-            ),
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+    @staticmethod
+    def _listing_row_params(listing: dict) -> tuple:
+        return (
+            listing["source"],
+            listing["listing_id"],
+            listing.get("title"),
+            listing.get("price"),
+            listing.get("address"),
+            listing.get("district"),
+            listing.get("size_ping"),
+            listing.get("floor"),
+            listing.get("url"),
+            listing.get("published_at"),
+            listing.get("raw_hash"),
+            listing.get("houseage"),
+            listing.get("unit_price"),
+            listing.get("kind_name"),
+            listing.get("room"),
+            json.dumps(listing.get("tags") or [], ensure_ascii=False),
+            listing.get("community_name"),
+            listing.get("entity_fingerprint"),
         )
 
+    def _insert_listing_row(self, listing: dict) -> None:
+        self.conn.execute(self._INSERT_LISTING_SQL, self._listing_row_params(listing))
+
     def insert_listing_with_dedup(
         self,
         listing: dict,
@@ -272,81 +307,38 @@ class Storage:
             "entity_fingerprint": fingerprint,
         }
 
-        existing_id = self.conn.execute(
-            "SELECT listing_id FROM listings WHERE source = ? AND listing_id = ?",
-            (source, listing_id),
+        # One lookup covers both the id and raw_hash pre-checks; an id hit wins.
+        raw_hash = listing.get("raw_hash")
+        existing = self.conn.execute(
+            """SELECT listing_id, (source = ? AND listing_id = ?) AS same_id
+               FROM listings
+               WHERE (source = ? AND listing_id = ?) OR (? IS NOT NULL AND raw_hash = ?)
+               ORDER BY same_id DESC LIMIT 1""",
+            (source, listing_id, source, listing_id, raw_hash or None, raw_hash or None),
         ).fetchone()
-        if existing_id:
-            result["reason"] = "duplicate_listing_id"
-            result["canonical_listing_id"] = existing_id["listing_id"]
+        if existing:
+            result["reason"] = "duplicate_listing_id" if existing["same_id"] else "duplicate_raw_hash"
+            result["canonical_listing_id"] = existing["listing_id"]
             self.record_dedup_decision(
                 event_type="skip",
                 source=source,
                 listing_id=listing_id,
-                canonical_listing_id=existing_id["listing_id"],
-                candidate_ids=[existing_id["listing_id"]],
+                canonical_listing_id=existing["listing_id"],
+                candidate_ids=[existing["listing_id"]],
                 score=1.0,
                 reason=result["reason"],
                 entity_fingerprint=fingerprint,
             )
             return result
 
-        if listing.get("raw_hash"):
-            existing_hash = self.conn.execute(
-                "SELECT listing_id, source FROM listings WHERE raw_hash = ? LIMIT 1",
-                (listing["raw_hash"],),
-            ).fetchone()
-            if existing_hash:
-                result["reason"] = "duplicate_raw_hash"
-                result["canonical_listing_id"] = existing_hash["listing_id"]
-                self.record_dedup_decision(
-                    event_type="skip",
-                    source=source,
-                    listing_id=listing_id,
-                    canonical_listing_id=existing_hash["listing_id"],
-                    candidate_ids=[existing_hash["listing_id"]],
-                    score=1.0,
-                    reason=result["reason"],
-                    entity_fingerprint=fingerprint,
-                )
-                return result
-
         if dedup_enabled and fingerprint:
-            best_score = 0.0
-            best_candidate: dict[str, Any] | None = None
-
-            db_candidates = self.get_dedup_candidates(source, fingerprint)
-            for candidate in db_candidates:
-                scored = score_duplicate(
-                    listing,
-                    candidate,
-                    price_tolerance=price_tolerance,
-                    size_tolerance=size_tolerance,
-                )
-                if scored.score > best_score:
-                    best_score = scored.score
-                    best_candidate = {
-                        "listing_id": candidate["listing_id"],
-                        "reason": scored.reason,
-                        "score": scored.score,
-                    }
-
-            if batch_cache:
-                for candidate in batch_cache.get(fingerprint, []):
-                    scored = score_duplicate(
-                        listing,
-                        candidate,
-                        price_tolerance=price_tolerance,
-                        size_tolerance=size_tolerance,
-                    )
-                    if scored.score > best_score:
-                        best_score = scored.score
-                        best_candidate = {
-                            "listing_id": candidate.get("listing_id"),
-                            "reason": f"batch:{scored.reason}",
-                            "score": scored.score,
-                        }
-
+            best_score, best_candidate = self._best_dedup_candidate(
+                listing,
+                self.get_dedup_candidates(source, fingerprint),
+                batch_cache.get(fingerprint, []) if batch_cache else [],
+                price_tolerance=price_tolerance,
+                size_tolerance=size_tolerance,
+            )
             if best_candidate and best_score >= dedup_threshold:
                 result["reason"] = "duplicate_entity"
                 result["score"] = round(best_score, 4)
@@ -375,6 +367,209 @@ class Storage:
             result["reason"] = "duplicate_integrity"
             return result
 
+    @staticmethod
+    def _best_dedup_candidate(
+        listing: dict,
+        db_candidates: list[dict],
+        batch_candidates: list[dict],
+        *,
+        price_tolerance: float,
+        size_tolerance: float,
+        features_cache: dict[int, DedupFeatures] | None = None,
+    ) -> tuple[float, dict[str, Any] | None]:
+        # features_cache is keyed by id() of candidate dicts that outlive the call
+        features = listing_to_features(listing)
+
+        def _candidate_features(candidate: dict) -> DedupFeatures:
+            if features_cache is None:
+                return listing_to_features(candidate)
+            key = id(candidate)
+            if key not in features_cache:
+                features_cache[key] = listing_to_features(candidate)
+            return features_cache[key]
+
+        best_score = 0.0
+        best_candidate: dict[str, Any] | None = None
+        for candidate in db_candidates:
+            scored = score_features(
+                features,
+                _candidate_features(candidate),
+                price_tolerance=price_tolerance,
+                size_tolerance=size_tolerance,
+            )
+            if scored.score > best_score:
+                best_score = scored.score
+                best_candidate = {
+                    "listing_id": candidate["listing_id"],
+                    "reason": scored.reason,
+                    "score": scored.score,
+                }
+        for candidate in batch_candidates:
+            scored = score_features(
+                features,
+                _candidate_features(candidate),
+                price_tolerance=price_tolerance,
+                size_tolerance=size_tolerance,
+            )
+            if scored.score > best_score:
+                best_score = scored.score
+                best_candidate = {
+                    "listing_id": candidate.get("listing_id"),
+                    "reason": f"batch:{scored.reason}",
+                    "score": scored.score,
+                }
+        return best_score, best_candidate
+
+    def bulk_insert_listings_with_dedup(
+        self,
+        listings: list[dict],
+        *,
+        batch_cache: dict[str, list[dict]] | None = None,
+        dedup_enabled: bool = False,
+        dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        price_tolerance: float = DEFAULT_PRICE_TOLERANCE,
+        size_tolerance: float = DEFAULT_SIZE_TOLERANCE,
+    ) -> list[dict[str, Any]]:
+        """Insert many listings in one transaction; returns per-row dedup decisions.
+
+        Decisions match calling insert_listing_with_dedup() row by row, but
+        existing ids/hashes/fingerprint candidates are preloaded in chunked
+        IN queries and all writes go through executemany with a single commit.
+        """
+        if batch_cache is None:
+            batch_cache = {}
+        rows = [self._normalize_listing(listing) for listing in listings]
+
+        existing_ids: dict[tuple[str, str], str] = {}
+        for source in {row["source"] for row in rows}:
+            ids = [row["listing_id"] for row in rows if row["source"] == source]
+            for chunk in _chunked(ids):
+                placeholders = ",".join("?" * len(chunk))
+                for found in self.conn.execute(
+                    f"SELECT listing_id FROM listings WHERE source = ? "
+                    f"AND listing_id IN ({placeholders})",
+                    [source, *chunk],
+                ):
+                    existing_ids[(source, found["listing_id"])] = found["listing_id"]
+
+        existing_hashes: dict[str, str] = {}
+        hashes = list({row["raw_hash"] for row in rows if row.get("raw_hash")})
+        for chunk in _chunked(hashes):
+            placeholders = ",".join("?" * len(chunk))
+            for found in self.conn.execute(
+                f"SELECT listing_id, raw_hash FROM listings WHERE raw_hash IN ({placeholders})",
+                chunk,
+            ):
+                existing_hashes.setdefault(found["raw_hash"], found["listing_id"])
+
+        db_candidates: dict[tuple[str, str], list[dict]] = {}
+        if dedup_enabled:
+            for source in {row["source"] for row in rows}:
+                fingerprints = list({
+                    row["entity_fingerprint"]
+                    for row in rows
+                    if row["source"] == source and row.get("entity_fingerprint")
+                })
+                for chunk in _chunked(fingerprints):
+                    placeholders = ",".join("?" * len(chunk))
+                    # Same newest-N window per fingerprint as get_dedup_candidates()
+                    for found in self.conn.execute(
+                        f"SELECT * FROM ("
+                        f"SELECT *, ROW_NUMBER() OVER ("
+                        f"PARTITION BY entity_fingerprint ORDER BY created_at DESC) AS _rn "
+                        f"FROM listings WHERE source = ? "
+                        f"AND entity_fingerprint IN ({placeholders})"
+                        f") WHERE _rn <= ? ORDER BY _rn",
+                        [source, *chunk, DEDUP_CANDIDATE_LIMIT],
+                    ):
+                        candidate = dict(found)
+                        candidate.pop("_rn", None)
+                        db_candidates.setdefault(
+                            (source, candidate["entity_fingerprint"]), []
+                        ).append(candidate)
+
+        results: list[dict[str, Any]] = []
+        features_cache: dict[int, DedupFeatures] = {}
+        insert_params: list[tuple] = []
+        audit_params: list[tuple] = []
+        now = datetime.now(timezone.utc).isoformat()
+
+        def _skip(result: dict, listing: dict, canonical: str, score: float, reason: str):
+            result["canonical_listing_id"] = canonical
+            audit_params.append((
+                "skip",
+                listing["source"],
+                listing["listing_id"],
+                canonical,
+                json.dumps([canonical], ensure_ascii=False),
+                score,
+                reason,
+                listing.get("entity_fingerprint"),
+                json.dumps({}, ensure_ascii=False),
+                now,
+            ))
+
+        for listing in rows:
+            source = listing["source"]
+            listing_id = listing["listing_id"]
+            fingerprint = listing.get("entity_fingerprint")
+            result: dict[str, Any] = {
+                "inserted": False,
+                "reason": "",
+                "score": None,
+                "canonical_listing_id": None,
+                "entity_fingerprint": fingerprint,
+            }
+            results.append(result)
+
+            if (source, listing_id) in existing_ids:
+                result["reason"] = "duplicate_listing_id"
+                _skip(result, listing, existing_ids[(source, listing_id)], 1.0, result["reason"])
+                continue
+
+            raw_hash = listing.get("raw_hash")
+            if raw_hash and raw_hash in existing_hashes:
+                result["reason"] = "duplicate_raw_hash"
+                _skip(result, listing, existing_hashes[raw_hash], 1.0, result["reason"])
+                continue
+
+            if dedup_enabled and fingerprint:
+                best_score, best_candidate = self._best_dedup_candidate(
+                    listing,
+                    db_candidates.get((source, fingerprint), []),
+                    batch_cache.get(fingerprint, []),
+                    price_tolerance=price_tolerance,
+                    size_tolerance=size_tolerance,
+                    features_cache=features_cache,
+                )
+                if best_candidate and best_score >= dedup_threshold:
+                    result["reason"] = "duplicate_entity"
+                    result["score"] = round(best_score, 4)
+                    _skip(
+                        result, listing, best_candidate["listing_id"],
+                        best_score, best_candidate["reason"],
+                    )
+                    continue
+
+            insert_params.append(self._listing_row_params(listing))
+            existing_ids[(source, listing_id)] = listing_id
+            if raw_hash:
+                existing_hashes[raw_hash] = listing_id
+            if fingerprint:
+                batch_cache.setdefault(fingerprint, []).append(dict(listing))
+            result["inserted"] = True
+            result["reason"] = "inserted"
+
+        with self.conn:
+            if insert_params:
+                self.conn.executemany(
+                    self._INSERT_LISTING_SQL + " ON CONFLICT(source, listing_id) DO NOTHING",
+                    insert_params,
+                )
+            if audit_params:
+                self.conn.executemany(_INSERT_DEDUP_AUDIT_SQL, audit_params)
+        return results
+
     def insert_listing(self, listing: dict) -> bool:
         """Insert a listing if not duplicate. Returns True if inserted."""
         return bool(self.insert_listing_with_dedup(listing)["inserted"])
@@ -385,7 +580,7 @@ class Storage:
         entity_fingerprint: str,
         *,
         exclude_listing_id: str | None = None,
-        limit: int = 200,
+        limit: int = DEDUP_CANDIDATE_LIMIT,
     ) -> list[dict]:
         if not entity_fingerprint:
             return []
@@ -415,10 +610,7 @@ class Storage:
         metadata: dict | None = None,
     ) -> None:
         self.conn.execute(
-            """INSERT INTO dedup_audit
-               (event_type, source, listing_id, canonical_listing_id, candidate_ids, score,
-                reason, entity_fingerprint, metadata, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            _INSERT_DEDUP_AUDIT_SQL,
             (
                 event_type,
                 source,
@@ -649,55 +841,88 @@ class Storage:
         )
         self.conn.commit()
 
-    def get_unnotified_listings(self, channel: str = "telegram") -> list[dict]:
-        """Get all listings that haven't been notified yet."""
+    def get_unnotified_listings(
+        self, channel: str = "telegram", ranges: dict[str, tuple] | None = None
+    ) -> list[dict]:
+        """Get all listings that haven't been notified yet, optionally within ranges."""
+        conditions, params = self._listing_conditions(None, ranges)
+        conditions.insert(0, "n.id IS NULL")
         rows = self.conn.execute(
-            """SELECT l.* FROM listings l
+            f"""SELECT l.* FROM listings l
                LEFT JOIN notifications_sent n
                  ON l.source = n.source AND l.listing_id = n.listing_id AND n.channel = ?
-               WHERE n.id IS NULL""",
-            (channel,),
+               WHERE {" AND ".join(conditions)}""",
+            [channel, *params],
         ).fetchall()
         return [dict(row) for row in rows]
 
-    def update_listing_detail(self, source: str, listing_id: str, detail: dict):
-        """Update a listing with detail enrichment data."""
-        self.conn.execute(
-            """UPDATE listings SET
+    _UPDATE_DETAIL_SQL = """UPDATE listings SET
                 parking_desc = ?, public_ratio = ?, manage_price_desc = ?,
                 fitment = ?, shape_name = ?, community_name = ?,
                 main_area = ?, direction = ?, lat = ?, lng = ?,
                 is_enriched = 1
-               WHERE source = ? AND listing_id = ?""",
-            (
-                detail.get("parking_desc"),
-                detail.get("public_ratio"),
-                detail.get("manage_price_desc"),
-                detail.get("fitment"),
-                detail.get("shape_name"),
-                detail.get("community_name"),
-                detail.get("main_area"),
-                detail.get("direction"),
-                detail.get("lat"),
-                detail.get("lng"),
-                source,
-                listing_id,
-            ),
+               WHERE source = ? AND listing_id = ?"""
+
+    @staticmethod
+    def _detail_params(source: str, listing_id: str, detail: dict) -> tuple:
+        return (
+            detail.get("parking_desc"),
+            detail.get("public_ratio"),
+            detail.get("manage_price_desc"),
+            detail.get("fitment"),
+            detail.get("shape_name"),
+            detail.get("community_name"),
+            detail.get("main_area"),
+            detail.get("direction"),
+            detail.get("lat"),
+            detail.get("lng"),
+            source,
+            listing_id,
+        )
+
+    def update_listing_detail(self, source: str, listing_id: str, detail: dict):
+        """Update a listing with detail enrichment data."""
+        self.conn.execute(
+            self._UPDATE_DETAIL_SQL, self._detail_params(source, listing_id, detail)
         )
         self.conn.commit()
 
+    def bulk_update_listing_details(self, source: str, details: dict[str, dict]) -> None:
+        """Apply many detail enrichments in one transaction ({listing_id: detail})."""
+        if not details:
+            return
+        with self.conn:
+            self.conn.executemany(
+                self._UPDATE_DETAIL_SQL,
+                [self._detail_params(source, lid, detail) for lid, detail in details.items()],
+            )
+
     def get_unenriched_listing_ids(self, listing_ids: list[str], source: str = "591") -> list[str]:
         """Return listing_ids that haven't been enriched yet."""
-        if not listing_ids:
-            return []
-        placeholders = ",".join("?" for _ in listing_ids)
-        rows = self.conn.execute(
-            f"""SELECT listing_id FROM listings
-                WHERE source = ? AND listing_id IN ({placeholders})
-                AND is_enriched = 0""",
-            [source] + listing_ids,
-        ).fetchall()
-        return [row["listing_id"] for row in rows]
+        result: list[str] = []
+        for chunk in _chunked(list(listing_ids)):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"""SELECT listing_id FROM listings
+                    WHERE source = ? AND listing_id IN ({placeholders})
+                    AND is_enriched = 0""",
+                [source, *chunk],
+            ).fetchall()
+            result.extend(row["listing_id"] for row in rows)
+        return result
+
+    def get_listings_by_ids(self, listing_ids: list[str], source: str = "591") -> list[dict]:
+        """Fetch listings by id, preserving the order of *listing_ids*."""
+        found: dict[str, dict] = {}
+        for chunk in _chunked(list(listing_ids)):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT * FROM listings WHERE source = ? AND listing_id IN ({placeholders})",
+                [source, *chunk],
+            ).fetchall()
+            for row in rows:
+                found[row["listing_id"]] = dict(row)
+        return [found[lid] for lid in listing_ids if lid in found]
 
     def get_listing_count(self) -> int:
         """Get total number of listings in DB."""
@@ -715,26 +940,65 @@ class Storage:
         ).fetchone()
         return row[0]
 
-    def get_unread_listings(self) -> list[dict]:
-        """Get all listings that are unread (no read record or content changed)."""
+    @staticmethod
+    def _listing_conditions(
+        district: str | None, ranges: dict[str, tuple] | None
+    ) -> tuple[list[str], list]:
+        """WHERE conditions (on alias l) for an exact district and numeric ranges.
+
+        Range bounds mirror the matcher: a NULL column never rejects a listing.
+        """
+        conditions: list[str] = []
+        params: list = []
+        if district:
+            conditions.append("l.district = ?")
+            params.append(district)
+        for column, (low, high) in (ranges or {}).items():
+            if column not in _RANGE_FILTER_COLUMNS:
+                raise ValueError(f"Unsupported range column: {column}")
+            if low is not None:
+                conditions.append(f"(l.{column} IS NULL OR l.{column} >= ?)")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"(l.{column} IS NULL OR l.{column} <= ?)")
+                params.append(high)
+        return conditions, params
+
+    def get_unread_listings(
+        self, district: str | None = None, ranges: dict[str, tuple] | None = None
+    ) -> list[dict]:
+        """Get all listings that are unread (no read record or content changed).
+
+        If district is given, only listings in that district are returned;
+        ranges maps a numeric column (price, size_ping) to (min, max) bounds.
+        """
+        conditions, params = self._listing_conditions(district, ranges)
+        conditions.insert(0, "(r.source IS NULL OR l.raw_hash != r.raw_hash)")
         rows = self.conn.execute(
-            """SELECT l.* FROM listings l
+            f"""SELECT l.* FROM listings l
                LEFT JOIN listings_read r
                  ON l.source = r.source AND l.listing_id = r.listing_id
-               WHERE r.source IS NULL OR l.raw_hash != r.raw_hash
-               ORDER BY l.id DESC"""
+               WHERE {" AND ".join(conditions)}
+               ORDER BY l.id DESC""",
+            params,
         ).fetchall()
         return [dict(row) for row in rows]
 
-    def get_listings_with_read_status(self) -> list[dict]:
-        """Get all listings with is_read flag."""
+    def get_listings_with_read_status(
+        self, district: str | None = None, ranges: dict[str, tuple] | None = None
+    ) -> list[dict]:
+        """Get all listings with is_read flag; district/ranges filter as in get_unread_listings."""
+        conditions, params = self._listing_conditions(district, ranges)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         rows = self.conn.execute(
-            """SELECT l.*, CASE WHEN r.listing_id IS NULL THEN 0
+            f"""SELECT l.*, CASE WHEN r.listing_id IS NULL THEN 0
                                 WHEN l.raw_hash = r.raw_hash THEN 1 ELSE 0 END AS is_read
                FROM listings l
                LEFT JOIN listings_read r
                  ON l.source = r.source AND l.listing_id = r.listing_id
-               ORDER BY l.id DESC"""
+               {where}
+               ORDER BY l.id DESC""",
+            params,
         ).fetchall()
         result = []
         for row in rows:
@@ -761,35 +1025,36 @@ class Storage:
         self.conn.commit()
 
     def mark_many_as_read(self, source: str, listing_ids: list[str]):
-        """Bulk mark listings as read with their current raw_hashes."""
+        """Bulk mark listings as read with their current raw_hashes.
+
+        The raw_hash is copied inside SQLite with INSERT ... SELECT, so the
+        ids are never joined against a Python-side hash map.
+        """
         if not listing_ids:
             return
         now = datetime.now(timezone.utc).isoformat()
-        placeholders = ",".join("?" for _ in listing_ids)
-        rows = self.conn.execute(
-            f"SELECT listing_id, raw_hash FROM listings WHERE source = ? AND listing_id IN ({placeholders})",
-            [source] + listing_ids,
-        ).fetchall()
-        hash_map = {row["listing_id"]: row["raw_hash"] for row in rows}
-        for lid in listing_ids:
-            self.conn.execute(
-                """INSERT INTO listings_read (source, listing_id, raw_hash, read_at)
-                   VALUES (?, ?, ?, ?)
-                   ON CONFLICT(source, listing_id)
-                   DO UPDATE SET raw_hash = excluded.raw_hash, read_at = excluded.read_at""",
-                (source, lid, hash_map.get(lid), now),
-            )
-        self.conn.commit()
+        with self.conn:
+            for chunk in _chunked(list(listing_ids)):
+                placeholders = ",".join("?" for _ in chunk)
+                self.conn.execute(
+                    f"""INSERT INTO listings_read (source, listing_id, raw_hash, read_at)
+                        SELECT source, listing_id, raw_hash, ? FROM listings
+                        WHERE source = ? AND listing_id IN ({placeholders})
+                        ON CONFLICT(source, listing_id)
+                        DO UPDATE SET raw_hash = excluded.raw_hash, read_at = excluded.read_at""",
+                    [now, source, *chunk],
+                )
 
-    def get_unread_count(self) -> int:
-        """Get count of unread listings."""
+    def get_listing_counts(self) -> tuple[int, int]:
+        """Get (total, unread) listing counts in a single scan."""
         row = self.conn.execute(
-            """SELECT COUNT(*) FROM listings l
+            """SELECT COUNT(*),
+                      COALESCE(SUM(r.source IS NULL OR l.raw_hash != r.raw_hash), 0)
+               FROM listings l
                LEFT JOIN listings_read r
-                 ON l.source = r.source AND l.listing_id = r.listing_id
-               WHERE r.source IS NULL OR l.raw_hash != r.raw_hash"""
+                 ON l.source = r.source AND l.listing_id = r.listing_id"""
         ).fetchone()
-        return row[0]
+        return row[0], row[1]
 
     def get_listing_by_id(self, source: str, listing_id: str) -> dict | None:
         """Get a single listing by source and listing_id."""
@@ -825,10 +1090,19 @@ class Storage:
         ).fetchone()
         return row is not None
 
-    def get_favorites(self) -> list[dict]:
-        """Return favorite listings with read status."""
+    def get_favorite_ids(self, source: str) -> set[str]:
+        """Return the listing_ids favorited for a source (one query for bulk flagging)."""
+        rows = self.conn.execute(
+            "SELECT listing_id FROM favorites WHERE source = ?",
+            (source,),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def get_favorites(self, district: str | None = None) -> list[dict]:
+        """Return favorite listings with read status, optionally limited to one district."""
+        district_clause = "WHERE l.district = ?" if district else ""
         rows = self.conn.execute(
-            """SELECT l.*, 1 AS is_favorite,
+            f"""SELECT l.*, 1 AS is_favorite,
                       CASE WHEN r.listing_id IS NULL THEN 0
                            WHEN l.raw_hash = r.raw_hash THEN 1 ELSE 0 END AS is_read,
                       f.added_at
@@ -836,7 +1110,9 @@ class Storage:
                JOIN listings l ON l.source = f.source AND l.listing_id = f.listing_id
                LEFT JOIN listings_read r
                  ON l.source = r.source AND l.listing_id = r.listing_id
-               ORDER BY f.added_at DESC"""
+               {district_clause}
+               ORDER BY f.added_at DESC""",
+            (district,) if district else (),
         ).fetchall()
         result = []
         for row in rows:
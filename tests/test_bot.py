@@ -1,24 +1,58 @@
 """Tests for Telegram Bot handlers and helpers."""
 
 import asyncio
+import itertools
+import logging
+import threading
+import time
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from tw_homedog.bot import (
+    _config_summary,
+    _load_config_summary,
     _parse_price_range,
+    _parse_range,
+    _ProgressMessage,
+    _parse_region_input,
+    _range_line,
+    _render_maps_panel,
+    _stop_scheduler,
+    _want_traceback,
     _build_district_keyboard,
     _build_keyword_keyboard,
     _build_list_keyboard,
+    _edit_reply_markup_if_changed,
+    _ensure_scheduler,
+    _execute_pipeline,
+    _get_map_provider,
+    _get_matched,
     _get_unread_matched,
+    _guess_community_name,
+    _list_districts,
+    _listing_detail_text,
+    _maps_usage,
+    _pipeline_lock,
     LIST_PAGE_SIZE,
+    SetupState,
+    cmd_config_export,
     cmd_dedupall,
     cmd_list,
+    list_callback,
+    cmd_run,
+    layout_callback,
+    set_maps_callback,
+    settings_callback,
+    settings_district_callback,
+    settings_kw_callback,
+    settings_kw_include_handler,
 )
 from tw_homedog.db_config import DbConfig
 from tw_homedog.regions import BUY_SECTION_CODES, RENT_SECTION_CODES
 from tw_homedog.storage import Storage
+from tw_homedog.templates import apply_template
 
 
 @pytest.fixture
@@ -47,6 +81,11 @@ def test_parse_price_range_with_spaces():
     assert _parse_price_range(" 500 - 2000 ") == (500, 2000)
 
 
+def test_parse_price_range_with_dashes():
+    assert _parse_price_range("1000–3000") == (1000, 3000)
+    assert _parse_price_range("1000—3000") == (1000, 3000)
+
+
 def test_parse_price_range_invalid_format():
     assert _parse_price_range("abc") is None
     assert _parse_price_range("1000") is None
@@ -62,6 +101,80 @@ def test_parse_price_range_negative():
     assert _parse_price_range("-100-1000") is None
 
 
+# --- _parse_range ---
+
+def test_parse_range_single_value_is_min():
+    assert _parse_range("25") == (25.0, None)
+    assert _parse_range("0") == (None, None)
+
+
+def test_parse_range_pairs():
+    assert _parse_range("20-40") == (20.0, 40.0)
+    assert _parse_range(" 20.5 ， 40 ") == (20.5, 40.0)
+    assert _parse_range("0-35") == (None, 35.0)
+    assert _parse_range("20-") == (20.0, None)
+
+
+def test_parse_range_invalid():
+    assert _parse_range("abc") is None
+    assert _parse_range("40-20") is None
+    assert _parse_range("1-2-3") is None
+    assert _parse_range("") is None
+
+
+# --- _parse_region_input ---
+
+def test_parse_region_input_names_and_codes():
+    assert _parse_region_input(" 台北市, 3 ,") == ([1, 3], None)
+
+
+def test_parse_region_input_fullwidth_comma():
+    assert _parse_region_input("台北市，新北市") == ([1, 3], None)
+
+
+def test_parse_region_input_invalid_token():
+    assert _parse_region_input("台北市,火星市") == ([], "火星市")
+
+
+# --- _range_line ---
+
+def test_range_line_variants():
+    assert _range_line("坪數", 20, 40, "坪") == "坪數：20-40 坪"
+    assert _range_line("坪數", 20, None, "坪") == "坪數：≥ 20 坪"
+    assert _range_line("屋齡", None, 2010, "年建") == "屋齡：≤ 2010 年建"
+    assert _range_line("坪數", None, None, "坪") is None
+
+
+# --- _want_traceback ---
+
+def test_want_traceback_only_for_unexpected_errors(caplog):
+    caplog.set_level(logging.INFO, logger="tw_homedog.bot")
+    assert _want_traceback(RuntimeError("boom")) is True
+    assert _want_traceback(ConnectionError("timeout")) is False
+    assert _want_traceback(ValueError("bad config")) is False
+    caplog.set_level(logging.DEBUG, logger="tw_homedog.bot")
+    assert _want_traceback(ValueError("bad config")) is True
+
+
+# --- SetupState ---
+
+def test_setup_state_round_trips_template_items():
+    items = apply_template("buy_family_taipei")
+    assert SetupState.from_config_items(items).to_config_items() == items
+
+
+def test_setup_state_custom_flow_items():
+    state = SetupState(mode="rent", regions=[1], districts=["大安區"], price_min=10000, price_max=30000)
+    state.selected_districts = {"信義區"}
+    assert state.to_config_items() == {
+        "search.mode": "rent",
+        "search.regions": [1],
+        "search.districts": ["大安區"],
+        "search.price_min": 10000,
+        "search.price_max": 30000,
+    }
+
+
 # --- _build_district_keyboard ---
 
 def test_build_district_keyboard_taipei_buy_none_selected():
@@ -86,6 +199,15 @@ def test_build_district_keyboard_taipei_buy_with_selection():
     assert "內湖區" in texts  # unselected
 
 
+def test_build_district_keyboard_reuses_prebuilt_buttons():
+    first = _build_district_keyboard([1], "buy", [])
+    second = _build_district_keyboard([1], "buy", ["大安區"])
+    plain = {b.callback_data: b for row in first.inline_keyboard for b in row}
+    toggled = {b.callback_data: b for row in second.inline_keyboard for b in row}
+    assert toggled["district_toggle:內湖區"] is plain["district_toggle:內湖區"]
+    assert toggled["district_toggle:大安區"].text == "✅ 大安區"
+
+
 def test_build_district_keyboard_all_taipei_buy_districts():
     keyboard = _build_district_keyboard([1], "buy", [])
     data_values = []
@@ -127,6 +249,53 @@ def test_build_district_keyboard_invalid_region():
     assert keyboard is None
 
 
+def test_edit_reply_markup_skips_unchanged_keyboard():
+    query = SimpleNamespace(
+        message=SimpleNamespace(message_id=7), edit_message_reply_markup=AsyncMock()
+    )
+    context = SimpleNamespace(user_data={})
+
+    async def _run():
+        await _edit_reply_markup_if_changed(query, context, _build_district_keyboard([1], "buy", ["大安區"]))
+        await _edit_reply_markup_if_changed(query, context, _build_district_keyboard([1], "buy", ["大安區"]))
+        await _edit_reply_markup_if_changed(query, context, _build_district_keyboard([1], "buy", []))
+
+    asyncio.run(_run())
+    assert query.edit_message_reply_markup.call_count == 2
+
+
+def test_edit_reply_markup_ignores_not_modified():
+    from telegram.error import BadRequest
+
+    query = SimpleNamespace(
+        message=SimpleNamespace(message_id=7),
+        edit_message_reply_markup=AsyncMock(side_effect=BadRequest("Message is not modified")),
+    )
+    context = SimpleNamespace(user_data={})
+    asyncio.run(_edit_reply_markup_if_changed(query, context, _build_district_keyboard([1], "buy", [])))
+    assert context.user_data["_last_markup"][0] == 7
+
+
+def test_layout_callback_skips_noop_clear(db_config):
+    def _run(data):
+        query = SimpleNamespace(
+            data=data,
+            message=SimpleNamespace(message_id=1),
+            answer=AsyncMock(),
+            edit_message_text=AsyncMock(),
+            edit_message_reply_markup=AsyncMock(),
+        )
+        context = SimpleNamespace(bot_data={"db_config": db_config}, user_data={})
+        asyncio.run(layout_callback(SimpleNamespace(callback_query=query), context))
+        return query
+
+    cleared = _run("layout:clear")
+    cleared.edit_message_reply_markup.assert_not_called()
+    toggled = _run("layout:r:2")
+    toggled.edit_message_reply_markup.assert_called_once()
+    assert db_config.get("search.room_counts") == [2]
+
+
 # --- DbConfig integration for bot ---
 
 def test_db_config_has_config_false(db_config):
@@ -158,6 +327,16 @@ def test_scheduler_config_update(db_config):
     assert db_config.get("scheduler.paused") is True
 
 
+def test_config_summary_memoized_until_config_changes(db_config):
+    db_config.set_many({"search.mode": "buy", "search.regions": [1], "search.districts": ["大安區"]})
+    first = _config_summary(db_config)
+    with patch("tw_homedog.bot._config_summary_base") as mock_base:
+        assert _config_summary(db_config) == first
+        mock_base.assert_not_called()
+    db_config.set("search.districts", ["信義區"])
+    assert "信義區" in _config_summary(db_config)
+
+
 # --- _build_keyword_keyboard ---
 
 def test_build_keyword_keyboard_empty():
@@ -280,6 +459,49 @@ def test_build_list_keyboard_community_fallback_from_title():
     assert "社區 冠德公園家溫馨美居" in kb.inline_keyboard[0][0].text
 
 
+def test_listing_detail_text_keyed_by_content_version():
+    listing = _make_bot_listing(listing_id="v1", raw_hash="a", is_enriched=0)
+    with patch("tw_homedog.bot.format_listing_message", return_value="text") as mock_format:
+        _listing_detail_text(listing, "buy")
+        _listing_detail_text(dict(listing), "buy")
+        assert mock_format.call_count == 1
+        _listing_detail_text({**listing, "is_enriched": 1}, "buy")
+        _listing_detail_text({**listing, "raw_hash": "b"}, "buy")
+        _listing_detail_text(listing, "rent")
+        assert mock_format.call_count == 4
+
+
+def test_guess_community_name_strips_stacked_prefixes():
+    assert _guess_community_name("獨家屋主誠售信義之星") == "信義之星"
+    assert _guess_community_name("急售 專任 大安森林家") == "大安森林家"
+
+
+def test_list_districts_counts_fully_matched_listings(storage, db_config):
+    db_config.set_many({
+        "search.regions": [1],
+        "search.mode": "buy",
+        "search.districts": ["大安區", "中山區"],
+        "search.price_min": 1000,
+        "search.price_max": 5000,
+        "search.keywords_exclude": ["頂加"],
+        "telegram.bot_token": "test:TOKEN",
+        "telegram.chat_id": "123",
+    })
+    rows = (("1", "大安區", "t1"), ("2", "大安區", "t2"), ("3", "信義區", "t3"),
+            ("4", None, "t4"), ("5", "中山區", "頂加t5"))
+    for lid, district, title in rows:
+        storage.insert_listing(_make_bot_listing(
+            listing_id=lid, district=district, raw_hash=f"h{lid}", title=title, address=f"a{lid}",
+        ))
+    filtered = {"key": ("大安區", False, db_config.version), "ts": time.monotonic(), "data": []}
+    context = SimpleNamespace(user_data={"_matched_cache": filtered})
+
+    # 中山區 only has a keyword-excluded listing, so it must not be offered
+    assert _list_districts(context, storage, db_config, include_read=False) == [("大安區", 2)]
+    # The district-filtered list the user is paging through stays cached
+    assert context.user_data["_matched_cache"] is filtered
+
+
 # --- _get_unread_matched ---
 
 def test_get_unread_matched_returns_matching(storage, db_config):
@@ -351,9 +573,31 @@ def test_get_unread_matched_no_config(storage, db_config):
     assert result == []
 
 
-def test_cmd_dedupall_invalid_batch_size(monkeypatch):
-    monkeypatch.setattr("tw_homedog.bot._pipeline_running", False)
+def test_ensure_scheduler_replaces_tracked_job(db_config):
+    jobs = []
+
+    def _run_repeating(*_args, **_kwargs):
+        job = SimpleNamespace(removed=False)
+        job.schedule_removal = lambda: setattr(job, "removed", True)
+        jobs.append(job)
+        return job
+
+    context = SimpleNamespace(
+        bot_data={"db_config": db_config},
+        job_queue=SimpleNamespace(run_repeating=_run_repeating),
+    )
+
+    _ensure_scheduler(context)
+    _ensure_scheduler(context)
+    assert jobs[0].removed is True
+    assert context.bot_data["_pipeline_job"] is jobs[1]
 
+    _stop_scheduler(context)
+    assert jobs[1].removed is True
+    assert "_pipeline_job" not in context.bot_data
+
+
+def test_cmd_dedupall_invalid_batch_size():
     class DummyDbConfig:
         def get(self, _key, default=None):
             return default
@@ -370,9 +614,7 @@ def test_cmd_dedupall_invalid_batch_size(monkeypatch):
     assert "用法：/dedupall" in text
 
 
-def test_cmd_dedupall_runs_until_empty(monkeypatch):
-    monkeypatch.setattr("tw_homedog.bot._pipeline_running", False)
-
+def test_cmd_dedupall_runs_until_empty():
     class DummyDbConfig:
         def get(self, key, default=None):
             if key == "scheduler.paused":
@@ -399,9 +641,7 @@ def test_cmd_dedupall_runs_until_empty(monkeypatch):
 
     # call order:
     # 1) initial dry-run
-    # 2) apply round
-    # 3) remaining dry-run (0 groups -> break)
-    # 4) final summary dry-run
+    # 2) apply round (reports 0 remaining groups -> break, no extra dry-runs)
     responses = [
         {"groups": 2, "projected_merge_records": 3},
         {
@@ -409,10 +649,10 @@ def test_cmd_dedupall_runs_until_empty(monkeypatch):
             "projected_merge_records": 3,
             "merged_records": 3,
             "cleanup_failed": 0,
+            "remaining_groups": 0,
+            "remaining_records": 0,
             "validation": {"notifications_sent": 0, "listings_read": 0, "favorites": 0},
         },
-        {"groups": 0, "projected_merge_records": 0},
-        {"groups": 0, "projected_merge_records": 0},
     ]
 
     def _fake_run_cleanup(*_args, **_kwargs):
@@ -423,12 +663,249 @@ def test_cmd_dedupall_runs_until_empty(monkeypatch):
     ) as mock_ensure:
         asyncio.run(cmd_dedupall(update, context))
 
-    assert update.message.reply_text.call_count >= 3
+    # Start message + final summary; per-round progress is edited in place
+    assert update.message.reply_text.call_count == 2
     final_text = update.message.reply_text.call_args_list[-1][0][0]
     assert "去重完成" in final_text
+    assert "剩餘：0 組 / 0 筆" in final_text
+    assert responses == []
     mock_ensure.assert_called_once()
 
 
+def test_cmd_dedupall_edits_progress_in_place():
+    class DummyDbConfig:
+        def get(self, key, default=None):
+            return True if key == "scheduler.paused" else default
+
+        def build_config(self):
+            raise ValueError
+
+    progress_msg = SimpleNamespace(edit_text=AsyncMock())
+    update = SimpleNamespace(message=SimpleNamespace(reply_text=AsyncMock(return_value=progress_msg)))
+    context = SimpleNamespace(
+        args=["1"],
+        bot_data={"storage": object(), "db_config": DummyDbConfig()},
+        job_queue=SimpleNamespace(get_jobs_by_name=lambda _: []),
+    )
+
+    def _round(remaining):
+        return {
+            "groups": 1,
+            "merged_records": 1,
+            "cleanup_failed": 0,
+            "remaining_groups": remaining,
+            "remaining_records": remaining,
+            "validation": {},
+        }
+
+    responses = [{"groups": 3, "projected_merge_records": 3}, _round(2), _round(1), _round(0)]
+    clock = itertools.count(step=10)
+
+    with patch("tw_homedog.bot.run_cleanup", side_effect=lambda *a, **k: responses.pop(0)), patch(
+        "tw_homedog.bot.time.monotonic", side_effect=lambda: next(clock)
+    ):
+        asyncio.run(cmd_dedupall(update, context))
+
+    assert update.message.reply_text.call_count == 2
+    assert progress_msg.edit_text.call_count == 3
+    assert "第 3 輪完成" in progress_msg.edit_text.call_args[0][0]
+
+
+def test_cmd_config_export_small_config_inline(db_config):
+    db_config.set("search.mode", "buy")
+    update = SimpleNamespace(
+        message=SimpleNamespace(reply_text=AsyncMock(), reply_document=AsyncMock())
+    )
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    asyncio.run(cmd_config_export(update, context))
+
+    assert '"search.mode": "buy"' in update.message.reply_text.call_args[0][0]
+    update.message.reply_document.assert_not_called()
+
+
+def test_cmd_config_export_large_config_as_document(db_config):
+    db_config.set("search.keywords_exclude", ["關鍵字"] * 1000)
+    update = SimpleNamespace(
+        message=SimpleNamespace(reply_text=AsyncMock(), reply_document=AsyncMock())
+    )
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    asyncio.run(cmd_config_export(update, context))
+
+    update.message.reply_text.assert_not_called()
+    document = update.message.reply_document.call_args[0][0]
+    assert document.name == "config.json"
+    assert "關鍵字" in document.getvalue().decode("utf-8")
+
+
+def test_maps_usage_reuses_reading_within_ttl(db_config, tmp_path):
+    db_config.set_many({
+        "maps.enabled": True,
+        "maps.api_key": "k",
+        "maps.cache_dir": str(tmp_path / "maps"),
+    })
+
+    with patch("tw_homedog.bot._get_map_provider", wraps=_get_map_provider) as mock_provider:
+        assert _maps_usage(db_config) == (0, 10000)
+        assert _maps_usage(db_config) == (0, 10000)
+        assert mock_provider.call_count == 1
+        # A different limit is a different reading
+        db_config.set("maps.monthly_limit", 5)
+        assert _maps_usage(db_config) == (0, 5)
+        assert mock_provider.call_count == 2
+
+    db_config.set("maps.enabled", False)
+    assert _maps_usage(db_config) is None
+
+
+def test_config_summary_never_reads_map_usage_files(db_config, tmp_path):
+    db_config.set_many({
+        "maps.enabled": True,
+        "maps.api_key": "k",
+        "maps.cache_dir": str(tmp_path / "summary_maps"),
+    })
+
+    with patch("tw_homedog.bot._get_map_provider", wraps=_get_map_provider) as mock_provider:
+        assert "本月" not in _config_summary(db_config)
+        mock_provider.assert_not_called()
+        summary = asyncio.run(_load_config_summary(db_config))
+        assert mock_provider.call_count == 1
+    assert "本月 0/10000" in summary
+    assert "本月 0/10000" in _config_summary(db_config)
+
+
+def test_settings_maps_panel_reuses_cached_markup(db_config):
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    def _query(data):
+        return SimpleNamespace(data=data, answer=AsyncMock(), edit_message_text=AsyncMock())
+
+    panel = _query("settings:maps")
+    asyncio.run(settings_callback(SimpleNamespace(callback_query=panel), context))
+    toggle_on = _query("set_maps:toggle")
+    asyncio.run(set_maps_callback(SimpleNamespace(callback_query=toggle_on), context))
+    toggle_off = _query("set_maps:toggle")
+    asyncio.run(set_maps_callback(SimpleNamespace(callback_query=toggle_off), context))
+
+    first = panel.edit_message_text.call_args.kwargs["reply_markup"]
+    second = toggle_on.edit_message_text.call_args.kwargs["reply_markup"]
+    third = toggle_off.edit_message_text.call_args.kwargs["reply_markup"]
+    assert "每月 API 上限：10000" in panel.edit_message_text.call_args[0][0]
+    assert second.inline_keyboard[0][0].text.startswith("🟢")
+    assert third is first
+
+
+def test_get_map_provider_reused_until_config_changes(db_config, tmp_path):
+    db_config.set_many({"maps.enabled": True, "maps.api_key": "k", "maps.cache_dir": str(tmp_path / "maps")})
+
+    first = _get_map_provider(db_config)
+    assert first is not None
+    assert _get_map_provider(db_config) is first
+
+    db_config.set("maps.zoom", 15)
+    rebuilt = _get_map_provider(db_config)
+    assert rebuilt is not first
+    assert rebuilt.config.zoom == 15
+
+    db_config.set("maps.enabled", False)
+    assert _get_map_provider(db_config) is None
+
+
+def test_render_maps_panel_usage_line_only_when_requested(db_config, tmp_path):
+    db_config.set_many({"maps.enabled": True, "maps.api_key": "k", "maps.cache_dir": str(tmp_path / "maps")})
+
+    with_usage, markup = asyncio.run(_render_maps_panel(db_config, include_usage=True))
+    without_usage, same_markup = asyncio.run(_render_maps_panel(db_config, include_usage=False))
+
+    assert "狀態：已開啟" in with_usage
+    assert "本月用量：0/10000" in with_usage
+    assert "本月用量" not in without_usage
+    assert markup is same_markup
+
+
+def test_settings_kw_callback_routes_delete_by_prefix(db_config):
+    db_config.set_many({"search.keywords_include": ["電梯", "a:b"], "search.keywords_exclude": ["頂加"]})
+    query = SimpleNamespace(data="kw_del_i:a:b", answer=AsyncMock(), edit_message_text=AsyncMock())
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    state = asyncio.run(settings_kw_callback(SimpleNamespace(callback_query=query), context))
+
+    assert db_config.get("search.keywords_include") == ["電梯"]
+    assert db_config.get("search.keywords_exclude") == ["頂加"]
+    assert "已刪除包含關鍵字：a:b" in query.edit_message_text.call_args[0][0]
+    assert state is not None
+
+
+def test_settings_kw_include_handler_dedups_input(db_config):
+    db_config.set("search.keywords_include", ["電梯"])
+    update = SimpleNamespace(message=SimpleNamespace(text="電梯, 車位, 車位", reply_text=AsyncMock()))
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    asyncio.run(settings_kw_include_handler(update, context))
+
+    assert db_config.get("search.keywords_include") == ["電梯", "車位"]
+
+
+def test_settings_district_confirm_keeps_keyboard_order(db_config):
+    db_config.set_many({"search.regions": [1], "search.mode": "buy"})
+    order = list(BUY_SECTION_CODES[1])
+    context = SimpleNamespace(bot_data={"db_config": db_config}, user_data={})
+
+    def _press(data):
+        query = SimpleNamespace(
+            data=data,
+            message=SimpleNamespace(message_id=1),
+            answer=AsyncMock(),
+            edit_message_text=AsyncMock(),
+            edit_message_reply_markup=AsyncMock(),
+        )
+        asyncio.run(settings_district_callback(SimpleNamespace(callback_query=query), context))
+
+    _press(f"district_toggle:{order[2]}")
+    _press(f"district_toggle:{order[0]}")
+    _press(f"district_toggle:{order[1]}")
+    _press(f"district_toggle:{order[1]}")
+    _press("district_confirm")
+
+    assert db_config.get("search.districts") == [order[0], order[2]]
+    assert "_selected_districts" not in context.user_data
+
+
+def test_settings_district_confirm_empty_answers_once(db_config):
+    query = SimpleNamespace(data="district_confirm", answer=AsyncMock(), edit_message_text=AsyncMock())
+    context = SimpleNamespace(bot_data={"db_config": db_config}, user_data={})
+
+    asyncio.run(settings_district_callback(SimpleNamespace(callback_query=query), context))
+
+    query.answer.assert_awaited_once_with("請至少選擇一個區域", show_alert=True)
+    query.edit_message_text.assert_not_called()
+
+
+def test_settings_callback_unknown_route_is_ignored(db_config):
+    query = SimpleNamespace(data="settings:nope", answer=AsyncMock(), edit_message_text=AsyncMock())
+    context = SimpleNamespace(bot_data={"db_config": db_config})
+
+    assert asyncio.run(settings_callback(SimpleNamespace(callback_query=query), context)) is None
+    query.edit_message_text.assert_not_called()
+
+
+def test_cmd_run_rejects_while_pipeline_locked():
+    update = SimpleNamespace(message=SimpleNamespace(reply_text=AsyncMock()))
+    context = SimpleNamespace(bot_data={})
+
+    async def _run():
+        async with _pipeline_lock:
+            await cmd_run(update, context)
+
+    with patch("tw_homedog.bot._execute_pipeline") as mock_execute:
+        asyncio.run(_run())
+
+    mock_execute.assert_not_called()
+    text = update.message.reply_text.call_args[0][0]
+    assert "正在執行中" in text
+
+
 # --- cmd_list empty states ---
 
 def test_cmd_list_empty_with_read_shows_toggle(storage, db_config):
@@ -467,6 +944,52 @@ def test_cmd_list_empty_with_read_shows_toggle(storage, db_config):
     )
 
 
+def test_list_pagination_reuses_matched_result(storage, db_config):
+    db_config.set_many({
+        "search.regions": [1],
+        "search.mode": "rent",
+        "search.districts": ["大安區"],
+        "search.price_min": 1000,
+        "search.price_max": 50000,
+        "telegram.bot_token": "test:TOKEN",
+        "telegram.chat_id": "123",
+    })
+    for i in range(7):
+        storage.insert_listing({
+            "source": "591", "listing_id": str(i), "title": f"test {i}",
+            "price": 20000, "district": "大安區", "size_ping": 28.0,
+            "raw_hash": f"h{i}",
+        })
+
+    context = SimpleNamespace(bot_data={"storage": storage, "db_config": db_config}, user_data={})
+
+    def _press(data):
+        query = SimpleNamespace(
+            data=data,
+            message=SimpleNamespace(chat_id=123, delete=AsyncMock()),
+            answer=AsyncMock(),
+            edit_message_text=AsyncMock(),
+        )
+        asyncio.run(list_callback(SimpleNamespace(callback_query=query), context))
+        return query
+
+    update = SimpleNamespace(message=SimpleNamespace(reply_text=AsyncMock()))
+    with patch("tw_homedog.bot._get_matched", wraps=_get_matched) as mock_matched:
+        asyncio.run(cmd_list(update, context))
+        _press("list:p:5")
+        _press("list:d:3")
+        _press("list:fav:add:6")
+        back = _press("list:back")
+
+    assert mock_matched.call_count == 1
+    # The viewed listing was marked read and dropped from the cached unread list
+    assert back.edit_message_text.call_args[0][0] == "物件數：6 筆"
+    # Favorites are flagged at render time, so the star shows without a reload
+    rows = back.edit_message_text.call_args.kwargs["reply_markup"].inline_keyboard
+    starred = [row[0].callback_data for row in rows if row[0].text.startswith("⭐")]
+    assert starred == ["list:d:6"]
+
+
 def test_cmd_list_empty_no_listings(storage, db_config):
     """No listings at all → plain text, no buttons."""
     db_config.set_many({
@@ -492,3 +1015,115 @@ def test_cmd_list_empty_no_listings(storage, db_config):
     # No reply_markup keyword argument (or None)
     kwargs = update.message.reply_text.call_args[1]
     assert "reply_markup" not in kwargs
+
+
+# --- pipeline scrape/insert batching ---
+
+def test_execute_pipeline_inserts_every_scraped_batch(db_config, storage):
+    db_config.set_many({
+        "search.mode": "rent",
+        "search.regions": [1],
+        "search.districts": ["大安區"],
+        "search.price_min": 10000,
+        "search.price_max": 30000,
+        "telegram.bot_token": "token",
+        "telegram.chat_id": "1",
+    })
+    raws = [
+        {"id": str(i), "title": f"物件{i}", "price": 20000, "address": f"大安區{i}號", "district": "大安區"}
+        for i in range(5)
+    ]
+    context = SimpleNamespace(
+        bot_data={"storage": storage, "db_config": db_config},
+        bot=SimpleNamespace(send_message=AsyncMock()),
+    )
+
+    with patch("tw_homedog.scraper.iter_scrape_listings", return_value=iter(raws)), patch(
+        "tw_homedog.bot.SCRAPE_INSERT_BATCH_SIZE", 2
+    ):
+        result = asyncio.run(_execute_pipeline(context))
+
+    assert "爬取 5 筆，新增 5 筆" in result
+    assert storage.get_listing_counts()[0] == 5
+
+
+# --- _ProgressMessage ---
+
+def test_progress_message_coalesces_updates_into_edits():
+    bot = SimpleNamespace(
+        send_message=AsyncMock(return_value=SimpleNamespace(message_id=42)),
+        edit_message_text=AsyncMock(),
+    )
+
+    async def _run():
+        progress = _ProgressMessage(bot, 1, interval=60)
+        progress.update("page 1")
+        await asyncio.sleep(0)
+        for page in range(2, 30):
+            progress.update(f"page {page}")
+        await progress.close()
+
+    asyncio.run(_run())
+
+    bot.send_message.assert_awaited_once_with(chat_id=1, text="page 1")
+    bot.edit_message_text.assert_awaited_once_with(chat_id=1, message_id=42, text="page 29")
+
+
+def test_progress_message_close_during_first_send_posts_once():
+    gate = asyncio.Event()
+    bot = SimpleNamespace(edit_message_text=AsyncMock())
+
+    async def _slow_send(chat_id, text):
+        await gate.wait()
+        return SimpleNamespace(message_id=7)
+
+    bot.send_message = AsyncMock(side_effect=_slow_send)
+
+    async def _run():
+        progress = _ProgressMessage(bot, 1, interval=60)
+        progress.update("done")
+        await asyncio.sleep(0)
+        closing = asyncio.create_task(progress.close())
+        await asyncio.sleep(0)
+        gate.set()
+        await closing
+
+    asyncio.run(_run())
+
+    bot.send_message.assert_awaited_once_with(chat_id=1, text="done")
+    bot.edit_message_text.assert_not_awaited()
+
+
+def test_execute_pipeline_waits_for_prefetch_when_insert_fails(db_config, storage):
+    db_config.set_many({
+        "search.mode": "rent",
+        "search.regions": [1],
+        "search.districts": ["大安區"],
+        "search.price_min": 10000,
+        "search.price_max": 30000,
+        "telegram.bot_token": "token",
+        "telegram.chat_id": "1",
+    })
+    scrape_finished = threading.Event()
+
+    def _raws():
+        yield {"id": "1", "title": "物件1", "price": 20000, "district": "大安區"}
+        time.sleep(0.2)
+        scrape_finished.set()
+
+    context = SimpleNamespace(
+        bot_data={"storage": storage, "db_config": db_config},
+        bot=SimpleNamespace(send_message=AsyncMock()),
+    )
+
+    async def _run():
+        result = await _execute_pipeline(context)
+        return result, scrape_finished.is_set()
+
+    with patch("tw_homedog.scraper.iter_scrape_listings", return_value=_raws()), patch(
+        "tw_homedog.bot.SCRAPE_INSERT_BATCH_SIZE", 1
+    ), patch.object(storage, "bulk_insert_listings_with_dedup", side_effect=RuntimeError("db down")):
+        result, finished = asyncio.run(_run())
+
+    assert result.startswith("執行失敗")
+    assert finished
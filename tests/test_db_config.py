@@ -71,6 +71,66 @@ def test_get_all(db_config):
     assert result == {"a": 1, "b": "two", "c": [3]}
 
 
+def test_reads_served_from_snapshot(db_config):
+    db_config.set("search.mode", "buy")
+    db_config.get("search.mode")
+    # Bypass DbConfig so only the cached snapshot could answer
+    db_config.conn.execute("UPDATE bot_config SET value = '\"rent\"' WHERE key = 'search.mode'")
+    assert db_config.get("search.mode") == "buy"
+    db_config.invalidate_cache()
+    assert db_config.get("search.mode") == "rent"
+
+
+def test_write_invalidates_snapshot(db_config):
+    db_config.set("search.mode", "buy")
+    assert db_config.get("search.mode") == "buy"
+    db_config.set_many({"search.mode": "rent"})
+    assert db_config.get("search.mode") == "rent"
+    db_config.delete("search.mode")
+    assert db_config.get("search.mode") is None
+
+
+def test_writes_keep_snapshot_warm(db_config):
+    db_config.get_all()
+    db_config.set("search.mode", "rent")
+    # Snapshot is updated in place rather than dropped
+    assert db_config._settings_cache is not None
+    assert db_config.get("search.mode") == "rent"
+    db_config.invalidate_cache()
+    assert db_config.get("search.mode") == "rent"
+
+
+def test_set_many_writes_nothing_on_encode_failure(db_config):
+    with pytest.raises(TypeError):
+        db_config.set_many({"search.mode": "buy", "bad": object()})
+    db_config.invalidate_cache()
+    assert db_config.get_all() == {}
+
+
+def test_version_bumps_on_every_change(db_config):
+    v0 = db_config.version
+    db_config.set("a", 1)
+    db_config.set_many({"b": 2})
+    db_config.delete("a")
+    db_config.invalidate_cache()
+    assert db_config.version == v0 + 4
+
+
+def test_get_all_returns_independent_copies(db_config):
+    db_config.set("search.districts", ["大安區"])
+    db_config.get_all()["search.districts"].append("信義區")
+    assert db_config.get("search.districts") == ["大安區"]
+
+
+def test_get_many_merges_defaults(db_config):
+    db_config.set("maps.enabled", True)
+    result = db_config.get_many(
+        ["maps.enabled", "maps.api_key", "maps.monthly_limit"],
+        {"maps.enabled": False, "maps.monthly_limit": 10000},
+    )
+    assert result == {"maps.enabled": True, "maps.api_key": None, "maps.monthly_limit": 10000}
+
+
 def test_has_config_false_when_empty(db_config):
     assert db_config.has_config() is False
 
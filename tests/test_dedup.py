@@ -4,8 +4,10 @@ from tw_homedog.dedup import (
     DEFAULT_DEDUP_THRESHOLD,
     build_entity_fingerprint,
     choose_canonical_listing,
+    listing_to_features,
     normalize_address,
     score_duplicate,
+    score_features,
 )
 
 
@@ -47,6 +49,14 @@ def test_score_duplicate_same_entity_with_format_variance():
     assert scored.score >= DEFAULT_DEDUP_THRESHOLD
 
 
+def test_score_features_matches_score_duplicate():
+    left = _listing()
+    right = _listing(listing_id="10002", address="臺北市南港區向陽路258巷10號", price=2988)
+    assert score_features(
+        listing_to_features(left), listing_to_features(right)
+    ) == score_duplicate(left, right)
+
+
 def test_score_duplicate_different_property_same_district_price_band():
     left = _listing()
     right = _listing(
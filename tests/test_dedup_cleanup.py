@@ -68,6 +68,9 @@ def test_cleanup_dry_run_and_apply(tmp_path):
         assert applied["dry_run"] is False
         assert applied["merged_records"] >= 1
         assert db.get_listing_count() == before - applied["merged_records"]
+        after = run_cleanup(db, dry_run=True, batch_size=50)
+        assert applied["remaining_groups"] == after["groups"]
+        assert applied["remaining_records"] == after["projected_merge_records"]
         assert applied["validation"] == {
             "notifications_sent": 0,
             "listings_read": 0,
@@ -57,6 +57,26 @@ def test_set_log_level():
         assert handler.level == logging.DEBUG
 
 
+def test_setup_logging_queue_moves_io_to_listener(tmp_path):
+    from tw_homedog import log
+
+    setup_logging(log_dir=str(tmp_path), use_queue=True)
+    try:
+        root = logging.getLogger()
+        assert [type(h).__name__ for h in root.handlers] == ["QueueHandler"]
+        listener_types = [type(h).__name__ for h in log._listener.handlers]
+        assert "RotatingFileHandler" in listener_types
+
+        set_log_level("DEBUG")
+        assert all(h.level == logging.DEBUG for h in log._listener.handlers)
+
+        logging.getLogger("tw_homedog.test").warning("queued message")
+    finally:
+        setup_logging()
+    assert log._listener is None
+    assert "queued message" in (tmp_path / "tw_homedog.log").read_text(encoding="utf-8")
+
+
 def test_set_log_level_invalid():
     with pytest.raises(ValueError, match="Invalid log level"):
         set_log_level("NONSENSE")
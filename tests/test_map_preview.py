@@ -62,6 +62,17 @@ def test_get_thumbnail_geocode_and_cache(monkeypatch, tmp_path):
     assert calls["static"] == 1   # cached
 
 
+def test_cache_key_shared_for_same_coords(tmp_path):
+    provider = MapThumbnailProvider(MapConfig(enabled=True, api_key="k", cache_dir=str(tmp_path)))
+
+    a = provider._build_cache_key(address="台北市大安區A", lat=25.0330001, lng=121.5430004)
+    b = provider._build_cache_key(address="大安區 B 路", lat=25.033, lng=121.543)
+    c = provider._build_cache_key(address="台北市大安區A", lat=25.034, lng=121.543)
+
+    assert a == b
+    assert a != c
+
+
 def test_remember_file_id_persists(tmp_path):
     cfg = MapConfig(enabled=True, api_key="k", cache_dir=str(tmp_path))
     provider = MapThumbnailProvider(cfg)
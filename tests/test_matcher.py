@@ -12,6 +12,8 @@ from tw_homedog.matcher import (
     match_bathroom,
     match_build_year,
     find_matching_listings,
+    match_listings_by_ids,
+    matches_all,
 )
 from tw_homedog.storage import Storage
 
@@ -180,6 +182,12 @@ def test_keyword_searches_community_name(config):
 
 
 # Composite matcher test
+def test_matches_all(config):
+    assert matches_all(_listing(), config) is True
+    assert matches_all(_listing(price=50000), config) is False
+    assert matches_all(_listing(title="大安區頂樓電梯"), config) is False
+
+
 def test_find_matching_listings(config, tmp_path):
     db = Storage(str(tmp_path / "test.db"))
     # Insert matching listing
@@ -206,3 +214,26 @@ def test_find_matching_listings(config, tmp_path):
     assert len(matched) == 1
     assert matched[0]["listing_id"] == "111"
     db.close()
+
+
+def test_match_listings_by_ids_only_checks_given_ids(config, tmp_path):
+    db = Storage(str(tmp_path / "test.db"))
+    db.insert_listing({
+        "source": "591", "listing_id": "111", "title": "大安區電梯套房",
+        "price": 35000, "district": "大安區", "size_ping": 28.0,
+        "raw_hash": "aaa",
+    })
+    db.insert_listing({
+        "source": "591", "listing_id": "222", "title": "電梯套房",
+        "price": 35000, "district": "萬華區", "size_ping": 28.0,
+        "raw_hash": "bbb",
+    })
+    db.insert_listing({
+        "source": "591", "listing_id": "333", "title": "大安區電梯套房",
+        "price": 36000, "district": "大安區", "size_ping": 30.0,
+        "raw_hash": "ccc",
+    })
+
+    matched = match_listings_by_ids(config, db, ["333", "222", "999"])
+    assert [m["listing_id"] for m in matched] == ["333"]
+    db.close()
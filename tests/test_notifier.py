@@ -1,6 +1,7 @@
 """Tests for Telegram notifier."""
 
 import asyncio
+import sqlite3
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -145,3 +146,31 @@ def test_send_notifications_batch_limit(mock_bot_cls, config, tmp_path):
     assert count == 10
     assert mock_bot.send_message.call_count == 10
     db.close()
+
+
+@patch("tw_homedog.notifier.Bot")
+def test_send_notifications_awaits_prefetch_when_send_loop_fails(mock_bot_cls, config, tmp_path):
+    db = Storage(str(tmp_path / "test.db"))
+    mock_bot = MagicMock()
+    mock_bot.send_message = AsyncMock(return_value=True)
+    mock_bot_cls.return_value = mock_bot
+    prepared: list[str] = []
+
+    def _format(listing, **kwargs):
+        prepared.append(listing["listing_id"])
+        return "msg"
+
+    async def _run():
+        with pytest.raises(sqlite3.OperationalError):
+            await send_notifications(config, db, [_listing(listing_id="1"), _listing(listing_id="2")])
+        # The second listing's prepare finished before the error propagated
+        return list(prepared), asyncio.all_tasks() - {asyncio.current_task()}
+
+    with patch("tw_homedog.notifier.format_listing_message", side_effect=_format), patch.object(
+        db, "record_notification", side_effect=sqlite3.OperationalError("locked")
+    ):
+        done, leftover = asyncio.run(_run())
+
+    assert done == ["1", "2"]
+    assert leftover == set()
+    db.close()
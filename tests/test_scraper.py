@@ -1,8 +1,12 @@
 """Tests for 591 scraper (unit tests with mocks, no real HTTP)."""
 
+import threading
+import time
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import pytest
+import requests
 
 from tw_homedog.db_config import Config, SearchConfig, TelegramConfig, ScraperConfig
 from tw_homedog.regions import (
@@ -18,7 +22,12 @@ from tw_homedog.scraper import (
     _extract_detail_fields,
     fetch_buy_listing_detail,
     scrape_listings,
+    iter_scrape_listings,
     _scrape_single_region,
+    enrich_buy_listings,
+    _RequestPacer,
+    _fetch_details_concurrently,
+    _get_session,
 )
 
 
@@ -348,6 +357,24 @@ def test_scrape_listings_progress_callback_thread_safe():
     assert set(messages) == {"region 1", "region 3"}
 
 
+def test_iter_scrape_listings_is_lazy_per_region():
+    """Next region is only scraped once the previous one has been consumed."""
+    config = _multi_region_config([1, 3])
+    scraped_regions = []
+
+    def fake_scrape(cfg, progress_cb=None):
+        rid = cfg.search.regions[0]
+        scraped_regions.append(rid)
+        return [{"listing_id": f"{rid}-1"}]
+
+    with patch("tw_homedog.scraper.scrape_buy_listings", side_effect=fake_scrape):
+        it = iter_scrape_listings(config)
+        assert next(it) == {"listing_id": "1-1"}
+        assert scraped_regions == [1]
+        assert list(it) == [{"listing_id": "3-1"}]
+    assert scraped_regions == [1, 3]
+
+
 # --- fetch_buy_listing_detail status=0 top-level data ---
 
 def test_fetch_buy_listing_detail_status0_toplevel():
@@ -415,3 +442,96 @@ def test_fetch_buy_listing_detail_data_is_string():
     assert result is not None
     assert result["main_area"] == 22.0
     assert result["lat"] == pytest.approx(25.1)
+
+
+# --- enrich_buy_listings concurrency ---
+
+def test_enrich_buy_listings_keeps_order_and_skips_failures(buy_config):
+    """Concurrent detail fetch returns all successes, tolerating per-id errors."""
+    def fake_fetch(session, headers, lid, timeout=30):
+        if lid == "2":
+            raise RuntimeError("boom")
+        if lid == "3":
+            return None
+        return {"main_area": float(lid)}
+
+    with patch("tw_homedog.scraper.fetch_buy_listing_detail", side_effect=fake_fetch):
+        result = enrich_buy_listings(buy_config, requests.Session(), {}, ["1", "2", "3", "4", "5"])
+
+    assert list(result.keys()) == ["1", "4", "5"]
+    assert result["4"] == {"main_area": 4.0}
+
+
+def test_enrich_buy_listings_geocodes_each_address_once(buy_config):
+    """Missing coordinates are geocoded once per distinct address, in one lookup batch."""
+    buy_config.maps.api_key = "key"
+    storage = SimpleNamespace(get_listings_by_ids=lambda ids: [
+        {"listing_id": "1", "address": "南港路1號"},
+        {"listing_id": "2", "address": "南港路1號"},
+        {"listing_id": "3", "address": ""},
+    ])
+    details = {"1": {"floor": "1"}, "2": {"floor": "2"}, "3": {"floor": "3"}, "4": {"lat": 25.0, "lng": 121.5}}
+    with patch(
+        "tw_homedog.scraper.fetch_buy_listing_detail",
+        side_effect=lambda session, headers, lid, timeout=30: dict(details[lid]),
+    ), patch(
+        "tw_homedog.map_preview.geocode_address", return_value=(25.05, 121.6)
+    ) as mock_geocode:
+        result = enrich_buy_listings(buy_config, requests.Session(), {}, ["1", "2", "3", "4"], storage=storage)
+
+    mock_geocode.assert_called_once_with("南港路1號", api_key="key")
+    assert (result["1"]["lat"], result["1"]["lng"]) == (25.05, 121.6)
+    assert (result["2"]["lat"], result["2"]["lng"]) == (25.05, 121.6)
+    assert result["3"] == {"floor": "3"}
+    assert result["4"] == {"lat": 25.0, "lng": 121.5}
+
+
+def test_fetch_details_uses_one_session_per_worker_thread(buy_config):
+    """Workers get their own session clone (same cookies) instead of sharing the jar."""
+    base = requests.Session()
+    base.cookies.set("PHPSESSID", "abc")
+    seen: list[requests.Session] = []
+
+    def fetch_one(session, lid):
+        seen.append(session)
+        return {"cookie": session.cookies.get("PHPSESSID"), "thread": threading.get_ident(), "session": id(session)}
+
+    buy_config.scraper.max_workers = 3
+    fetched = _fetch_details_concurrently(buy_config, [str(i) for i in range(9)], base, fetch_one)
+
+    assert all(detail["cookie"] == "abc" for _, detail in fetched)
+    assert base not in seen
+    sessions_by_thread: dict[int, set[int]] = {}
+    for _, detail in fetched:
+        sessions_by_thread.setdefault(detail["thread"], set()).add(detail["session"])
+    assert all(len(ids) == 1 for ids in sessions_by_thread.values())
+
+
+def test_request_pacer_spaces_starts_across_threads():
+    """Starts from several threads are spaced by the delay, not one delay per worker."""
+    pacer = _RequestPacer(0.05, 0.05)
+    starts: list[float] = []
+    lock = threading.Lock()
+
+    def _start():
+        pacer.wait()
+        with lock:
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=_start) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    starts.sort()
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_sessions_share_connection_pool():
+    """Separate sessions reuse one pooled adapter for keep-alive across runs."""
+    a = _get_session()
+    b = _get_session()
+    assert a is not b
+    assert a.get_adapter("https://rent.591.com.tw") is b.get_adapter("https://sale.591.com.tw")
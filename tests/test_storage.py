@@ -72,6 +72,14 @@ def test_get_unnotified_listings(db):
     assert unnotified[0]["listing_id"] == "222"
 
 
+def test_get_unnotified_listings_ranges(db):
+    db.insert_listing(_make_listing(listing_id="111", price=20000))
+    db.insert_listing(_make_listing(listing_id="222", raw_hash="def456", price=90000))
+    db.insert_listing(_make_listing(listing_id="333", raw_hash="ghi789", price=None))
+    unnotified = db.get_unnotified_listings(ranges={"price": (None, 50000)})
+    assert sorted(l["listing_id"] for l in unnotified) == ["111", "333"]
+
+
 def test_update_listing_detail(db):
     db.insert_listing(_make_listing())
     detail = {
@@ -101,6 +109,19 @@ def test_update_listing_detail(db):
     assert row["is_enriched"] == 1
 
 
+def test_bulk_update_listing_details(db):
+    db.insert_listing(_make_listing(listing_id="111"))
+    db.insert_listing(_make_listing(listing_id="222", raw_hash="def456"))
+    db.insert_listing(_make_listing(listing_id="333", raw_hash="ghi789"))
+    db.bulk_update_listing_details("591", {
+        "111": {"parking_desc": "平面式", "lat": 25.0},
+        "222": {"community_name": "測試社區"},
+    })
+    assert db.get_unenriched_listing_ids(["111", "222", "333"]) == ["333"]
+    assert db.get_listing_by_id("591", "111")["parking_desc"] == "平面式"
+    assert db.get_listing_by_id("591", "222")["community_name"] == "測試社區"
+
+
 def test_is_enriched_default(db):
     db.insert_listing(_make_listing())
     row = db.conn.execute("SELECT is_enriched FROM listings WHERE listing_id = '12345678'").fetchone()
@@ -115,6 +136,15 @@ def test_get_unenriched_listing_ids(db):
     assert unenriched == ["222"]
 
 
+def test_get_unenriched_listing_ids_chunks_large_lists(db, monkeypatch):
+    monkeypatch.setattr("tw_homedog.storage.IN_CHUNK_SIZE", 2)
+    for i in range(5):
+        db.insert_listing(_make_listing(listing_id=str(i), raw_hash=f"h{i}"))
+    db.update_listing_detail("591", "3", {"parking_desc": "test"})
+    ids = [str(i) for i in range(5)] + ["missing"]
+    assert sorted(db.get_unenriched_listing_ids(ids)) == ["0", "1", "2", "4"]
+
+
 def test_get_unenriched_listing_ids_empty(db):
     assert db.get_unenriched_listing_ids([]) == []
 
@@ -183,11 +213,44 @@ def test_get_unread_listings_content_change_resurfaces(db):
     assert unread[0]["listing_id"] == "12345678"
 
 
-def test_get_unread_count(db):
+def test_listing_queries_filter_by_district(db):
+    db.insert_listing(_make_listing(listing_id="111"))
+    db.insert_listing(_make_listing(listing_id="222", raw_hash="def456", district="Xinyi"))
+    db.insert_listing(_make_listing(listing_id="333", raw_hash="ghi789", district="Xinyi"))
+    db.mark_as_read("591", "333")
+    db.add_favorite("591", "111")
+    db.add_favorite("591", "222")
+
+    assert [l["listing_id"] for l in db.get_unread_listings(district="Xinyi")] == ["222"]
+    assert [l["listing_id"] for l in db.get_listings_with_read_status(district="Xinyi")] == ["333", "222"]
+    assert [l["listing_id"] for l in db.get_favorites(district="Daan")] == ["111"]
+    assert len(db.get_unread_listings()) == 2
+
+
+def test_listing_queries_filter_by_ranges(db):
+    db.insert_listing(_make_listing(listing_id="cheap", price=10000))
+    db.insert_listing(_make_listing(listing_id="mid", raw_hash="h2", price=30000, size_ping=None))
+    db.insert_listing(_make_listing(listing_id="nodata", raw_hash="h3", price=None))
+    db.insert_listing(_make_listing(listing_id="small", raw_hash="h4", price=30000, size_ping=10.0))
+
+    ranges = {"price": (20000, 40000), "size_ping": (20, None)}
+    unread = [l["listing_id"] for l in db.get_unread_listings(ranges=ranges)]
+    # Missing price/size never rejects, matching the matcher
+    assert unread == ["nodata", "mid"]
+    assert len(db.get_listings_with_read_status(ranges=ranges)) == 2
+
+    with pytest.raises(ValueError, match="Unsupported range column"):
+        db.get_unread_listings(ranges={"title": (1, 2)})
+
+
+def test_get_listing_counts(db):
+    assert db.get_listing_counts() == (0, 0)
     db.insert_listing(_make_listing(listing_id="111"))
     db.insert_listing(_make_listing(listing_id="222", raw_hash="def456"))
     db.mark_as_read("591", "111")
-    assert db.get_unread_count() == 1
+    assert db.get_listing_counts() == (2, 1)
+    db.conn.execute("UPDATE listings SET raw_hash = 'changed' WHERE listing_id = '111'")
+    assert db.get_listing_counts() == (2, 2)
 
 
 def test_mark_many_as_read(db):
@@ -204,6 +267,17 @@ def test_mark_many_as_read_empty(db):
     db.mark_many_as_read("591", [])  # Should not raise
 
 
+def test_mark_many_as_read_refreshes_hash(db):
+    db.insert_listing(_make_listing(listing_id="111"))
+    db.mark_many_as_read("591", ["111", "999"])
+    db.conn.execute("UPDATE listings SET raw_hash = 'changed' WHERE listing_id = '111'")
+    assert len(db.get_unread_listings()) == 1
+    db.mark_many_as_read("591", ["111"])
+    assert db.get_unread_listings() == []
+    ids = [r[0] for r in db.conn.execute("SELECT listing_id FROM listings_read")]
+    assert ids == ["111"]
+
+
 def test_get_listing_by_id(db):
     db.insert_listing(_make_listing())
     listing = db.get_listing_by_id("591", "12345678")
@@ -213,3 +287,9 @@ def test_get_listing_by_id(db):
 
 def test_get_listing_by_id_not_found(db):
     assert db.get_listing_by_id("591", "nonexistent") is None
+
+
+def test_connection_pragmas(db):
+    assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert db.conn.execute("PRAGMA cache_size").fetchone()[0] == -64000
+    assert db.conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
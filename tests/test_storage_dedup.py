@@ -121,3 +121,99 @@ def test_backfill_entity_fingerprints_for_legacy_rows(db):
         "SELECT entity_fingerprint FROM listings WHERE source='591' AND listing_id='legacy-1'"
     ).fetchone()
     assert row["entity_fingerprint"] is not None
+
+
+def test_bulk_insert_matches_row_by_row_decisions(db):
+    db.insert_listing(_listing(listing_id="29999", raw_hash="hash-existing"))
+    rows = [
+        _listing(),
+        _listing(listing_id="29999", raw_hash="hash-other"),
+        _listing(listing_id="30003", raw_hash="hash-existing"),
+        _listing(
+            listing_id="30002",
+            title="南港陽光水岸｜電梯大兩房車",
+            address="臺北市南港區向陽路258巷10號",
+            size_ping=36.49,
+            price=2988,
+            raw_hash="hash-30002",
+        ),
+        _listing(listing_id="30001", raw_hash="hash-30001-again"),
+    ]
+
+    decisions = db.bulk_insert_listings_with_dedup(rows, dedup_enabled=False)
+
+    assert [d["reason"] for d in decisions] == [
+        "inserted",
+        "duplicate_listing_id",
+        "duplicate_raw_hash",
+        "inserted",
+        "duplicate_listing_id",
+    ]
+    count = db.conn.execute("SELECT COUNT(*) AS c FROM listings").fetchone()["c"]
+    assert count == 3
+    skips = db.conn.execute(
+        "SELECT COUNT(*) AS c FROM dedup_audit WHERE event_type = 'skip'"
+    ).fetchone()["c"]
+    assert skips == 3
+
+
+def test_bulk_insert_skips_duplicate_entity_within_batch(db):
+    batch_cache: dict[str, list[dict]] = {}
+    decisions = db.bulk_insert_listings_with_dedup(
+        [
+            _listing(),
+            _listing(
+                listing_id="30002",
+                title="南港陽光水岸｜電梯大兩房車",
+                address="臺北市南港區向陽路258巷10號",
+                size_ping=36.49,
+                price=2988,
+                raw_hash="hash-30002",
+            ),
+        ],
+        batch_cache=batch_cache,
+        dedup_enabled=True,
+    )
+
+    assert decisions[0]["inserted"] is True
+    assert decisions[1]["inserted"] is False
+    assert decisions[1]["reason"] == "duplicate_entity"
+    assert decisions[1]["canonical_listing_id"] == "30001"
+    count = db.conn.execute("SELECT COUNT(*) AS c FROM listings").fetchone()["c"]
+    assert count == 1
+    assert sum(len(v) for v in batch_cache.values()) == 1
+
+
+def test_bulk_insert_empty_list(db):
+    assert db.bulk_insert_listings_with_dedup([]) == []
+
+
+def test_bulk_insert_caps_candidates_per_fingerprint(db, monkeypatch):
+    monkeypatch.setattr("tw_homedog.storage.DEDUP_CANDIDATE_LIMIT", 1)
+    db.insert_listing(_listing(listing_id="29998", raw_hash="h1", price=9000))
+    db.insert_listing(_listing(listing_id="29999", raw_hash="h2", price=9100))
+
+    seen: list[list[dict]] = []
+    original = db._best_dedup_candidate
+
+    def _spy(listing, db_candidates, batch_candidates, **kwargs):
+        seen.append(db_candidates)
+        return original(listing, db_candidates, batch_candidates, **kwargs)
+
+    monkeypatch.setattr(db, "_best_dedup_candidate", _spy)
+    db.bulk_insert_listings_with_dedup([_listing()], dedup_enabled=True)
+
+    assert len(seen) == 1
+    assert len(seen[0]) == 1
+    assert "_rn" not in seen[0][0]
+
+
+def test_dedup_candidate_lookup_reads_newest_from_index(db):
+    plan = db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM listings WHERE source = ? AND entity_fingerprint = ? "
+        "ORDER BY created_at DESC LIMIT ?",
+        ("591", "fp", 5),
+    ).fetchall()
+    details = " ".join(row["detail"] for row in plan)
+    assert "idx_listings_fingerprint_created" in details
+    assert "TEMP B-TREE" not in details
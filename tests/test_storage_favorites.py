@@ -56,3 +56,14 @@ def test_clear_favorites(tmp_path):
 
     storage.clear_favorites()
     assert storage.get_favorites() == []
+
+
+def test_get_favorite_ids(tmp_path):
+    storage = _make_storage(tmp_path)
+    _insert_listing(storage, "1")
+    _insert_listing(storage, "2", raw_hash="h2")
+    assert storage.get_favorite_ids("591") == set()
+
+    storage.add_favorite("591", "2")
+    assert storage.get_favorite_ids("591") == {"2"}
+    assert storage.get_favorite_ids("other") == set()